@@ -0,0 +1,170 @@
+"""Sparse fieldsets for API responses: ``?fields=``, ``?omit=`` and ``?expand=``.
+
+- ``fields=a,b`` keeps only those top-level fields.
+- ``omit=c,d`` drops fields.
+- ``expand=x`` swaps a primary-key field for its nested representation,
+  for fields a serializer lists in ``Meta.expandable_fields``.
+
+``SparseFieldsetMixin`` applies the selection to a serializer's output on
+GET requests. ``SparseQuerysetMixin`` applies it to the view's queryset
+as well: a relation that only omitted fields read is no longer
+select_related/prefetched, and a column that only omitted fields read is
+deferred. Unknown names are ignored.
+"""
+
+from django.db.models import Prefetch
+from django.utils.module_loading import import_string
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def _param_set(request, name):
+    raw = request.query_params.get(name)
+    if not raw:
+        return set()
+    return {part.strip() for part in raw.split(',') if part.strip()}
+
+
+class FieldSelection:
+    """The fields/omit/expand choice of one request."""
+
+    def __init__(self, request=None):
+        active = request is not None and request.method in SAFE_METHODS
+        self.only = (_param_set(request, 'fields') or None) if active else None
+        self.omit = _param_set(request, 'omit') if active else set()
+        self.expand = _param_set(request, 'expand') if active else set()
+
+    @property
+    def is_default(self):
+        return self.only is None and not self.omit and not self.expand
+
+    def keeps(self, name):
+        if name in self.omit:
+            return False
+        return self.only is None or name in self.only
+
+
+def field_selection(request):
+    """FieldSelection for ``request``, parsed once and kept on the request."""
+    if request is None:
+        return FieldSelection()
+    selection = getattr(request, '_field_selection', None)
+    if selection is None:
+        selection = request._field_selection = FieldSelection(request)
+    return selection
+
+
+class SparseFieldsetMixin:
+    """Serializer mixin honouring ?fields= / ?omit= / ?expand= (GET only).
+
+    Only the serializer the view creates is affected (it is the one given
+    the request context); nested serializers render in full. Serializers
+    that override ``to_representation`` without calling super should skip
+    work for fields missing from ``self.fields`` and return
+    ``self.trim_to_fields(data)``.
+    ``Meta.expandable_fields`` maps a field name to
+    ``(serializer class or dotted path, kwargs)``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selection = field_selection(self.context.get('request'))
+        if selection.is_default:
+            return
+        expandable = getattr(getattr(self, 'Meta', None), 'expandable_fields', {})
+        for name in selection.expand & set(expandable):
+            serializer_class, options = expandable[name]
+            if isinstance(serializer_class, str):
+                serializer_class = import_string(serializer_class)
+            self.fields[name] = serializer_class(**{'read_only': True, **options})
+        for name in list(self.fields):
+            if not selection.keeps(name):
+                self.fields.pop(name)
+
+    def trim_to_fields(self, data):
+        """Drop keys of a hand-built representation that aren't in self.fields."""
+        if field_selection(self.context.get('request')).is_default:
+            return data
+        return {key: value for key, value in data.items() if key in self.fields}
+
+
+class SparseQuerysetMixin:
+    """View mixin shaping the list queryset to the requested fields.
+
+    - ``sparse_relations``: serializer field -> related lookups it reads
+      (select_related or prefetch_related paths)
+    - ``sparse_columns``: serializer field -> model columns only it reads
+    - ``expand_relations``: expandable field -> lookups its nested form reads
+    """
+
+    sparse_relations = {}
+    sparse_columns = {}
+    expand_relations = {}
+
+    def filter_queryset(self, queryset):
+        return self.shape_queryset(super().filter_queryset(queryset))
+
+    def shape_queryset(self, queryset):
+        selection = field_selection(self.request)
+        if selection.is_default:
+            return queryset
+
+        needed, unneeded = set(), set()
+        for name, lookups in self.sparse_relations.items():
+            (needed if selection.keeps(name) else unneeded).update(lookups)
+        for name in selection.expand:
+            needed.update(self.expand_relations.get(name, ()))
+        drop = unneeded - needed
+
+        prefetches = [
+            lookup for lookup in queryset._prefetch_related_lookups
+            if (lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup) not in drop
+        ]
+        selected = _select_related_paths(queryset.query.select_related, drop)
+        expand_lookups = [
+            lookup for name in selection.expand for lookup in self.expand_relations.get(name, ())
+        ]
+        queryset = queryset.prefetch_related(None).prefetch_related(*prefetches)
+        if isinstance(queryset.query.select_related, dict):
+            queryset = queryset.select_related(None)
+            if selected:
+                queryset = queryset.select_related(*selected)
+        for lookup in expand_lookups:
+            queryset = self.add_related_lookup(queryset, lookup)
+
+        deferred = set()
+        kept_columns = set()
+        for name, columns in self.sparse_columns.items():
+            (kept_columns if selection.keeps(name) else deferred).update(columns)
+        deferred -= kept_columns
+        if deferred:
+            queryset = queryset.defer(*deferred)
+        return queryset
+
+    @staticmethod
+    def add_related_lookup(queryset, lookup):
+        """select_related forward FK paths, prefetch everything else."""
+        model = queryset.model
+        for part in lookup.split('__'):
+            field = model._meta.get_field(part)
+            if not (field.concrete and (field.many_to_one or field.one_to_one)):
+                return queryset.prefetch_related(lookup)
+            model = field.related_model
+        return queryset.select_related(lookup)
+
+
+def _select_related_paths(select_related, drop, prefix=''):
+    """Paths of a query's select_related dict, without the subtrees in ``drop``.
+
+    {'a': {'b': {}}, 'c': {}} gives ['a__b', 'c']; dropping 'a__b' gives
+    ['a', 'c'].
+    """
+    if not isinstance(select_related, dict):
+        return []
+    paths = []
+    for name, children in select_related.items():
+        path = f'{prefix}{name}'
+        if path in drop:
+            continue
+        paths.extend(_select_related_paths(children, drop, f'{path}__') or [path])
+    return paths
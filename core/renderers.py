@@ -0,0 +1,59 @@
+"""Faster JSON rendering and parsing for the API, backed by orjson.
+
+``FastJSONRenderer`` and ``FastJSONParser`` are drop-in replacements for
+DRF's ``JSONRenderer``/``JSONParser`` (see ``REST_FRAMEWORK`` in settings).
+orjson serializes dicts, lists, strings, numbers and aware datetimes in C;
+anything else (``Decimal``, lazy strings, querysets...) goes through DRF's own
+encoder, so responses carry the same values as before. Without orjson
+installed both classes simply behave like their DRF parents.
+"""
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to DRF's stdlib json
+    orjson = None
+
+# Same output as DRF's encoder for datetimes ("Z" for UTC) and dict keys
+ORJSON_OPTIONS = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+_drf_default = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer using orjson for compact output.
+
+    Indented output (``?indent=`` / Accept ``indent``) keeps the stdlib path,
+    which is only ever used for debugging.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=_drf_default, option=ORJSON_OPTIONS)
+        # Like JSONRenderer: escape U+2028/U+2029, valid JSON but not valid JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser using orjson for UTF-8 request bodies."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8').lower()
+        if orjson is None or encoding not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
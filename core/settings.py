@@ -181,6 +181,73 @@ MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
 ALLOWED_IMAGE_FORMATS = ['JPEG', 'PNG', 'WEBP']
 MAX_SERVICE_IMAGES = 10
 MAX_REVIEW_IMAGES = 5
+# Per-worker memo of resolved image URLs (marketplace.images), keyed by file name
+IMAGE_URL_MEMO_SIZE = 10000
+
+# Tailor search settings
+# Geo backend for radius/nearest queries: 'auto' uses PostGIS or earthdistance
+# when migration 0009 could index them, else 'float' (lat/lng columns)
+TAILOR_GEO_BACKEND = os.environ.get('TAILOR_GEO_BACKEND', 'auto')
+TAILOR_GEO_INDEX_ENABLED = os.environ.get('TAILOR_GEO_INDEX_ENABLED', 'True').lower() in ('true', '1', 'yes')
+TAILOR_GEO_INDEX_CELL_DEG = 0.1  # grid cell size (~11km of latitude)
+TAILOR_GEO_INDEX_TTL = 300  # seconds before a worker reloads the grid from the DB
+TAILOR_GEO_INDEX_SYNC_OVERLAP = 60  # seconds of updated_at overlap when a worker re-reads changed tailors
+TAILOR_GEO_INDEX_SYNC_INTERVAL = 1.0  # seconds between those re-reads; concurrent searches never wait on one
+TAILOR_GEO_INDEX_MAX_CANDIDATES = 5000  # above this, filter by bounding box in SQL instead
+# Search response cache, seconds (0 disables). Off by default without Redis:
+# a per-process cache never hears other workers' invalidations.
+TAILOR_SEARCH_CACHE_TIMEOUT = int(os.environ.get(
+    'TAILOR_SEARCH_CACHE_TIMEOUT', '60' if os.environ.get('REDIS_URL') else '0'))
+TAILOR_SEARCH_CACHE_COORD_PRECISION = 3  # lat/lng decimals in cache keys (~110m)
+# k-nearest search (?k=): rings start here and grow geometrically up to the max
+TAILOR_SEARCH_MAX_K = 100
+TAILOR_SEARCH_KNN_START_KM = 2.0
+TAILOR_SEARCH_KNN_GROWTH = 2.0
+TAILOR_SEARCH_KNN_MAX_KM = 200.0
+SPECIALIZATION_TABLE_TTL = 300  # seconds before a worker reloads specialization slugs/names
+TAILOR_BATCH_MAX_ORIGINS = 10  # origin= params accepted by tailors/batch/
+# sort=relevance weights (each signal is scaled to 0..1 before weighting)
+TAILOR_RELEVANCE_WEIGHTS = {'distance': 0.35, 'rating': 0.30, 'reviews': 0.15, 'experience': 0.10, 'price': 0.10}
+# Build tailor list cards from values() rows instead of TailorProfileSerializer
+TAILOR_CARD_FAST_PATH = True
+TAILOR_CARD_CACHE_TIMEOUT = 3600  # seconds; fragments are versioned by TailorProfile.updated_at
+# Map viewport endpoint (tailors/map/): clusters below this zoom level, or
+# whenever more markers than TAILOR_MAP_MAX_MARKERS fall inside the box
+TAILOR_MAP_CLUSTER_ZOOM = 12
+TAILOR_MAP_CLUSTER_PX = 64  # cluster cell size in screen pixels
+TAILOR_MAP_MAX_MARKERS = 2000
+
+# Facet buckets for /api/tailors/facets/ (price edges in INR, rating floors)
+TAILOR_FACET_PRICE_BUCKETS = [0, 250, 500, 1000]
+TAILOR_FACET_RATING_FLOORS = [4, 3, 2, 1]
+# Serve plain searches from the denormalized TailorSearchDocument table
+# (run `manage.py rebuild_search_documents` once before enabling)
+TAILOR_SEARCH_USE_DOCUMENTS = os.environ.get('TAILOR_SEARCH_USE_DOCUMENTS', 'False').lower() in ('true', '1', 'yes')
+
+# Query-count/latency baseline checked by the test suite (core.testing);
+# rewrite it with `QUERY_BUDGET_RECORD=1 python manage.py test`
+QUERY_BUDGET_FILE = BASE_DIR / 'query_budgets.json'
+# Timings are only checked with QUERY_BUDGET_CHECK_TIMINGS=1; one then fails
+# above baseline * factor + slack
+QUERY_BUDGET_TIME_FACTOR = 3.0
+QUERY_BUDGET_TIME_SLACK_MS = 25.0
+
+# Cache: shared Redis when REDIS_URL is set (needed for cross-worker search
+# cache invalidation), per-process memory otherwise.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -199,8 +266,24 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Default page size for views using marketplace.pagination.KeysetPagination
+    'PAGE_SIZE': 20,
+    # orjson-backed JSON (falls back to DRF's stdlib json when not installed);
+    # compare with `python manage.py benchmark_json`
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
+# PAGE_SIZE is consumed by per-view KeysetPagination, not a global paginator
+SILENCED_SYSTEM_CHECKS = ['rest_framework.W001']
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
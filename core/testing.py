@@ -0,0 +1,148 @@
+"""Query-count and latency budgets for API endpoints.
+
+``QueryBudgetMixin`` (for ``django.test.TestCase``) requests each endpoint
+in ``get_endpoints()`` and checks two things:
+
+- ``assert_queries_independent_of_rows``: the number of SQL queries is the
+  same with N seeded rows as with 10N. An N+1 shows up as a difference.
+- ``assert_within_budgets``: query counts stay within the baseline
+  recorded in ``QUERY_BUDGET_FILE``; more queries than recorded fail.
+  Timings are recorded too but only checked with
+  ``QUERY_BUDGET_CHECK_TIMINGS=1``, on a machine comparable to the one
+  that recorded them: a timing then fails when it exceeds the recorded one
+  by ``QUERY_BUDGET_TIME_FACTOR`` plus ``QUERY_BUDGET_TIME_SLACK_MS``.
+
+Run ``QUERY_BUDGET_RECORD=1 python manage.py test`` to (re)write the
+baseline after an intended change and commit the file with it.
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+@dataclass
+class Endpoint:
+    """One request of the budget suite.
+
+    ``data`` may be a callable taking the attempt number, for requests that
+    must not repeat themselves (usernames, service names). ``scales`` marks
+    endpoints whose output grows with the seeded rows.
+    """
+
+    name: str
+    method: str
+    path: str
+    user: object = None
+    data: object = None
+    scales: bool = False
+
+
+def budget_file():
+    return getattr(settings, 'QUERY_BUDGET_FILE', os.path.join(settings.BASE_DIR, 'query_budgets.json'))
+
+
+def load_budgets():
+    try:
+        with open(budget_file()) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+
+
+def save_budgets(measured):
+    budgets = load_budgets()
+    budgets.update(measured)
+    with open(budget_file(), 'w') as fh:
+        json.dump(dict(sorted(budgets.items())), fh, indent=2)
+        fh.write('\n')
+
+
+class QueryBudgetMixin:
+    """Per-endpoint query-count and timing checks for a TestCase."""
+
+    # Timed repetitions per endpoint; the fastest one counts
+    timing_repeat = 5
+    # Endpoint name -> reason, for N+1s already tracked elsewhere
+    known_n_plus_one = {}
+    attempts = 0
+
+    def get_endpoints(self):
+        raise NotImplementedError
+
+    def request(self, endpoint):
+        """Send ``endpoint`` once: (response, query count, milliseconds)."""
+        client = APIClient()
+        if endpoint.user is not None:
+            client.force_authenticate(endpoint.user)
+        QueryBudgetMixin.attempts += 1
+        data = endpoint.data(QueryBudgetMixin.attempts) if callable(endpoint.data) else endpoint.data
+        # Cold caches every time: the query count is that of a cache miss
+        cache.clear()
+        send = getattr(client, endpoint.method.lower())
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = send(endpoint.path, data=data, format='json')
+            elapsed = (time.perf_counter() - start) * 1000
+        self.assertLess(response.status_code, 400, f'{endpoint.name}: {response.status_code} {response.content[:300]!r}')
+        return response, len(ctx.captured_queries), elapsed
+
+    def count_queries(self, endpoint):
+        # Warm-up request: per-process tables (geo grid, specializations) load here
+        self.request(endpoint)
+        return self.request(endpoint)[1]
+
+    def time_request(self, endpoint):
+        return round(min(self.request(endpoint)[2] for _ in range(self.timing_repeat)), 2)
+
+    def assert_queries_independent_of_rows(self, grow, n):
+        """Compare query counts after seeding ``n`` and ``10 * n`` rows."""
+        grow(n)
+        small = {e.name: self.count_queries(e) for e in self.get_endpoints() if e.scales}
+        grow(9 * n)
+        for endpoint in self.get_endpoints():
+            if not endpoint.scales:
+                continue
+            with self.subTest(endpoint=endpoint.name):
+                if endpoint.name in self.known_n_plus_one:
+                    self.skipTest(self.known_n_plus_one[endpoint.name])
+                large = self.count_queries(endpoint)
+                self.assertEqual(
+                    large, small[endpoint.name],
+                    f'{endpoint.name}: {small[endpoint.name]} queries with {n} rows, {large} with {10 * n}',
+                )
+
+    def assert_within_budgets(self):
+        measured = {
+            endpoint.name: {'queries': self.count_queries(endpoint), 'ms': self.time_request(endpoint)}
+            for endpoint in self.get_endpoints()
+        }
+        if os.environ.get('QUERY_BUDGET_RECORD'):
+            save_budgets(measured)
+            return
+
+        budgets = load_budgets()
+        # Wall-clock limits depend on the host, so they are opt-in
+        check_timings = bool(os.environ.get('QUERY_BUDGET_CHECK_TIMINGS'))
+        factor = getattr(settings, 'QUERY_BUDGET_TIME_FACTOR', 3.0)
+        slack = getattr(settings, 'QUERY_BUDGET_TIME_SLACK_MS', 25.0)
+        for name, result in measured.items():
+            with self.subTest(endpoint=name):
+                budget = budgets.get(name)
+                self.assertIsNotNone(budget, f'{name}: no baseline in {budget_file()}; run with QUERY_BUDGET_RECORD=1')
+                self.assertLessEqual(
+                    result['queries'], budget['queries'],
+                    f"{name}: {result['queries']} queries, baseline {budget['queries']}",
+                )
+                if check_timings:
+                    self.assertLessEqual(
+                        result['ms'], budget['ms'] * factor + slack,
+                        f"{name}: {result['ms']}ms, baseline {budget['ms']}ms",
+                    )
@@ -12,6 +12,9 @@ fi
 # Run database migrations
 python manage.py migrate
 
+# Complete search documents that migrations left without a card
+python manage.py rebuild_search_documents --stale
+
 # Collect static files
 python manage.py collectstatic --noinput
 
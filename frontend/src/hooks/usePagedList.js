@@ -0,0 +1,79 @@
+import { useCallback, useEffect, useRef, useState } from 'react';
+
+const rowId = (row) => row.id;
+
+// A keyset-paginated list loaded one page at a time. `fetchPage(next)`
+// returns { results, next } (apiClient.requestPage); memoize it with
+// useCallback, the first page reloads whenever it changes. `loadMore` appends
+// the following page; `refresh` re-reads the first page (e.g. when polling)
+// and keeps the pages loaded after it.
+export default function usePagedList(fetchPage, getKey = rowId) {
+  const [items, setItems] = useState([]);
+  const [next, setNext] = useState(null);
+  const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [error, setError] = useState(null);
+  const pagesRef = useRef(0);
+  // Responses for a previous fetchPage are dropped
+  const versionRef = useRef(0);
+
+  useEffect(() => {
+    const version = ++versionRef.current;
+    pagesRef.current = 0;
+    setItems([]);
+    setNext(null);
+    setError(null);
+    setLoading(true);
+    fetchPage(null)
+      .then((page) => {
+        if (version !== versionRef.current) return;
+        pagesRef.current = 1;
+        setItems(page.results);
+        setNext(page.next);
+      })
+      .catch((e) => {
+        if (version === versionRef.current) setError(e);
+      })
+      .finally(() => {
+        if (version === versionRef.current) setLoading(false);
+      });
+  }, [fetchPage]);
+
+  const loadMore = useCallback(async () => {
+    if (!next || loadingMore) return;
+    const version = versionRef.current;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(next);
+      if (version !== versionRef.current) return;
+      pagesRef.current += 1;
+      // A refresh may already have pulled some of these rows up
+      setItems((prev) => {
+        const seen = new Set(prev.map(getKey));
+        return [...prev, ...page.results.filter((row) => !seen.has(getKey(row)))];
+      });
+      setNext(page.next);
+    } catch (e) {
+      if (version === versionRef.current) setError(e);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [fetchPage, getKey, next, loadingMore]);
+
+  const refresh = useCallback(async () => {
+    const version = versionRef.current;
+    const page = await fetchPage(null);
+    if (version !== versionRef.current) return;
+    setError(null);
+    if (pagesRef.current <= 1) {
+      pagesRef.current = 1;
+      setItems(page.results);
+      setNext(page.next);
+      return;
+    }
+    const fresh = new Set(page.results.map(getKey));
+    setItems((prev) => [...page.results, ...prev.filter((row) => !fresh.has(getKey(row)))]);
+  }, [fetchPage, getKey]);
+
+  return { items, loading, loadingMore, error, hasMore: Boolean(next), loadMore, refresh };
+}
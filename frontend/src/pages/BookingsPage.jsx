@@ -4,13 +4,16 @@ import apiClient from '../services/apiClient';
 import { useAuth } from '../context/AuthContext.jsx';
 import toast from 'react-hot-toast';
 import ReviewImageUpload from '../components/ReviewImageUpload';
+import usePagedList from '../hooks/usePagedList';
 
 export default function BookingsPage() {
   const { user } = useAuth();
   const navigate = useNavigate();
-  const [items, setItems] = React.useState([]);
-  const [loading, setLoading] = React.useState(true); // Start with true for initial load
-  const [error, setError] = React.useState('');
+  // First page on load, further pages on "Load more"
+  const fetchPage = React.useCallback((next) => apiClient.getMyBookings(next), []);
+  const { items, loading, loadingMore, error: loadError, hasMore, loadMore, refresh } = usePagedList(fetchPage);
+  const [refreshError, setRefreshError] = React.useState('');
+  const error = loadError ? 'Failed to load bookings' : refreshError;
   
   // Review modal state
   const [showReviewModal, setShowReviewModal] = React.useState(false);
@@ -25,29 +28,17 @@ export default function BookingsPage() {
     if (!user && !hasToken) navigate('/auth?next=/bookings', { replace: true });
   }, [user, navigate]);
 
+  // Re-reads the first page only; pages loaded with "Load more" are kept
   const fetchBookings = React.useCallback(async (isPolling = false) => {
     try {
-      const data = await apiClient.getMyBookings();
-      const bookings = Array.isArray(data) ? data : (data?.results ?? []);
-      
-      // Update items state
-      setItems(bookings);
-      
+      await refresh();
       // Clear error on successful fetch
-      setError('');
-      
-      // Only set loading to false after first successful fetch
-      if (loading) {
-        setLoading(false);
-      }
+      setRefreshError('');
     } catch (e) {
       // Only show error for non-polling requests to avoid error spam
-      if (!isPolling) {
-        setError('Failed to load bookings');
-        setLoading(false);
-      }
+      if (!isPolling) setRefreshError('Failed to load bookings');
     }
-  }, [loading]);
+  }, [refresh]);
 
   // Handle booking status updates
   const handleStatusUpdate = async (bookingId, newStatus, booking) => {
@@ -161,10 +152,7 @@ export default function BookingsPage() {
       await fetchBookings(isPolling);
     };
 
-    // Initial fetch
-    fetchAndRefresh(false);
-
-    // Set up real-time polling every 1 second
+    // The first page is loaded by usePagedList; poll it every second
     intervalId = setInterval(() => fetchAndRefresh(true), 1000);
 
     return () => {
@@ -316,6 +304,17 @@ export default function BookingsPage() {
           ))}
         </div>
       )}
+      {!loading && !error && hasMore && (
+        <div className="mt-6 text-center">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="px-4 py-2 text-sm border rounded-lg text-primary hover:bg-accent/10 disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading…' : 'Load more bookings'}
+          </button>
+        </div>
+      )}
       
       {/* Review Modal */}
       {showReviewModal && reviewingBooking && (
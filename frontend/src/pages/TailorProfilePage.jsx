@@ -5,6 +5,7 @@ import apiClient from '../services/apiClient';
 import { SPECIALIZATIONS } from '../constants/specializations';
 import ImageUpload from '../components/ImageUpload.jsx';
 import MultiImageUpload from '../components/MultiImageUpload.jsx';
+import usePagedList from '../hooks/usePagedList';
 
 export default function TailorProfilePage() {
   const { username } = useParams();
@@ -13,7 +14,11 @@ export default function TailorProfilePage() {
 
   const [profile, setProfile] = React.useState(null);
   const [services, setServices] = React.useState([]);
-  const [reviews, setReviews] = React.useState([]);
+  // Reviews load a page at a time ("Show more reviews")
+  const fetchReviews = React.useCallback((next) => apiClient.getTailorReviews(username, next), [username]);
+  const {
+    items: reviews, hasMore: hasMoreReviews, loadingMore: loadingMoreReviews, loadMore: loadMoreReviews,
+  } = usePagedList(fetchReviews);
 
   const [loading, setLoading] = React.useState(true);
   const [error, setError] = React.useState('');
@@ -34,11 +39,9 @@ export default function TailorProfilePage() {
       try {
         const p = await apiClient.request(`/api/marketplace/${encodeURIComponent(username)}/`);
         const s = await apiClient.request(`/api/marketplace/${encodeURIComponent(username)}/services/`);
-        const r = await apiClient.getTailorReviews(username);
         if (!cancelled) {
           setProfile(p);
           setServices(Array.isArray(s) ? s : (s?.results ?? []));
-          setReviews(Array.isArray(r) ? r : (r?.results ?? []));
           setForm({
             bio: p?.bio || '',
             years_experience: p?.years_experience ?? 0,
@@ -406,6 +409,16 @@ export default function TailorProfilePage() {
               ))}
             </div>
           )}
+          {hasMoreReviews && (
+            <button
+              type="button"
+              onClick={loadMoreReviews}
+              disabled={loadingMoreReviews}
+              className="mt-4 text-sm text-primary hover:underline disabled:opacity-50"
+            >
+              {loadingMoreReviews ? 'Loading…' : 'Show more reviews'}
+            </button>
+          )}
         </div>
       </div>
 
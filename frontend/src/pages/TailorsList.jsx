@@ -1,4 +1,4 @@
-import React, { useEffect, useMemo, useState } from 'react';
+import React, { useCallback, useEffect, useMemo, useState } from 'react';
 import { useLocation, useNavigate } from 'react-router-dom';
 import Card from '../components/Card.jsx';
 import Button from '../components/Button.jsx';
@@ -7,9 +7,12 @@ import BookingModal from '../components/BookingModal.jsx';
 import { SPECIALIZATIONS, getSpecializationLabel } from '../constants/specializations';
 import apiClient from '../services/apiClient';
 import useGeolocation from '../hooks/useGeolocation';
+import usePagedList from '../hooks/usePagedList';
 import { useAuth } from '../context/AuthContext.jsx';
 import { geocodeAddress, reverseGeocode } from '../services/geocode';
 
+// Cards carry the tailor's user id, not a row id
+const tailorKey = (tailor) => tailor.user_id ?? tailor.username;
 
 export default function TailorsList() {
   const { search } = useLocation();
@@ -19,9 +22,6 @@ export default function TailorsList() {
   const activeLocation = params.get('location') || '';
   const lat = params.get('lat');
   const lng = params.get('lng');
-  const [items, setItems] = useState([]);
-  const [loading, setLoading] = useState(false);
-  const [error, setError] = useState('');
   const [bookingModalData, setBookingModalData] = useState(null);
 
   // Local search form state (prefilled from URL)
@@ -73,34 +73,23 @@ export default function TailorsList() {
     setBookingModalData({ tailor, service: matchedService });
   };
 
-  useEffect(() => {
-    const controller = new AbortController();
-    async function fetchTailors() {
-      setLoading(true);
-      setError('');
-      try {
-        const filters = {};
-        if (activeLocation) filters.location = activeLocation;
-        if (activeSpec) filters.specialization = activeSpec;
-        if (lat != null && lng != null) {
-          const latNum = Number(lat);
-          const lngNum = Number(lng);
-          if (!Number.isNaN(latNum) && !Number.isNaN(lngNum)) {
-            filters.lat = latNum;
-            filters.lng = lngNum;
-          }
-        }
-        const data = await apiClient.getTailors(filters);
-        setItems(Array.isArray(data) ? data : (data?.results ?? []));
-      } catch (e) {
-        if (e.name !== 'AbortError') setError('Failed to load tailors');
-      } finally {
-        setLoading(false);
+  // First page on every filter change, further pages on "Load more"
+  const fetchPage = useCallback((next) => {
+    const filters = {};
+    if (activeLocation) filters.location = activeLocation;
+    if (activeSpec) filters.specialization = activeSpec;
+    if (lat != null && lng != null) {
+      const latNum = Number(lat);
+      const lngNum = Number(lng);
+      if (!Number.isNaN(latNum) && !Number.isNaN(lngNum)) {
+        filters.lat = latNum;
+        filters.lng = lngNum;
       }
     }
-    fetchTailors();
-    return () => controller.abort();
+    return apiClient.getTailors(filters, next);
   }, [activeLocation, activeSpec, lat, lng]);
+  const { items, loading, loadingMore, error: loadError, hasMore, loadMore } = usePagedList(fetchPage, tailorKey);
+  const error = loadError ? 'Failed to load tailors' : '';
 
   const onSearch = async (e) => {
     e.preventDefault();
@@ -288,6 +277,18 @@ export default function TailorsList() {
             })}
           </div>
         )}
+        {!loading && !error && hasMore && (
+          <div className="mt-8 text-center">
+            <button
+              type="button"
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="px-4 py-3 rounded-xl border text-primary bg-accent/20 hover:bg-accent/30 transition-colors disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading…' : 'Load more tailors'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Booking Modal */}
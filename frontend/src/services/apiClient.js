@@ -175,19 +175,30 @@ class ApiClient {
     }
   }
 
-  async getTailors(filters = {}) {
+  // Keyset-paginated lists ({next, results}): one page per call, returned as
+  // { results, next }. Pass `next` back to load the following page on demand
+  // (null after the last page).
+  async requestPage(path, next = null) {
+    const page = await this.request(next || path);
+    if (Array.isArray(page)) return { results: page, next: null };
+    // `next` is absolute; keep only path + query so API_BASE still applies
+    const url = page?.next ? new URL(page.next) : null;
+    return { results: page?.results ?? [], next: url ? `${url.pathname}${url.search}` : null };
+  }
+
+  async getTailors(filters = {}, next = null) {
     const params = new URLSearchParams();
     if (filters.location) params.set('location', filters.location);
     if (filters.specialization) params.set('specialization', filters.specialization);
     if (filters.lat != null) params.set('lat', String(filters.lat));
     if (filters.lng != null) params.set('lng', String(filters.lng));
     const qs = params.toString();
-    return this.request(`/api/marketplace/tailors/${qs ? `?${qs}` : ''}`);
+    return this.requestPage(`/api/marketplace/tailors/${qs ? `?${qs}` : ''}`, next);
   }
 
-  async getMyBookings() {
+  async getMyBookings(next = null) {
     // Returns bookings for current user (customer: made, tailor: received)
-    return this.request('/api/marketplace/bookings/');
+    return this.requestPage('/api/marketplace/bookings/', next);
   }
 
   async updateBookingStatus(bookingId, status) {
@@ -269,8 +280,8 @@ class ApiClient {
   }
 
   // --- Reviews ---
-  async getMyReviews() {
-    return this.request('/api/marketplace/reviews/');
+  async getMyReviews(next = null) {
+    return this.requestPage('/api/marketplace/reviews/', next);
   }
 
   async createReview(bookingId, rating, comment) {
@@ -284,8 +295,8 @@ class ApiClient {
     });
   }
 
-  async getTailorReviews(username) {
-    return this.request(`/api/marketplace/${username}/reviews/`);
+  async getTailorReviews(username, next = null) {
+    return this.requestPage(`/api/marketplace/${username}/reviews/`, next);
   }
 
   // --- Image Upload Methods ---
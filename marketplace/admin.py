@@ -13,6 +13,8 @@ class TailorProfileAdmin(admin.ModelAdmin):
 	list_display = ("user", "years_experience", "avg_rating", "total_reviews")
 	search_fields = ("user__username", "user__email")
 	filter_horizontal = ("specializations",)
+	# Kept by marketplace.ratings; rebuild with manage.py rebuild_rating_aggregates
+	readonly_fields = TailorProfile.RATING_FIELDS
 
 
 @admin.register(Service)
@@ -0,0 +1,71 @@
+"""Response caching for the tailor search endpoint.
+
+Search responses are cached under keys that embed a global "search
+generation" counter. Any write that can change a search result (tailor
+profile, services, specializations, tailor coordinates) bumps the counter
+from ``marketplace.signals``; stale entries are then simply never read again
+and age out with their TTL, so no key enumeration is needed.
+
+With the default per-process LocMemCache each worker has its own counter
+and would keep serving entries another worker has invalidated, so the
+cache is off (``TAILOR_SEARCH_CACHE_TIMEOUT = 0``) unless ``REDIS_URL``
+points ``CACHES`` at a shared backend.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+SEARCH_GENERATION_KEY = 'marketplace:search:generation'
+
+
+def search_cache_timeout():
+    return getattr(settings, 'TAILOR_SEARCH_CACHE_TIMEOUT', 0)
+
+
+def quantize_coordinate(value):
+    """Snap a coordinate to the cache grid (``TAILOR_SEARCH_CACHE_COORD_PRECISION`` decimals)."""
+    if value is None:
+        return None
+    return round(value, getattr(settings, 'TAILOR_SEARCH_CACHE_COORD_PRECISION', 3))
+
+
+def search_generation():
+    generation = cache.get(SEARCH_GENERATION_KEY)
+    if generation is None:
+        cache.add(SEARCH_GENERATION_KEY, 1, timeout=None)
+        generation = cache.get(SEARCH_GENERATION_KEY, 1)
+    return generation
+
+
+def bump_search_generation():
+    try:
+        cache.incr(SEARCH_GENERATION_KEY)
+    except ValueError:
+        # Key missing (evicted or never read): start a fresh generation
+        cache.set(SEARCH_GENERATION_KEY, 2, timeout=None)
+
+
+def search_cache_key(request, prefix='list'):
+    """Cache key for a search request.
+
+    All query parameters take part in the key so new filters are picked up
+    automatically; lat/lng are quantized so nearby searches share an entry.
+    So do the scheme and host: cached pages hold absolute image URLs and
+    ``next`` links built from the request.
+    """
+    query_params = request.query_params
+    parts = [f'{request.scheme}://{request.get_host()}']
+    for name in sorted(query_params.keys()):
+        values = query_params.getlist(name)
+        if name in ('lat', 'lng'):
+            try:
+                values = [str(quantize_coordinate(float(v))) for v in values]
+            except (TypeError, ValueError):
+                pass
+        elif name == 'specialization':
+            values = [v.strip().lower() for v in values]
+        parts.append(f'{name}={",".join(values)}')
+    digest = hashlib.md5('&'.join(parts).encode('utf-8'), usedforsecurity=False).hexdigest()
+    return f'marketplace:search:{prefix}:g{search_generation()}:{digest}'
@@ -0,0 +1,186 @@
+"""Fast path for tailor list cards.
+
+``TailorProfileSerializer`` walks full model instances (``.user``,
+``.specializations.all()``, ``.profile_image.url``) field by field. For list
+and detail endpoints the same output is assembled here instead:
+
+- The request-independent part of each card (a "fragment") is cached per
+  tailor under a key versioned by ``TailorProfile.updated_at``, so a page
+  costs one ``cache.get_many``. Signals in ``marketplace.signals`` touch
+  ``updated_at`` when the username or specializations change.
+- Fragments missing from the cache are built from ``values()`` rows plus
+  one query for their specializations, without model instances or DRF
+  fields.
+- Per-request fields (``distance_km``, ``matched_service``, absolute image
+  URL) are added afterwards.
+- ``?fields=`` / ``?omit=`` (``core.fieldsets``) trim the cards, and an
+  omitted ``matched_service`` skips its query.
+
+The JSON is identical to the serializer's.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from core.fieldsets import field_selection
+
+from .images import image_urls
+from .models import Specialization, TailorProfile
+from .ratings import STARS, rating_histogram, star_field
+from .search import matched_services_queryset, resolve_specialization_label, specialization_keywords
+
+# Columns of a cached card fragment
+FRAGMENT_COLUMNS = (
+    'id', 'updated_at', 'user_id', 'user__username', 'bio', 'years_experience',
+    'avg_rating', 'total_reviews', 'profile_image', *(star_field(rating) for rating in STARS),
+)
+# Bumped when the fragment layout changes, so old cache entries are not read
+FRAGMENT_VERSION = 2
+# TailorProfileSerializer caps the list at 10
+MAX_CARD_SPECIALIZATIONS = 10
+
+
+def card_cache_timeout():
+    return getattr(settings, 'TAILOR_CARD_CACHE_TIMEOUT', 3600)
+
+
+def card_cache_key(profile_id, updated_at):
+    return f'marketplace:card:v{FRAGMENT_VERSION}:{profile_id}:{updated_at.timestamp():.6f}'
+
+
+def touch_tailor_cards(profiles):
+    """Retire cached fragments for a TailorProfile queryset by bumping updated_at."""
+    profiles.update(updated_at=timezone.now())
+
+
+def tailor_card_values(qs):
+    """``values()`` version of a TailorProfile queryset for ``build_tailor_cards``.
+
+    Only the cache version (id, updated_at), ``distance_km`` and the columns
+    the queryset orders by (so KeysetPagination can read cursor values from
+    the rows); everything else comes from the fragment cache.
+    """
+    names = ['id', 'updated_at']
+    extra = ['distance_km'] if 'distance_km' in qs.query.annotations else []
+    extra += [f.lstrip('-') for f in qs.query.order_by if isinstance(f, str)]
+    for name in extra:
+        if name not in names and name != 'pk':
+            names.append(name)
+    return qs.prefetch_related(None).values(*names)
+
+
+def specializations_by_tailor(tailor_ids):
+    specs = defaultdict(list)
+    if not tailor_ids:
+        return specs
+    rows = (Specialization.objects
+            .filter(tailors__in=tailor_ids)
+            .values_list('tailors', 'id', 'name', 'slug'))
+    for tailor_id, pk, name, slug in rows:
+        specs[tailor_id].append({'id': pk, 'name': str(name), 'slug': str(slug)})
+    return specs
+
+
+def matched_services_by_tailor(tailor_ids, spec_slug):
+    """First matching active service (by name) per tailor, as card dicts."""
+    if not spec_slug or not tailor_ids:
+        return {}
+    keywords = specialization_keywords(spec_slug, resolve_specialization_label(spec_slug))
+    matched = {}
+    rows = (matched_services_queryset(keywords)
+            .filter(tailor_id__in=tailor_ids)
+            .values_list('tailor_id', 'id', 'name', 'price', 'duration_days', 'is_active'))
+    for tailor_id, pk, name, price, duration_days, is_active in rows:
+        matched.setdefault(tailor_id, {
+            'id': pk,
+            'name': name,
+            'price': str(price),
+            'duration_days': duration_days,
+            'is_active': is_active,
+        })
+    return matched
+
+
+def profile_image_url(name):
+    """Storage URL of a profile image (relative for local media)."""
+    return image_urls.url(TailorProfile._meta.get_field('profile_image').storage, name)
+
+
+def load_card_fragments(profile_ids):
+    """Build fragments from the database: {profile_id: (updated_at, fragment)}."""
+    rows = TailorProfile.objects.filter(pk__in=profile_ids).values(*FRAGMENT_COLUMNS)
+    specs = specializations_by_tailor(profile_ids)
+    fragments = {}
+    for row in rows:
+        fragments[row['id']] = (row['updated_at'], {
+            'user_id': row['user_id'],
+            'username': row['user__username'],
+            'bio': str(row['bio']) if row['bio'] else '',
+            'years_experience': int(row['years_experience']) if row['years_experience'] else 0,
+            'avg_rating': float(row['avg_rating']) if row['avg_rating'] else 0.0,
+            'total_reviews': int(row['total_reviews']) if row['total_reviews'] else 0,
+            'rating_histogram': rating_histogram(row),
+            'specializations': specs[row['id']][:MAX_CARD_SPECIALIZATIONS],
+            'profile_image': profile_image_url(row['profile_image']),
+        })
+    return fragments
+
+
+def card_fragments(versions):
+    """Fragments for (profile_id, updated_at) pairs: one get_many, one set_many."""
+    timeout = card_cache_timeout()
+    if not timeout:
+        return {pk: fragment for pk, (_, fragment) in load_card_fragments([pk for pk, _ in versions]).items()}
+
+    keys = {card_cache_key(pk, updated_at): pk for pk, updated_at in versions}
+    fragments = {keys[key]: fragment for key, fragment in cache.get_many(keys).items()}
+    missing = [pk for pk, _ in versions if pk not in fragments]
+    if missing:
+        loaded = load_card_fragments(missing)
+        cache.set_many(
+            {card_cache_key(pk, updated_at): fragment for pk, (updated_at, fragment) in loaded.items()},
+            timeout,
+        )
+        fragments.update((pk, fragment) for pk, (_, fragment) in loaded.items())
+    return fragments
+
+
+def build_tailor_cards(rows, context=None):
+    """Card dicts for rows from ``tailor_card_values``, in row order."""
+    context = context or {}
+    request = context.get('request')
+    selection = field_selection(request)
+    fragments = card_fragments([(row['id'], row['updated_at']) for row in rows])
+    matched = {}
+    if selection.keeps('matched_service'):
+        matched = matched_services_by_tailor([row['id'] for row in rows], context.get('specialization'))
+
+    cards = []
+    for row in rows:
+        fragment = fragments.get(row['id'])
+        if fragment is None:
+            # Deleted since the page query ran
+            continue
+        image = fragment['profile_image']
+        if image and request is not None and not image.startswith('http'):
+            image = request.build_absolute_uri(image)
+        card = {
+            'user_id': fragment['user_id'],
+            'username': fragment['username'],
+            'bio': fragment['bio'],
+            'years_experience': fragment['years_experience'],
+            'avg_rating': fragment['avg_rating'],
+            'total_reviews': fragment['total_reviews'],
+            'rating_histogram': fragment['rating_histogram'],
+            'specializations': fragment['specializations'],
+            'distance_km': row.get('distance_km'),
+            'matched_service': matched.get(row['id']),
+            'profile_image': image,
+        }
+        if not selection.is_default:
+            card = {key: value for key, value in card.items() if selection.keeps(key)}
+        cards.append(card)
+    return cards
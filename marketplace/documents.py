@@ -0,0 +1,111 @@
+"""Build and refresh TailorSearchDocument rows.
+
+Called incrementally from ``marketplace.signals`` with the ids of the
+profiles a write touched, and in bulk from the ``rebuild_search_documents``
+management command. Migrations 0008 and 0012 fill or clear documents
+without their ``card``; ``rebuild_search_documents --stale`` completes
+just those.
+"""
+
+from django.db.models import Prefetch, Q
+
+from .models import TailorProfile, TailorSearchDocument, Service
+
+DOCUMENT_UPDATE_FIELDS = [
+    'user_id', 'username', 'latitude', 'longitude', 'avg_rating', 'total_reviews',
+    'years_experience', 'specialization_slugs', 'specialization_names', 'min_price',
+    'services', 'card', 'search_text', 'updated_at',
+]
+
+
+def _delimited(values):
+    values = [v for v in values if v]
+    return f"|{'|'.join(values)}|" if values else ''
+
+
+def profiles_for_documents():
+    return (TailorProfile.objects
+            .select_related('user')
+            .prefetch_related(
+                'specializations',
+                Prefetch(
+                    'services',
+                    queryset=Service.objects.filter(is_active=True).order_by('name'),
+                    to_attr='active_services',
+                ),
+            ))
+
+
+def build_search_document(profile):
+    """Return an unsaved TailorSearchDocument for a profile loaded by profiles_for_documents()."""
+    from .serializers import TailorProfileSerializer
+
+    specs = list(profile.specializations.all())
+    services = [
+        {
+            'id': svc.id,
+            'name': svc.name,
+            'price': str(svc.price),
+            'duration_days': svc.duration_days,
+            'is_active': svc.is_active,
+        }
+        for svc in profile.active_services
+    ]
+    prices = [svc.price for svc in profile.active_services]
+    text_parts = [profile.bio]
+    text_parts += [s.name for s in specs]
+    for svc in profile.active_services:
+        text_parts += [svc.name, svc.description]
+    return TailorSearchDocument(
+        profile_id=profile.pk,
+        user_id=profile.user_id,
+        username=profile.user.username,
+        latitude=profile.user.latitude,
+        longitude=profile.user.longitude,
+        avg_rating=profile.avg_rating,
+        total_reviews=profile.total_reviews,
+        years_experience=profile.years_experience,
+        specialization_slugs=_delimited(s.slug.lower() for s in specs),
+        specialization_names=_delimited(s.name.lower() for s in specs),
+        min_price=min(prices) if prices else None,
+        services=services,
+        card=TailorProfileSerializer(profile).data,
+        search_text='\n'.join(part for part in text_parts if part),
+    )
+
+
+def refresh_search_documents(profile_ids=None, batch_size=500, stale_only=False):
+    """Upsert documents for the given profiles (all profiles when None).
+
+    ``stale_only`` limits that to profiles without a document or whose card
+    is empty (rows written by migrations, which cannot run the serializer).
+    Returns the number of documents written.
+    """
+    profiles = profiles_for_documents()
+    if stale_only:
+        profiles = profiles.filter(Q(search_document__isnull=True) | Q(search_document__card={}))
+    if profile_ids is not None:
+        profile_ids = [pk for pk in profile_ids if pk is not None]
+        if not profile_ids:
+            return 0
+        profiles = profiles.filter(pk__in=profile_ids)
+    written = 0
+    batch = []
+    for profile in profiles.order_by('pk').iterator(chunk_size=batch_size):
+        batch.append(build_search_document(profile))
+        if len(batch) >= batch_size:
+            written += _upsert(batch)
+            batch = []
+    if batch:
+        written += _upsert(batch)
+    return written
+
+
+def _upsert(documents):
+    TailorSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['profile'],
+        update_fields=DOCUMENT_UPDATE_FIELDS,
+    )
+    return len(documents)
@@ -0,0 +1,100 @@
+"""Full-text search over TailorSearchDocument.search_text.
+
+The index is backend specific (created in migration 0008):
+
+- PostgreSQL: GIN expression index on ``to_tsvector('simple', search_text)``,
+  queried with ``websearch_to_tsquery`` and ranked with ``ts_rank``.
+- SQLite: an external-content FTS5 table kept in sync by triggers, queried
+  with ``MATCH`` and ranked with ``bm25``.
+- Anything else (or SQLite built without FTS5): unranked ``icontains`` on
+  every term.
+
+``filter_fulltext`` works on any queryset whose pk is the tailor profile id,
+i.e. both TailorProfile and TailorSearchDocument, and annotates a
+``relevance`` score where higher is better.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import F, FloatField, Func, OuterRef, Q, Subquery, Value
+from django.db.models.expressions import RawSQL
+
+from .models import TailorSearchDocument
+
+FTS_TABLE = 'marketplace_tailorsearchdocument_fts'
+SEARCH_CONFIG = 'simple'
+
+_sqlite_fts_available = None
+
+
+def sqlite_fts_available():
+    global _sqlite_fts_available
+    if _sqlite_fts_available is None:
+        _sqlite_fts_available = FTS_TABLE in connection.introspection.table_names()
+    return _sqlite_fts_available
+
+
+def query_terms(query):
+    return re.findall(r'\w+', query or '', flags=re.UNICODE)
+
+
+def fts5_match_expression(terms):
+    # Quote every term so user input can't inject FTS5 syntax; prefix-match
+    # so "embroid" finds "embroidery".
+    return ' AND '.join('"{}"*'.format(term.replace('"', '')) for term in terms)
+
+
+class FTS5Relevance(Func):
+    """Negated bm25 score of the FTS5 row matching the outer pk."""
+
+    output_field = FloatField()
+
+    def __init__(self, match, pk_expression):
+        super().__init__(Value(match), pk_expression)
+
+    def as_sql(self, compiler, connection, **extra):
+        match_sql, match_params = compiler.compile(self.source_expressions[0])
+        pk_sql, pk_params = compiler.compile(self.source_expressions[1])
+        sql = (
+            f'(SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH {match_sql} AND rowid = {pk_sql})'
+        )
+        return sql, (*match_params, *pk_params)
+
+
+def filter_fulltext(qs, query):
+    """Restrict ``qs`` to tailors matching ``query`` and annotate ``relevance``."""
+    terms = query_terms(query)
+    if not terms:
+        return qs.annotate(relevance=Value(0.0, output_field=FloatField()))
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        vector = SearchVector('search_text', config=SEARCH_CONFIG)
+        search_query = SearchQuery(' '.join(terms), config=SEARCH_CONFIG, search_type='websearch')
+        matching = (TailorSearchDocument.objects
+                    .annotate(search_vector=vector)
+                    .filter(search_vector=search_query))
+        rank = (matching
+                .filter(pk=OuterRef('pk'))
+                .annotate(rank=SearchRank(vector, search_query))
+                .values('rank')[:1])
+        return (qs
+                .filter(pk__in=matching.values('pk'))
+                .annotate(relevance=Subquery(rank, output_field=FloatField())))
+
+    if connection.vendor == 'sqlite' and sqlite_fts_available():
+        match = fts5_match_expression(terms)
+        return (qs
+                .filter(pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]))
+                .annotate(relevance=FTS5Relevance(match, F('pk'))))
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(search_text__icontains=term)
+    matching = TailorSearchDocument.objects.filter(condition)
+    return (qs
+            .filter(pk__in=matching.values('pk'))
+            .annotate(relevance=Value(0.0, output_field=FloatField())))
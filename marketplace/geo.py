@@ -0,0 +1,559 @@
+"""Geo helpers for tailor search.
+
+Tailor coordinates live on ``users.User`` (latitude/longitude floats). The
+search endpoint needs "which tailors are within R km of (lat, lng)", which a
+plain float-column filter answers with a full scan. ``TailorGeoIndex`` keeps a
+uniform lat/lng grid of tailor coordinates in process memory so a radius query
+only looks at a handful of cells and hands the database a short ``id__in``
+list instead.
+"""
+
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Avg, BooleanField, Count, F, FloatField, Func, Q, Value
+from django.db.models.functions import ACos, Cos, Floor, Greatest, Least, Radians, Sin
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:  # optional: pure-Python fallbacks below
+    np = None
+
+EARTH_RADIUS_KM = 6371.0
+# Half the circumference: every point on Earth is within this distance
+MAX_RADIUS_KM = math.pi * EARTH_RADIUS_KM
+
+
+def valid_coordinates(lat, lng):
+    """Whether (lat, lng) are finite degrees within [-90, 90] and [-180, 180]."""
+    return -90 <= lat <= 90 and -180 <= lng <= 180
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_matrix_km(origins, points):
+    """Haversine distances from every origin to every point.
+
+    ``origins`` and ``points`` are sequences of (lat, lng). Returns an
+    N x M array with NumPy installed, otherwise a list of N lists.
+    """
+    if np is None:
+        return [[haversine_km(o_lat, o_lng, p_lat, p_lng) for p_lat, p_lng in points]
+                for o_lat, o_lng in origins]
+    o = np.radians(np.asarray(origins, dtype=float).reshape(-1, 2))
+    p = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+    o_lat, o_lng = o[:, 0:1], o[:, 1:2]
+    p_lat, p_lng = p[:, 0], p[:, 1]
+    a = (np.sin((p_lat - o_lat) / 2) ** 2
+         + np.cos(o_lat) * np.cos(p_lat) * np.sin((p_lng - o_lng) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def nearest_within(distances, radius_km, limit):
+    """Indices of the ``limit`` smallest distances <= ``radius_km``, nearest first.
+
+    ``distances`` is one row of ``distance_matrix_km``; ties keep their
+    input order, so points sorted by pk stay sorted by pk.
+    """
+    if np is None:
+        hits = [i for i, d in enumerate(distances) if d <= radius_km]
+        return sorted(hits, key=distances.__getitem__)[:limit]
+    hits = np.flatnonzero(distances <= radius_km)
+    order = np.argsort(distances[hits], kind='stable')[:limit]
+    return hits[order].tolist()
+
+
+def bounding_box(lat, lng, radius_km):
+    """Return (min_lat, max_lat, min_lng, max_lng) enclosing the radius.
+
+    Longitudes are not wrapped: the box may reach below -180 or above 180
+    when the circle crosses the antimeridian (see ``longitude_ranges``). A
+    circle over a pole spans every longitude.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    lat_delta = math.degrees(angle)
+    min_lat, max_lat = lat - lat_delta, lat + lat_delta
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+    lng_delta = math.degrees(math.asin(min(1.0, math.sin(angle) / math.cos(math.radians(lat)))))
+    return min_lat, max_lat, lng - lng_delta, lng + lng_delta
+
+
+def longitude_ranges(min_lng, max_lng):
+    """Split a ``bounding_box`` longitude span into ranges within [-180, 180]."""
+    if max_lng - min_lng >= 360:
+        return [(-180.0, 180.0)]
+    if min_lng < -180:
+        return [(min_lng + 360, 180.0), (-180.0, max_lng)]
+    if max_lng > 180:
+        return [(min_lng, 180.0), (-180.0, max_lng - 360)]
+    return [(min_lng, max_lng)]
+
+
+def bounding_box_q(lat, lng, radius_km, lat_field, lng_field):
+    """Q object for rows inside the ``bounding_box`` of the radius."""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    lngs = Q()
+    for west, east in longitude_ranges(min_lng, max_lng):
+        lngs |= Q(**{f'{lng_field}__gte': west, f'{lng_field}__lte': east})
+    return Q(**{f'{lat_field}__gte': min_lat, f'{lat_field}__lte': max_lat}) & lngs
+
+
+def _sqlite_haversine_km(lat1, lng1, lat2, lng2):
+    if lat1 is None or lng1 is None or lat2 is None or lng2 is None:
+        return None
+    return haversine_km(lat1, lng1, lat2, lng2)
+
+
+def register_sqlite_functions(db_connection):
+    """Expose ``HAVERSINE_KM(lat1, lng1, lat2, lng2)`` on a SQLite connection.
+
+    One native call per row is as cheap as the arithmetic surrogate we used
+    before, and unlike chaining Django's per-function trig shims it keeps the
+    whole distance in a single Python callback.
+    """
+    db_connection.connection.create_function(
+        'HAVERSINE_KM', 4, _sqlite_haversine_km, deterministic=True,
+    )
+
+
+class GreatCircleDistance(Func):
+    """SQLite great-circle distance via the registered HAVERSINE_KM function."""
+
+    function = 'HAVERSINE_KM'
+    output_field = FloatField()
+
+    def __init__(self, lat, lng, lat_field, lng_field):
+        super().__init__(F(lat_field), F(lng_field), Value(lat), Value(lng))
+
+
+def distance_expression(lat, lng, lat_field='user__latitude', lng_field='user__longitude'):
+    """Annotation computing km from (lat, lng) to the given coordinate columns."""
+    if connection.vendor == 'sqlite':
+        return GreatCircleDistance(lat, lng, lat_field, lng_field)
+    user_lat = F(lat_field)
+    user_lng = F(lng_field)
+    acos_arg = (
+        Cos(Radians(Value(lat))) * Cos(Radians(user_lat)) * Cos(Radians(user_lng - Value(lng))) +
+        Sin(Radians(Value(lat))) * Sin(Radians(user_lat))
+    )
+    clamped = Least(Value(1.0), Greatest(Value(-1.0), acos_arg))
+    return Value(EARTH_RADIUS_KM) * ACos(clamped, output_field=FloatField())
+
+
+class TailorGeoIndex:
+    """Uniform grid of tailor coordinates keyed by user id.
+
+    The grid is built lazily from the database on first use in each worker
+    and kept current by the signal handlers in ``marketplace.signals``.
+    Signals only fire in the process that performed the write, so every
+    lookup first re-reads the tailors whose ``TailorProfile.updated_at``
+    moved since the last one (saving a tailor's coordinates bumps it), with
+    ``TAILOR_GEO_INDEX_SYNC_OVERLAP`` seconds of overlap for transactions
+    that committed late. At most one sync runs per
+    ``TAILOR_GEO_INDEX_SYNC_INTERVAL`` seconds, and its query runs outside
+    the lock: concurrent lookups use the grid as it is meanwhile. The whole
+    grid is still rebuilt after ``TAILOR_GEO_INDEX_TTL`` seconds as a
+    backstop.
+    """
+
+    def __init__(self, cell_deg=None, ttl=None):
+        self._cell_deg = cell_deg
+        self._ttl = ttl
+        self._lock = threading.RLock()
+        self._cells = defaultdict(set)
+        self._points = {}
+        self._built_at = None
+        # Wall-clock time the last build or sync read the database from
+        self._synced_at = None
+        # Monotonic time the last sync started; set while one is running
+        self._sync_started = None
+        self._syncing = False
+        # Bumped by every build, so a sync that overlapped one is dropped
+        self._generation = 0
+
+    @property
+    def cell_deg(self):
+        if self._cell_deg is None:
+            return float(getattr(settings, 'TAILOR_GEO_INDEX_CELL_DEG', 0.1))
+        return self._cell_deg
+
+    @property
+    def ttl(self):
+        if self._ttl is None:
+            return getattr(settings, 'TAILOR_GEO_INDEX_TTL', 300)
+        return self._ttl
+
+    def _cell(self, lat, lng):
+        size = self.cell_deg
+        return (math.floor(lat / size), math.floor(lng / size))
+
+    def _add(self, user_id, lat, lng):
+        self._points[user_id] = (lat, lng)
+        self._cells[self._cell(lat, lng)].add(user_id)
+
+    def _remove(self, user_id):
+        point = self._points.pop(user_id, None)
+        if point is None:
+            return
+        key = self._cell(*point)
+        bucket = self._cells.get(key)
+        if bucket is not None:
+            bucket.discard(user_id)
+            if not bucket:
+                del self._cells[key]
+
+    @property
+    def is_built(self):
+        return self._built_at is not None
+
+    def build(self):
+        """(Re)load every tailor with coordinates from the database."""
+        from .models import TailorProfile
+
+        rows = (TailorProfile.objects
+                .filter(user__latitude__isnull=False, user__longitude__isnull=False)
+                .values_list('user_id', 'user__latitude', 'user__longitude'))
+        with self._lock:
+            started = timezone.now()
+            self._cells = defaultdict(set)
+            self._points = {}
+            for user_id, lat, lng in rows.iterator():
+                self._add(user_id, lat, lng)
+            self._built_at = time.monotonic()
+            self._synced_at = started
+            self._generation += 1
+
+    def sync(self):
+        """Re-read tailors whose profile changed since the last build or sync.
+
+        Skipped while another thread is syncing or within
+        ``TAILOR_GEO_INDEX_SYNC_INTERVAL`` seconds of the last sync.
+        """
+        from .models import TailorProfile
+
+        overlap = timezone.timedelta(seconds=getattr(settings, 'TAILOR_GEO_INDEX_SYNC_OVERLAP', 60))
+        interval = getattr(settings, 'TAILOR_GEO_INDEX_SYNC_INTERVAL', 1.0)
+        with self._lock:
+            now = time.monotonic()
+            if self._syncing or self._synced_at is None:
+                return
+            if interval and self._sync_started is not None and now - self._sync_started < interval:
+                return
+            self._syncing = True
+            self._sync_started = now
+            since = self._synced_at - overlap
+            generation = self._generation
+        try:
+            started = timezone.now()
+            rows = list(TailorProfile.objects
+                        .filter(updated_at__gte=since)
+                        .values_list('user_id', 'user__latitude', 'user__longitude'))
+        finally:
+            with self._lock:
+                self._syncing = False
+        with self._lock:
+            if generation != self._generation:
+                # Rebuilt meanwhile from newer data
+                return
+            for user_id, lat, lng in rows:
+                self._remove(user_id)
+                if lat is not None and lng is not None:
+                    self._add(user_id, lat, lng)
+            self._synced_at = max(self._synced_at, started)
+
+    def ensure_built(self, sync=True):
+        """Build the grid if missing or older than the TTL, else sync it when ``sync``."""
+        with self._lock:
+            stale = (
+                self._built_at is None
+                or (self.ttl and time.monotonic() - self._built_at > self.ttl)
+            )
+            if stale:
+                self.build()
+                return
+        if sync:
+            self.sync()
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def upsert(self, user_id, lat, lng):
+        with self._lock:
+            if not self.is_built:
+                return
+            self._remove(user_id)
+            if lat is not None and lng is not None:
+                self._add(user_id, lat, lng)
+
+    def discard(self, user_id):
+        with self._lock:
+            if self.is_built:
+                self._remove(user_id)
+
+    def __contains__(self, user_id):
+        return user_id in self._points
+
+    def __len__(self):
+        return len(self._points)
+
+    def within(self, lat, lng, radius_km, limit=None, sync=True):
+        """Return user ids of tailors within ``radius_km`` of (lat, lng).
+
+        Returns ``None`` when more than ``limit`` tailors match, so callers can
+        fall back to a database-side filter rather than build a huge IN list.
+        Callers looking up several radii in one request pass ``sync=False``
+        after the first.
+        """
+        if limit is None:
+            limit = getattr(settings, 'TAILOR_GEO_INDEX_MAX_CANDIDATES', 5000)
+        self.ensure_built(sync=sync)
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+        size = self.cell_deg
+        lo_i, hi_i = math.floor(min_lat / size), math.floor(max_lat / size)
+        spans = [
+            (math.floor(west / size), math.floor(east / size))
+            for west, east in longitude_ranges(min_lng, max_lng)
+        ]
+        found = []
+        with self._lock:
+            n_cells = (hi_i - lo_i + 1) * sum(hi_j - lo_j + 1 for lo_j, hi_j in spans)
+            if n_cells <= len(self._cells):
+                buckets = (
+                    self._cells.get((i, j), ())
+                    for i in range(lo_i, hi_i + 1)
+                    for lo_j, hi_j in spans
+                    for j in range(lo_j, hi_j + 1)
+                )
+            else:
+                # Very large radius: walking occupied cells is cheaper than
+                # probing every cell in the box.
+                buckets = (
+                    ids for (i, j), ids in self._cells.items()
+                    if lo_i <= i <= hi_i and any(lo_j <= j <= hi_j for lo_j, hi_j in spans)
+                )
+            points = self._points
+            for bucket in buckets:
+                for user_id in bucket:
+                    p_lat, p_lng = points[user_id]
+                    if haversine_km(lat, lng, p_lat, p_lng) <= radius_km:
+                        found.append(user_id)
+                        if limit and len(found) > limit:
+                            return None
+        return found
+
+
+tailor_index = TailorGeoIndex()
+
+
+# --- Geo backends -----------------------------------------------------------
+#
+# How radius filtering and distance are computed in SQL. The float backend
+# works everywhere; on PostgreSQL, migration 0009 adds a GiST expression
+# index over users_user(latitude, longitude) when PostGIS or
+# cube/earthdistance can be enabled, and the matching backend then answers
+# radius queries with ST_DWithin / earth_box and nearest-neighbour ordering
+# with the KNN ``<->`` operator, all from that index.
+
+
+class FloatGeoBackend:
+    """Plain float columns: in-memory grid (or bounding box) + haversine."""
+
+    name = 'float'
+    supports_knn = False
+
+    def filter_near(self, qs, lat, lng, radius_km, lat_field, lng_field, sync_index=True):
+        # Candidate tailors from the in-memory grid; falls back to a
+        # bounding box pre-filter when the index is disabled or the radius
+        # covers too many tailors for a compact IN list.
+        candidate_ids = None
+        if getattr(settings, 'TAILOR_GEO_INDEX_ENABLED', True):
+            candidate_ids = tailor_index.within(lat, lng, radius_km, sync=sync_index)
+        if candidate_ids is not None:
+            qs = qs.filter(user_id__in=candidate_ids)
+        else:
+            qs = qs.filter(bounding_box_q(lat, lng, radius_km, lat_field, lng_field))
+        return (qs
+                .annotate(distance_km=distance_expression(lat, lng, lat_field, lng_field))
+                .filter(distance_km__lte=radius_km))
+
+    def knn_order(self, lat, lng, lat_field, lng_field):
+        return None
+
+
+class _IndexedPoint(Func):
+    """Raw SQL over the (lat, lng) columns and a bound origin/radius.
+
+    ``sql_template`` may reference %(lat)s and %(lng)s (the columns) and
+    %(olat)s, %(olng)s and %(radius_m)s (query parameters).
+    """
+
+    sql_template = None
+    names = ('lat', 'lng', 'olat', 'olng', 'radius_m')
+
+    def __init__(self, sql_template, lat_field, lng_field, lat, lng, radius_m=0.0, **extra):
+        self.sql_template = sql_template
+        super().__init__(F(lat_field), F(lng_field), Value(lat), Value(lng), Value(radius_m), **extra)
+
+    def as_sql(self, compiler, connection, **extra):
+        compiled = dict(zip(self.names, (compiler.compile(e) for e in self.source_expressions)))
+        params = []
+
+        def substitute(match):
+            # Placeholders are replaced left to right, so params stay in order
+            part_sql, part_params = compiled[match.group(1)]
+            params.extend(part_params)
+            return part_sql
+
+        sql = re.sub(r'%\((\w+)\)s', substitute, self.sql_template)
+        return f'({sql})', params
+
+
+POSTGIS_POINT = 'ST_SetSRID(ST_MakePoint(%(lng)s, %(lat)s), 4326)::geography'
+POSTGIS_ORIGIN = 'ST_SetSRID(ST_MakePoint(%(olng)s::float8, %(olat)s::float8), 4326)::geography'
+EARTH_POINT = 'll_to_earth(%(lat)s, %(lng)s)'
+EARTH_ORIGIN = 'll_to_earth(%(olat)s::float8, %(olng)s::float8)'
+
+
+class _IndexedGeoBackend:
+    supports_knn = True
+    point = origin = within_sql = distance_sql = knn_sql = None
+
+    def _expr(self, template, output_field, lat, lng, lat_field, lng_field, radius_m=0.0):
+        sql_template = template.format(point=self.point, origin=self.origin)
+        return _IndexedPoint(sql_template, lat_field, lng_field, lat, lng, radius_m, output_field=output_field)
+
+    def filter_near(self, qs, lat, lng, radius_km, lat_field, lng_field, sync_index=True):
+        # No in-memory grid here: sync_index does not apply
+        radius_m = radius_km * 1000.0
+        within = self._expr(self.within_sql, BooleanField(), lat, lng, lat_field, lng_field, radius_m)
+        distance = self._expr(self.distance_sql, FloatField(), lat, lng, lat_field, lng_field)
+        return qs.filter(within).annotate(distance_km=distance)
+
+    def knn_order(self, lat, lng, lat_field, lng_field):
+        return self._expr(self.knn_sql, FloatField(), lat, lng, lat_field, lng_field).asc()
+
+
+class PostGISGeoBackend(_IndexedGeoBackend):
+    name = 'postgis'
+    point = POSTGIS_POINT
+    origin = POSTGIS_ORIGIN
+    within_sql = 'ST_DWithin({point}, {origin}, %(radius_m)s::float8)'
+    distance_sql = 'ST_Distance({point}, {origin}) / 1000.0'
+    knn_sql = '{point} <-> {origin}'
+
+
+class EarthDistanceGeoBackend(_IndexedGeoBackend):
+    name = 'earthdistance'
+    point = EARTH_POINT
+    origin = EARTH_ORIGIN
+    # earth_box is the index-backed (slightly loose) box; earth_distance trims it
+    within_sql = (
+        'earth_box({origin}, %(radius_m)s::float8) @> {point} '
+        'AND earth_distance({origin}, {point}) <= %(radius_m)s::float8'
+    )
+    distance_sql = 'earth_distance({origin}, {point}) / 1000.0'
+    knn_sql = '{point} <-> {origin}'
+
+
+GEO_BACKENDS = {
+    backend.name: backend
+    for backend in (FloatGeoBackend(), PostGISGeoBackend(), EarthDistanceGeoBackend())
+}
+
+_detected_backend = None
+
+
+def detect_geo_backend():
+    """Pick the best backend the database supports (cached per process)."""
+    global _detected_backend
+    if _detected_backend is None:
+        name = 'float'
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT indexname FROM pg_indexes WHERE tablename = 'users_user' "
+                    "AND indexname IN ('users_user_geog_gist', 'users_user_earth_gist')"
+                )
+                indexes = {row[0] for row in cursor.fetchall()}
+            if 'users_user_geog_gist' in indexes:
+                name = 'postgis'
+            elif 'users_user_earth_gist' in indexes:
+                name = 'earthdistance'
+        _detected_backend = GEO_BACKENDS[name]
+    return _detected_backend
+
+
+def get_geo_backend():
+    """Backend named by ``TAILOR_GEO_BACKEND`` ('auto' detects the best one)."""
+    name = getattr(settings, 'TAILOR_GEO_BACKEND', 'auto')
+    if name == 'auto':
+        return detect_geo_backend()
+    return GEO_BACKENDS[name]
+
+
+# --- Map viewport ------------------------------------------------------------
+
+
+def parse_bbox(raw):
+    """Parse ``west,south,east,north`` (Leaflet's toBBoxString order).
+
+    Returns (min_lat, max_lat, west, east), or raises ValueError. ``west``
+    may be greater than ``east`` when the box crosses the antimeridian.
+    """
+    west, south, east, north = (float(part) for part in raw.split(','))
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise ValueError(raw)
+    return south, north, west, east
+
+
+def filter_bbox(qs, bbox, lat_field, lng_field):
+    """Restrict ``qs`` to rows whose coordinates fall inside ``bbox``."""
+    min_lat, max_lat, west, east = bbox
+    qs = qs.filter(**{f'{lat_field}__gte': min_lat, f'{lat_field}__lte': max_lat})
+    if west <= east:
+        return qs.filter(**{f'{lng_field}__gte': west, f'{lng_field}__lte': east})
+    return qs.filter(Q(**{f'{lng_field}__gte': west}) | Q(**{f'{lng_field}__lte': east}))
+
+
+def cluster_cell_deg(zoom):
+    """Grid cell size in degrees for a web-map zoom level.
+
+    A 256px tile spans 360 / 2**zoom degrees of longitude; a cell covers
+    ``TAILOR_MAP_CLUSTER_PX`` pixels of it.
+    """
+    cell_px = getattr(settings, 'TAILOR_MAP_CLUSTER_PX', 64)
+    return 360.0 / (2 ** zoom) * cell_px / 256.0
+
+
+def grid_clusters(qs, cell_deg, lat_field, lng_field):
+    """Group rows into ``cell_deg`` grid cells in one GROUP BY query.
+
+    Returns ``[lat, lng, count]`` per occupied cell, positioned at the mean
+    coordinate of its members so markers sit where the tailors actually are.
+    """
+    rows = (qs
+            .order_by()
+            .annotate(
+                cell_i=Floor(F(lat_field) / cell_deg),
+                cell_j=Floor(F(lng_field) / cell_deg),
+            )
+            .values('cell_i', 'cell_j')
+            .annotate(count=Count('pk'), lat=Avg(lat_field), lng=Avg(lng_field))
+            .values_list('lat', 'lng', 'count'))
+    return [[round(lat, 6), round(lng, 6), count] for lat, lng, count in rows]
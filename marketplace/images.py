@@ -0,0 +1,77 @@
+"""Resolved URLs for uploaded images (service, review and profile photos).
+
+``FieldFile.url`` asks the storage backend every time; with Cloudinary that
+means building (and signing) a delivery URL per image per request. Stored
+names never change once uploaded, so the URL for a given name is memoized
+per worker, keyed by the storage mode (``USE_CLOUDINARY``) and the name.
+Uploads prime the memo from ``marketplace.signals``.
+"""
+
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework import serializers
+
+
+class ImageURLMemo:
+    """Bounded LRU of storage name -> URL."""
+
+    def __init__(self, maxsize=None):
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._urls = OrderedDict()
+
+    @property
+    def maxsize(self):
+        if self._maxsize is None:
+            return getattr(settings, 'IMAGE_URL_MEMO_SIZE', 10000)
+        return self._maxsize
+
+    def url(self, storage, name):
+        """URL of a stored file (None when unnamed or the storage fails)."""
+        if not name:
+            return None
+        key = (getattr(settings, 'USE_CLOUDINARY', False), name)
+        with self._lock:
+            url = self._urls.get(key)
+            if url is not None:
+                self._urls.move_to_end(key)
+                return url
+        try:
+            url = str(storage.url(name))
+        except Exception:
+            return None
+        with self._lock:
+            self._urls[key] = url
+            if len(self._urls) > self.maxsize:
+                self._urls.popitem(last=False)
+        return url
+
+    def clear(self):
+        with self._lock:
+            self._urls.clear()
+
+
+image_urls = ImageURLMemo()
+
+
+def resolve_image_url(field_file, request=None):
+    """Memoized URL, made absolute against ``request`` when it is a local path."""
+    if not field_file:
+        return None
+    url = image_urls.url(field_file.storage, field_file.name)
+    if url and request is not None and not url.startswith('http'):
+        return request.build_absolute_uri(url)
+    return url
+
+
+class ResolvedImageField(serializers.ImageField):
+    """ImageField whose output comes from the URL memo.
+
+    Cloudinary URLs are returned as-is, local media paths are made absolute
+    with the request, and storage errors render as null.
+    """
+
+    def to_representation(self, value):
+        return resolve_image_url(value, self.context.get('request'))
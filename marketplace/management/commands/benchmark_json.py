@@ -0,0 +1,59 @@
+import io
+import json
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import FastJSONParser, FastJSONRenderer, orjson
+from marketplace.models import Booking, Review, Service, TailorProfile
+from marketplace.serializers import BookingSerializer, ReviewSerializer, ServiceSerializer, TailorProfileSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare DRF's JSONRenderer/JSONParser with the orjson-backed ones on real serializer output."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200, help='Rows per payload (default 200)')
+        parser.add_argument('--number', type=int, default=200, help='Timed iterations per payload (default 200)')
+
+    def payloads(self, rows):
+        bookings = Booking.objects.select_related('customer', 'tailor', 'service', 'review').order_by('-id')[:rows]
+        services = (Service.objects.select_related('tailor__user').prefetch_related('images')
+                    .order_by('id')[:rows])
+        reviews = (Review.objects.select_related('customer', 'tailor', 'booking__service')
+                   .prefetch_related('images').order_by('-id')[:rows])
+        tailors = (TailorProfile.objects.select_related('user').prefetch_related('specializations')
+                   .order_by('-avg_rating', 'id')[:rows])
+        return {
+            'bookings': {'results': BookingSerializer(bookings, many=True).data},
+            'services': {'results': ServiceSerializer(services, many=True).data},
+            'reviews': {'results': ReviewSerializer(reviews, many=True).data},
+            'tailors': {'next': None, 'results': TailorProfileSerializer(tailors, many=True).data},
+        }
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError('orjson is not installed; FastJSONRenderer would fall back to JSONRenderer.')
+        number = options['number']
+        baseline, fast = JSONRenderer(), FastJSONRenderer()
+        baseline_parser, fast_parser = JSONParser(), FastJSONParser()
+
+        self.stdout.write(f"{'payload':<10} {'rows':>5} {'bytes':>8} {'render drf':>11} {'render fast':>12} "
+                          f"{'x':>5} {'parse drf':>10} {'parse fast':>11} {'x':>5}")
+        for name, data in self.payloads(options['rows']).items():
+            expected = baseline.render(data)
+            body = fast.render(data)
+            if json.loads(body) != json.loads(expected):
+                raise CommandError(f'{name}: FastJSONRenderer output differs from JSONRenderer')
+
+            render_drf = timeit.timeit(lambda: baseline.render(data), number=number) / number
+            render_fast = timeit.timeit(lambda: fast.render(data), number=number) / number
+            parse_drf = timeit.timeit(lambda: baseline_parser.parse(io.BytesIO(body)), number=number) / number
+            parse_fast = timeit.timeit(lambda: fast_parser.parse(io.BytesIO(body)), number=number) / number
+            self.stdout.write(
+                f"{name:<10} {len(data['results']):>5} {len(body):>8} "
+                f"{render_drf * 1000:>9.3f}ms {render_fast * 1000:>10.3f}ms {render_drf / render_fast:>5.1f} "
+                f"{parse_drf * 1000:>8.3f}ms {parse_fast * 1000:>9.3f}ms {parse_drf / parse_fast:>5.1f}"
+            )
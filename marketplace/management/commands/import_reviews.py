@@ -0,0 +1,138 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from marketplace.models import Booking, Review
+from marketplace.ratings import bulk_create_reviews, deferred_rating_updates
+
+
+def is_int(value):
+    # JSON true/false load as bool, which is an int subclass
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_created_at(row):
+    try:
+        return parse_datetime(str(row.get('created_at') or ''))
+    except ValueError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import historical reviews from a JSON Lines file, one object per line: "
+        '{"booking": 12, "rating": 5, "comment": "...", "created_at": "2024-05-01T10:00:00Z", '
+        '"images": ["review_images/a.jpg"]}. Customer and tailor come from the booking. '
+        "Rating aggregates are recomputed once per affected tailor at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSON Lines file ("-" for stdin)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk INSERT (default 5000)')
+        parser.add_argument('--allow-incomplete', action='store_true',
+                            help='Also import reviews of bookings that are not completed')
+
+    def handle(self, *args, **options):
+        path, batch_size = options['path'], options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+        self.allow_incomplete = options['allow_incomplete']
+        self.imported = self.skipped = 0
+        self.seen_bookings = set()
+        started = time.monotonic()
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        try:
+            # One transaction: a failed import leaves no half-counted reviews behind
+            with transaction.atomic(), deferred_rating_updates():
+                batch = []
+                for line_no, line in enumerate(stream, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        batch.append((line_no, json.loads(line)))
+                    except ValueError as exc:
+                        raise CommandError(f'line {line_no}: invalid JSON ({exc})')
+                    if len(batch) >= batch_size:
+                        self.import_batch(batch, batch_size)
+                        batch = []
+                if batch:
+                    self.import_batch(batch, batch_size)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Reviews imported: {self.imported}, skipped: {self.skipped} '
+            f'({time.monotonic() - started:.1f}s)'
+        ))
+
+    def import_batch(self, batch, batch_size):
+        booking_ids = {row.get('booking') for _, row in batch if isinstance(row, dict) and is_int(row.get('booking'))}
+        bookings = {
+            pk: (customer_id, tailor_id, status)
+            for pk, customer_id, tailor_id, status in Booking.objects
+            .filter(pk__in=booking_ids, review__isnull=True)
+            .values_list('pk', 'customer_id', 'tailor_id', 'status')
+        }
+        reviews, dated = [], []
+        for line_no, row in batch:
+            error = self.row_error(row, bookings)
+            if error:
+                self.skipped += 1
+                self.stderr.write(f'line {line_no}: skipped, {error}')
+                continue
+            customer_id, tailor_id, _ = bookings[row['booking']]
+            self.seen_bookings.add(row['booking'])
+            review = Review(
+                booking_id=row['booking'], customer_id=customer_id, tailor_id=tailor_id,
+                rating=row['rating'], comment=row.get('comment') or '',
+            )
+            review.import_images = row.get('images') or ()
+            created_at = parse_created_at(row)
+            reviews.append(review)
+            dated.append(created_at)
+
+        created = bulk_create_reviews(reviews, batch_size=batch_size)
+        self.restore_created_at([(review.pk, created_at) for review, created_at in zip(created, dated) if created_at])
+        self.imported += len(created)
+
+    def restore_created_at(self, dates):
+        """created_at is auto_now_add, which bulk_create overrides; write the original dates back.
+
+        One prepared UPDATE run with executemany: bulk_update's CASE
+        expressions cost more than the inserts themselves at this volume.
+        """
+        if not dates:
+            return
+        field = Review._meta.get_field('created_at')
+        quote = connection.ops.quote_name
+        sql = (f'UPDATE {quote(Review._meta.db_table)} SET {quote(field.column)} = %s '
+               f'WHERE {quote(Review._meta.pk.column)} = %s')
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [(field.get_db_prep_value(value, connection), pk) for pk, value in dates])
+
+    def row_error(self, row, bookings):
+        if not isinstance(row, dict):
+            return 'not a JSON object'
+        booking_id, rating = row.get('booking'), row.get('rating')
+        if not is_int(booking_id):
+            return f'booking must be a booking id, got {booking_id!r}'
+        if not is_int(rating) or not 1 <= rating <= 5:
+            return f'rating must be an integer from 1 to 5, got {rating!r}'
+        if booking_id in self.seen_bookings:
+            return f'booking {booking_id} appears twice'
+        if booking_id not in bookings:
+            return f'booking {booking_id!r} does not exist or is already reviewed'
+        if bookings[booking_id][2] != Booking.Status.COMPLETED and not self.allow_incomplete:
+            return f'booking {booking_id} is not completed'
+        images = row.get('images') or []
+        if not isinstance(images, list) or not all(isinstance(name, str) for name in images):
+            return 'images must be a list of stored image names'
+        if row.get('created_at') and parse_created_at(row) is None:
+            return f"invalid created_at {row['created_at']!r}"
+        return None
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.cache import bump_search_generation
+from marketplace.documents import refresh_search_documents
+from marketplace.ratings import rebuild_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = "Recompute TailorProfile rating_sum/total_reviews/avg_rating from one grouped query over the Review table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-documents', action='store_true',
+                            help='Do not refresh TailorSearchDocument rows afterwards')
+
+    def handle(self, *args, **options):
+        updated = rebuild_rating_aggregates()
+        bump_search_generation()
+        self.stdout.write(self.style.SUCCESS(f'Rating aggregates rebuilt: {updated} profiles'))
+        if not options['skip_documents']:
+            written = refresh_search_documents()
+            self.stdout.write(self.style.SUCCESS(f'Search documents written: {written}'))
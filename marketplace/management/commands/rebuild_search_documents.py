@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from marketplace.documents import refresh_search_documents
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized TailorSearchDocument table from profiles, users, specializations and services."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--stale', action='store_true',
+                            help='Only profiles without a document or with an empty card')
+
+    def handle(self, *args, **options):
+        written = refresh_search_documents(batch_size=options['batch_size'], stale_only=options['stale'])
+        self.stdout.write(self.style.SUCCESS(f'Search documents written: {written}'))
@@ -7,6 +7,7 @@ import math
 from decimal import Decimal
 
 from marketplace.models import Specialization, TailorProfile, Service, Booking, Review
+from marketplace.ratings import bulk_create_reviews
 
 fake = Faker()
 User = get_user_model()
@@ -179,16 +180,18 @@ class Command(BaseCommand):
         # Reviews
         completed_bookings = [b for b in bookings if b.status == 'completed']
         random.shuffle(completed_bookings)
-        reviews_created = 0
-        for booking in completed_bookings[:reviews_target]:
-            Review.objects.create(
+        # One INSERT and one aggregate recompute per tailor instead of a save per review
+        reviews = [
+            Review(
                 booking=booking,
                 customer=booking.customer,
                 tailor=booking.tailor,
                 rating=random.randint(3, 5),
                 comment=fake.sentence(),
             )
-            reviews_created += 1
+            for booking in completed_bookings[:reviews_target]
+        ]
+        reviews_created = len(bulk_create_reviews(reviews))
         self.stdout.write(f'Reviews created: {reviews_created}')
 
         self.stdout.write(self.style.SUCCESS('Seeding complete.'))
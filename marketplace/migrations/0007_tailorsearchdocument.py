@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-16 20:35
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0006_tailorprofile_profile_image_reviewimage_serviceimage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TailorSearchDocument',
+            fields=[
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='marketplace.tailorprofile')),
+                ('user_id', models.BigIntegerField(unique=True)),
+                ('username', models.CharField(max_length=150)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('avg_rating', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=3)),
+                ('total_reviews', models.PositiveIntegerField(default=0)),
+                ('years_experience', models.PositiveIntegerField(default=0)),
+                ('specialization_slugs', models.TextField(blank=True)),
+                ('specialization_names', models.TextField(blank=True)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('services', models.JSONField(blank=True, default=list)),
+                ('card', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['latitude', 'longitude'], name='search_doc_lat_lng_idx'), models.Index(fields=['-avg_rating', 'profile'], name='search_doc_rating_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,147 @@
+# Generated by Django 5.2.5 on 2026-10-16 20:38
+
+from django.db import migrations, models
+from django.db.models import Prefetch
+
+
+DOC_TABLE = 'marketplace_tailorsearchdocument'
+FTS_TABLE = 'marketplace_tailorsearchdocument_fts'
+PG_INDEX = 'search_doc_fts_idx'
+
+SQLITE_CREATE = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(search_text, content='{DOC_TABLE}', content_rowid='profile_id')",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.profile_id, new.search_text);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.profile_id, old.search_text);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.profile_id, old.search_text);
+        INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.profile_id, new.search_text);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def _delimited(values):
+    values = [v for v in values if v]
+    return f"|{'|'.join(values)}|" if values else ''
+
+
+def backfill_search_documents(apps, schema_editor):
+    """Write a document for every existing tailor, before the index is built.
+
+    Mirrors ``marketplace.documents.build_search_document`` on the historical
+    models except for ``card`` (serializer output): new rows get an empty one
+    for ``manage.py rebuild_search_documents --stale`` to fill.
+    """
+    TailorProfile = apps.get_model('marketplace', 'TailorProfile')
+    TailorSearchDocument = apps.get_model('marketplace', 'TailorSearchDocument')
+    Service = apps.get_model('marketplace', 'Service')
+    profiles = (TailorProfile.objects
+                .select_related('user')
+                .prefetch_related(
+                    'specializations',
+                    Prefetch('services', queryset=Service.objects.filter(is_active=True).order_by('name'),
+                             to_attr='active_services'),
+                )
+                .order_by('pk'))
+    batch = []
+    for profile in profiles.iterator(chunk_size=500):
+        specs = list(profile.specializations.all())
+        active = profile.active_services
+        text_parts = [profile.bio] + [s.name for s in specs]
+        for svc in active:
+            text_parts += [svc.name, svc.description]
+        batch.append(TailorSearchDocument(
+            profile_id=profile.pk,
+            user_id=profile.user_id,
+            username=profile.user.username,
+            latitude=profile.user.latitude,
+            longitude=profile.user.longitude,
+            avg_rating=profile.avg_rating,
+            total_reviews=profile.total_reviews,
+            years_experience=profile.years_experience,
+            specialization_slugs=_delimited(s.slug.lower() for s in specs),
+            specialization_names=_delimited(s.name.lower() for s in specs),
+            min_price=min((svc.price for svc in active), default=None),
+            services=[
+                {'id': svc.id, 'name': svc.name, 'price': str(svc.price),
+                 'duration_days': svc.duration_days, 'is_active': svc.is_active}
+                for svc in active
+            ],
+            card={},
+            search_text='\n'.join(part for part in text_parts if part),
+        ))
+        if len(batch) >= 500:
+            _upsert(TailorSearchDocument, batch)
+            batch = []
+    _upsert(TailorSearchDocument, batch)
+
+
+def _upsert(TailorSearchDocument, documents):
+    # Existing rows keep their card; everything else is rewritten
+    TailorSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['profile'],
+        update_fields=[
+            'user_id', 'username', 'latitude', 'longitude', 'avg_rating', 'total_reviews',
+            'years_experience', 'specialization_slugs', 'specialization_names', 'min_price',
+            'services', 'search_text',
+        ],
+    )
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX {PG_INDEX} ON {DOC_TABLE} "
+            f"USING GIN (to_tsvector('simple'::regconfig, COALESCE(search_text, '')))"
+        )
+    elif vendor == 'sqlite':
+        from django.db import OperationalError
+        try:
+            with schema_editor.connection.cursor() as cursor:
+                cursor.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)")
+                cursor.execute("DROP TABLE temp._fts5_probe")
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to icontains
+            return
+        for sql in SQLITE_CREATE:
+            schema_editor.execute(sql)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {PG_INDEX}")
+    elif vendor == 'sqlite':
+        for sql in SQLITE_DROP:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0007_tailorsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tailorsearchdocument',
+            name='search_text',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
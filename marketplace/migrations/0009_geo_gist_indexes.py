@@ -0,0 +1,58 @@
+from django.db import migrations, transaction
+
+
+# (table, index name, indexed expression) per backend; see marketplace.geo
+POSTGIS_INDEXES = [
+    ('users_user', 'users_user_geog_gist',
+     'ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography'),
+    ('marketplace_tailorsearchdocument', 'search_doc_geog_gist',
+     'ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography'),
+]
+EARTH_INDEXES = [
+    ('users_user', 'users_user_earth_gist', 'll_to_earth(latitude, longitude)'),
+    ('marketplace_tailorsearchdocument', 'search_doc_earth_gist', 'll_to_earth(latitude, longitude)'),
+]
+
+
+def _try_extensions(schema_editor, *names):
+    """Enable extensions if possible; False when missing or not permitted."""
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            for name in names:
+                schema_editor.execute(f'CREATE EXTENSION IF NOT EXISTS {name}')
+    except Exception:
+        return False
+    return True
+
+
+def create_geo_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        # SQLite and others keep the float-column backend
+        return
+    if _try_extensions(schema_editor, 'postgis'):
+        indexes = POSTGIS_INDEXES
+    elif _try_extensions(schema_editor, 'cube', 'earthdistance'):
+        indexes = EARTH_INDEXES
+    else:
+        return
+    for table, name, expression in indexes:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING GIST (({expression}))')
+
+
+def drop_geo_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, name, _ in POSTGIS_INDEXES + EARTH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('marketplace', '0008_tailorsearchdocument_search_text'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_geo_indexes, drop_geo_indexes),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-16 20:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0009_geo_gist_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['tailor', 'price'], name='service_active_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['tailor', 'duration_days'], name='service_active_duration_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tailorprofile',
+            index=models.Index(fields=['-avg_rating', 'id'], name='tailor_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tailorprofile',
+            index=models.Index(fields=['-years_experience', 'id'], name='tailor_experience_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tailorprofile',
+            index=models.Index(fields=['-total_reviews', 'id'], name='tailor_reviews_idx'),
+        ),
+    ]
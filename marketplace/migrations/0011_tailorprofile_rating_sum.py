@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-16 20:59
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_sum(apps, schema_editor):
+    # avg_rating/total_reviews are already right; only the new running sum is missing
+    TailorProfile = apps.get_model('marketplace', 'TailorProfile')
+    Review = apps.get_model('marketplace', 'Review')
+    sums = (Review.objects.filter(tailor=OuterRef('user_id')).order_by().values('tailor')
+            .annotate(total=Sum('rating')).values('total'))
+    TailorProfile.objects.update(rating_sum=Coalesce(Subquery(sums), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0010_search_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tailorprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_sum, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.5 on 2026-10-16 21:01
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_rating_histogram(apps, schema_editor):
+    # One GROUP BY over the reviews; profiles without reviews keep the 0 default
+    TailorProfile = apps.get_model('marketplace', 'TailorProfile')
+    Review = apps.get_model('marketplace', 'Review')
+    stars = [f'stars_{rating}' for rating in range(1, 6)]
+    grouped = Review.objects.order_by().values('tailor').annotate(**{
+        field: Count('pk', filter=Q(rating=rating)) for rating, field in enumerate(stars, 1)
+    })
+    counts = {row.pop('tailor'): row for row in grouped}
+    profiles = TailorProfile.objects.filter(user_id__in=Review.objects.values('tailor')).values_list('pk', 'user_id')
+    TailorProfile.objects.bulk_update(
+        [TailorProfile(pk=pk, **counts[user_id]) for pk, user_id in profiles], stars, batch_size=1000)
+
+
+def clear_search_document_cards(apps, schema_editor):
+    # Stored cards predate rating_histogram; rebuild_search_documents --stale refills them
+    TailorSearchDocument = apps.get_model('marketplace', 'TailorSearchDocument')
+    TailorSearchDocument.objects.update(card={})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0011_tailorprofile_rating_sum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tailorprofile',
+            name='stars_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tailorprofile',
+            name='stars_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tailorprofile',
+            name='stars_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tailorprofile',
+            name='stars_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tailorprofile',
+            name='stars_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_histogram, migrations.RunPython.noop),
+        migrations.RunPython(clear_search_document_cards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-16 21:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0012_tailorprofile_rating_histogram'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tailorprofile',
+            index=models.Index(fields=['updated_at'], name='tailor_updated_idx'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -20,8 +20,16 @@ class TailorProfile(models.Model):
 	bio = models.TextField(blank=True)
 	years_experience = models.PositiveIntegerField(default=0)
 	specializations = models.ManyToManyField(Specialization, blank=True, related_name='tailors')
+	# Running aggregates kept by marketplace.ratings; avg_rating = rating_sum / total_reviews
 	avg_rating = models.DecimalField(max_digits=3, decimal_places=2, default=Decimal('0.00'))
 	total_reviews = models.PositiveIntegerField(default=0)
+	rating_sum = models.PositiveIntegerField(default=0)
+	# Rating histogram: number of reviews with 1..5 stars
+	stars_1 = models.PositiveIntegerField(default=0)
+	stars_2 = models.PositiveIntegerField(default=0)
+	stars_3 = models.PositiveIntegerField(default=0)
+	stars_4 = models.PositiveIntegerField(default=0)
+	stars_5 = models.PositiveIntegerField(default=0)
 	profile_image = models.ImageField(
 		upload_to='tailor_profiles/', 
 		blank=True, 
@@ -31,9 +39,36 @@ class TailorProfile(models.Model):
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
 
+	class Meta:
+		indexes = [
+			# Search orderings: default, sort=experience, sort=reviews
+			models.Index(fields=['-avg_rating', 'id'], name='tailor_rating_idx'),
+			models.Index(fields=['-years_experience', 'id'], name='tailor_experience_idx'),
+			models.Index(fields=['-total_reviews', 'id'], name='tailor_reviews_idx'),
+			# Geo grid sync: profiles changed since a worker last looked
+			models.Index(fields=['updated_at'], name='tailor_updated_idx'),
+		]
+
+	# Running totals moved only by marketplace.ratings with F() updates; a
+	# full save of an instance loaded before a review was written would put
+	# stale values back, so ordinary saves leave them out
+	RATING_FIELDS = (
+		'rating_sum', 'total_reviews', 'avg_rating',
+		'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5',
+	)
+
 	def __str__(self):
 		return f"TailorProfile({self.user})"
 
+	def save(self, *args, **kwargs):
+		if kwargs.get('update_fields') is None and not self._state.adding and not kwargs.get('force_insert'):
+			skipped = self.get_deferred_fields().union(self.RATING_FIELDS)
+			kwargs['update_fields'] = [
+				field.attname for field in self._meta.concrete_fields
+				if not field.primary_key and field.attname not in skipped
+			]
+		super().save(*args, **kwargs)
+
 
 class Service(models.Model):
 	tailor = models.ForeignKey(TailorProfile, on_delete=models.CASCADE, related_name='services')
@@ -47,6 +82,20 @@ class Service(models.Model):
 
 	class Meta:
 		unique_together = ("tailor", "name")
+		indexes = [
+			# Price/duration search filters and the cheapest-price subquery
+			# only ever look at active services
+			models.Index(
+				fields=['tailor', 'price'],
+				condition=models.Q(is_active=True),
+				name='service_active_price_idx',
+			),
+			models.Index(
+				fields=['tailor', 'duration_days'],
+				condition=models.Q(is_active=True),
+				name='service_active_duration_idx',
+			),
+		]
 
 	def __str__(self):
 		return f"{self.name} ({self.tailor.user})"
@@ -100,22 +149,36 @@ class Review(models.Model):
 	comment = models.TextField(blank=True)
 	created_at = models.DateTimeField(auto_now_add=True)
 
+	# (tailor_id, rating) as last loaded or saved, for adjusting the aggregates on edit
+	_rated = None
+
 	def __str__(self):
 		return f"Review {self.rating} for {self.tailor}"
 
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		if 'tailor_id' in instance.__dict__ and 'rating' in instance.__dict__:
+			instance._rated = (instance.tailor_id, instance.rating)
+		return instance
+
 	def save(self, *args, **kwargs):
-		new = self.pk is None
-		super().save(*args, **kwargs)
-		# Update tailor profile aggregates
-		try:
-			profile = self.tailor.tailor_profile
-		except TailorProfile.DoesNotExist:
-			return
-		from django.db.models import Avg, Count
-		agg = Review.objects.filter(tailor=self.tailor).aggregate(avg=Avg('rating'), cnt=Count('id'))
-		profile.avg_rating = Decimal(str(round(agg['avg'] or 0, 2)))
-		profile.total_reviews = agg['cnt'] or 0
-		profile.save(update_fields=['avg_rating', 'total_reviews'])
+		# Update tailor profile aggregates incrementally (deletes: marketplace.signals)
+		from .ratings import apply_rating_change
+		previous = None
+		if not self._state.adding:
+			previous = self._rated or Review.objects.filter(pk=self.pk).values_list('tailor_id', 'rating').first()
+		with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+			super().save(*args, **kwargs)
+			current = (self.tailor_id, self.rating)
+			if previous is None:
+				apply_rating_change(self.tailor_id, add=self.rating)
+			elif previous[0] != self.tailor_id:
+				apply_rating_change(previous[0], remove=previous[1])
+				apply_rating_change(self.tailor_id, add=self.rating)
+			else:
+				apply_rating_change(self.tailor_id, add=self.rating, remove=previous[1])
+		self._rated = current
 
 
 class ServiceImage(models.Model):
@@ -145,3 +208,41 @@ class ReviewImage(models.Model):
 	def __str__(self):
 		return f"Image for review {self.review.id}"
 
+
+
+class TailorSearchDocument(models.Model):
+	"""Flat, denormalized copy of everything tailor search reads.
+
+	One row per TailorProfile, kept current by ``marketplace.signals`` and
+	rebuilt in bulk by ``manage.py rebuild_search_documents``. Lets search
+	answer from a single indexed table with no joins or per-row serialization.
+	"""
+	profile = models.OneToOneField(TailorProfile, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+	user_id = models.BigIntegerField(unique=True)
+	username = models.CharField(max_length=150)
+	latitude = models.FloatField(null=True, blank=True)
+	longitude = models.FloatField(null=True, blank=True)
+	avg_rating = models.DecimalField(max_digits=3, decimal_places=2, default=Decimal('0.00'))
+	total_reviews = models.PositiveIntegerField(default=0)
+	years_experience = models.PositiveIntegerField(default=0)
+	# Pipe-delimited ("|a|b|") so a single LIKE matches whole slugs
+	specialization_slugs = models.TextField(blank=True)
+	specialization_names = models.TextField(blank=True)
+	min_price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+	# Active services as [{id, name, price, duration_days, is_active}] for matched_service
+	services = models.JSONField(default=list, blank=True)
+	# TailorProfileSerializer output (without per-request fields)
+	card = models.JSONField(default=dict, blank=True)
+	# Bio, active service names/descriptions and specialization names; backs
+	# the full-text index (see marketplace.fulltext)
+	search_text = models.TextField(blank=True)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['latitude', 'longitude'], name='search_doc_lat_lng_idx'),
+			models.Index(fields=['-avg_rating', 'profile'], name='search_doc_rating_idx'),
+		]
+
+	def __str__(self):
+		return f"TailorSearchDocument({self.username})"
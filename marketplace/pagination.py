@@ -0,0 +1,164 @@
+"""Keyset (seek) pagination for marketplace list endpoints.
+
+DRF's CursorPagination only seeks on the first ordering field and falls back
+to OFFSET for ties, which degrades badly when many rows share a value (most
+tailors start at avg_rating 0.00). ``KeysetPagination`` instead seeks on the
+full ordering of the queryset, e.g. ``(-avg_rating, id)``, ``(distance_km, id)``
+or ``(-created_at, id)``, so every page costs the same as the first one.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Forward-only keyset pagination over the queryset's own ``order_by``.
+
+    The ordering must end with a unique column (``id``) so the position of
+    the last row on a page is unambiguous. The cursor is an opaque base64
+    token holding that row's ordering values.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE or 20
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw:
+            try:
+                page_size = int(raw)
+            except (TypeError, ValueError):
+                pass
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        ordering = [str(f) for f in queryset.query.order_by]
+        if not ordering or ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering.append('id')
+        return ordering
+
+    def encode_cursor(self, values):
+        payload = json.dumps([self._dump(v) for v in values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, token, length):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != length:
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def cursor_values(self, queryset, ordering, values):
+        """Convert decoded cursor ``values`` to the Python types of the ordering fields.
+
+        A well-formed but tampered cursor must fail here, as an invalid
+        cursor, rather than inside the database query.
+        """
+        try:
+            return [
+                None if value is None else self._ordering_field(queryset, field.lstrip('-')).to_python(value)
+                for field, value in zip(ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _ordering_field(queryset, name):
+        # Annotations (distance_km, min_price, relevance) or model fields,
+        # possibly across relations
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        opts = queryset.model._meta
+        if name == 'pk':
+            return opts.pk
+        *path, name = name.split(LOOKUP_SEP)
+        for part in path:
+            opts = opts.get_field(part).related_model._meta
+        return opts.get_field(name)
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, Decimal):
+            return str(value)
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        return value
+
+    def seek_filter(self, ordering, values):
+        """Build ``(a, b, c) > (va, vb, vc)`` honouring each field's direction."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            op = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{op}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*ordering)
+
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            values = self.cursor_values(queryset, ordering, self.decode_cursor(token, len(ordering)))
+            queryset = queryset.filter(self.seek_filter(ordering, values))
+
+        # Fetch one extra row to learn whether a next page exists
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        self.next_values = None
+        if self.has_next:
+            last = self.page[-1]
+            self.next_values = [self._row_value(last, f.lstrip('-')) for f in ordering]
+        return self.page
+
+    @staticmethod
+    def _row_value(row, name):
+        # Model instances, or dicts from a values() queryset
+        if isinstance(row, dict):
+            return row['id' if name == 'pk' else name]
+        return getattr(row, name)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_values))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,103 @@
+"""Blended relevance score for ``sort=relevance`` tailor searches.
+
+Each candidate contributes one row of numeric columns (distance, rating,
+review count, experience, cheapest active service price). Every column is
+scaled to 0..1 where higher is better and combined with the weights from
+``TAILOR_RELEVANCE_WEIGHTS``. With NumPy the whole candidate set is scored
+as one array; without it the same arithmetic runs per row.
+"""
+
+import math
+
+from django.conf import settings
+
+try:
+    import numpy as np
+except ImportError:  # optional: pure-Python fallback below
+    np = None
+
+DEFAULT_WEIGHTS = {
+    'distance': 0.35,
+    'rating': 0.30,
+    'reviews': 0.15,
+    'experience': 0.10,
+    'price': 0.10,
+}
+MAX_RATING = 5.0
+
+
+def relevance_weights():
+    return {**DEFAULT_WEIGHTS, **getattr(settings, 'TAILOR_RELEVANCE_WEIGHTS', {})}
+
+
+def relevance_scores(rows, radius_km=None, weights=None):
+    """Score ``rows`` of (distance_km, avg_rating, total_reviews, years_experience, min_price).
+
+    ``distance_km`` is ignored when ``radius_km`` is None (no location);
+    a missing ``min_price`` (no active services) scores 0 on price.
+    Returns a sequence of floats aligned with ``rows``.
+    """
+    weights = weights or relevance_weights()
+    if not rows:
+        return []
+    if np is None:
+        return _relevance_scores_py(rows, radius_km, weights)
+
+    # Column-wise conversion is cheaper than one 2-D array of row tuples
+    distance, rating, reviews, experience, price = (np.array(col, dtype=float) for col in zip(*rows))
+    score = weights['rating'] * np.clip(rating / MAX_RATING, 0.0, 1.0)
+    if radius_km:
+        score += weights['distance'] * np.clip(1.0 - distance / radius_km, 0.0, 1.0)
+    max_reviews = np.log1p(reviews.max())
+    if max_reviews > 0:
+        score += weights['reviews'] * np.log1p(reviews) / max_reviews
+    max_experience = experience.max()
+    if max_experience > 0:
+        score += weights['experience'] * experience / max_experience
+    priced = ~np.isnan(price)
+    if priced.any():
+        low, high = price[priced].min(), price[priced].max()
+        cheapness = (high - price) / (high - low) if high > low else np.ones_like(price)
+        score += weights['price'] * np.where(priced, cheapness, 0.0)
+    return score
+
+
+def _relevance_scores_py(rows, radius_km, weights):
+    max_reviews = math.log1p(max(row[2] for row in rows))
+    max_experience = max(row[3] for row in rows)
+    prices = [float(row[4]) for row in rows if row[4] is not None]
+    low, high = (min(prices), max(prices)) if prices else (0.0, 0.0)
+
+    scores = []
+    for distance, rating, reviews, experience, price in rows:
+        score = weights['rating'] * min(max(float(rating) / MAX_RATING, 0.0), 1.0)
+        if radius_km:
+            score += weights['distance'] * min(max(1.0 - distance / radius_km, 0.0), 1.0)
+        if max_reviews > 0:
+            score += weights['reviews'] * math.log1p(reviews) / max_reviews
+        if max_experience > 0:
+            score += weights['experience'] * experience / max_experience
+        if price is not None:
+            score += weights['price'] * ((high - float(price)) / (high - low) if high > low else 1.0)
+        scores.append(score)
+    return scores
+
+
+def top_ranked(pks, scores, limit, after=None):
+    """The ``limit`` best (score, pk) pairs, by score desc then pk asc.
+
+    ``after`` is the (score, pk) of the last row of the previous page.
+    """
+    if np is not None and len(pks):
+        pk_arr = np.asarray(pks)
+        score_arr = np.asarray(scores, dtype=float)
+        if after is not None:
+            keep = (score_arr < after[0]) | ((score_arr == after[0]) & (pk_arr > after[1]))
+            pk_arr, score_arr = pk_arr[keep], score_arr[keep]
+        order = np.lexsort((pk_arr, -score_arr))[:limit]
+        return [(float(score_arr[i]), int(pk_arr[i])) for i in order]
+
+    pairs = [(float(score), pk) for pk, score in zip(pks, scores)]
+    if after is not None:
+        pairs = [(s, pk) for s, pk in pairs if s < after[0] or (s == after[0] and pk > after[1])]
+    return sorted(pairs, key=lambda pair: (-pair[0], pair[1]))[:limit]
@@ -0,0 +1,175 @@
+"""Running rating aggregates on TailorProfile.
+
+``rating_sum`` and ``total_reviews`` are adjusted with ``F()`` expressions by
+the transaction that writes a review, and ``avg_rating`` is derived from
+them in the same UPDATE, so a new review costs one statement however many
+reviews the tailor has and concurrent reviews cannot overwrite each other.
+``Review.save`` handles inserts and edits, ``marketplace.signals`` deletes.
+
+The per-star histogram (``stars_1`` .. ``stars_5``) moves in the same UPDATE.
+
+``rebuild_rating_aggregates`` recomputes profiles from one grouped query over
+the Review table (``manage.py rebuild_rating_aggregates``) for repair.
+
+Bulk loads use ``bulk_create_reviews`` (``manage.py import_reviews``), or
+wrap their writes in ``deferred_rating_updates()``. Inside that block the
+per-review updates are skipped, and each touched tailor is recomputed once
+on exit.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+from django.utils import timezone
+
+from .cache import bump_search_generation
+from .documents import refresh_search_documents
+from .models import Review, ReviewImage, TailorProfile
+
+STARS = range(1, 6)
+# Tailor user ids touched inside deferred_rating_updates(), None outside
+_deferred_tailors = ContextVar('deferred_rating_tailors', default=None)
+# Profiles recomputed per UPDATE when a deferred block ends
+REBUILD_CHUNK_SIZE = 1000
+
+
+def star_field(rating):
+    return f'stars_{rating}'
+
+
+def average_rating(rating_sum, total_reviews):
+    """``avg_rating`` as a database expression: sum / count to 2 decimals, 0 without reviews."""
+    average = Cast(Cast(rating_sum, FloatField()) / NullIf(total_reviews, 0), DecimalField(max_digits=3, decimal_places=2))
+    return Coalesce(Round(average, 2), Value(Decimal('0.00')))
+
+
+def apply_rating_change(tailor_id, add=None, remove=None):
+    """Count a review rated ``add`` and/or uncount one rated ``remove`` on a tailor user's profile.
+
+    An edit passes both. Also bumps ``updated_at``, which versions the
+    cached tailor cards.
+    """
+    if add == remove:
+        return
+    deferred = _deferred_tailors.get()
+    if deferred is not None:
+        deferred.add(tailor_id)
+        return
+    count = (add is not None) - (remove is not None)
+    total = (add or 0) - (remove or 0)
+    rating_sum = F('rating_sum') + total
+    total_reviews = F('total_reviews') + count
+    updates = {
+        'rating_sum': rating_sum,
+        'total_reviews': total_reviews,
+        'avg_rating': average_rating(rating_sum, total_reviews),
+        'updated_at': timezone.now(),
+    }
+    if add is not None:
+        updates[star_field(add)] = F(star_field(add)) + 1
+    if remove is not None:
+        updates[star_field(remove)] = F(star_field(remove)) - 1
+    TailorProfile.objects.filter(user_id=tailor_id).update(**updates)
+
+
+def rebuild_rating_aggregates(profiles=None):
+    """Recompute the aggregates of ``profiles`` (all when None) from the Review table.
+
+    The sums and counts come from one GROUP BY over the reviews and are
+    written with one ``bulk_update`` per ``REBUILD_CHUNK_SIZE`` profiles. The
+    profiles are locked first, so a review committed meanwhile is either
+    counted here or applied on top afterwards. Returns the number of profiles
+    updated.
+    """
+    if profiles is None:
+        profiles = TailorProfile.objects.all()
+    fields = ['rating_sum', 'total_reviews', *map(star_field, STARS)]
+    empty = dict.fromkeys(fields, 0)
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(profiles.select_for_update().order_by('pk').values_list('pk', 'user_id'))
+        grouped = (
+            Review.objects.filter(tailor__in=profiles.values('user_id')).order_by().values('tailor')
+            .annotate(rating_sum=Sum('rating'), total_reviews=Count('pk'), **{
+                star_field(rating): Count('pk', filter=Q(rating=rating)) for rating in STARS
+            })
+        )
+        totals = {row.pop('tailor'): row for row in grouped}
+        updated = []
+        for pk, user_id in rows:
+            values = totals.get(user_id, empty)
+            updated.append(TailorProfile(
+                pk=pk,
+                avg_rating=average_rating(Value(values['rating_sum']), Value(values['total_reviews'])),
+                updated_at=now,
+                **values,
+            ))
+        TailorProfile.objects.bulk_update(
+            updated, [*fields, 'avg_rating', 'updated_at'], batch_size=REBUILD_CHUNK_SIZE)
+    return len(rows)
+
+
+def rating_histogram(profile):
+    """{"1": count, ..., "5": count} from a profile instance or values() row."""
+    get = profile.get if isinstance(profile, dict) else partial(getattr, profile)
+    return {str(rating): int(get(star_field(rating)) or 0) for rating in STARS}
+
+
+def rating_updates_deferred():
+    return _deferred_tailors.get() is not None
+
+
+@contextmanager
+def deferred_rating_updates():
+    """Skip per-review aggregate updates; recompute touched tailors once on exit.
+
+    Yields the set of touched tailor user ids, which bulk writers (that send
+    no signals) add to themselves. Nested blocks share the outermost set. On
+    exit the touched profiles are recomputed ``REBUILD_CHUNK_SIZE`` at a
+    time, the search cache generation is bumped, and their search documents
+    are refreshed after commit.
+    """
+    tailor_ids = _deferred_tailors.get()
+    if tailor_ids is not None:
+        yield tailor_ids
+        return
+    tailor_ids = set()
+    token = _deferred_tailors.set(tailor_ids)
+    try:
+        yield tailor_ids
+    finally:
+        _deferred_tailors.reset(token)
+    if not tailor_ids:
+        return
+    tailor_ids = sorted(tailor_ids)
+    profile_ids = []
+    for start in range(0, len(tailor_ids), REBUILD_CHUNK_SIZE):
+        profiles = TailorProfile.objects.filter(user_id__in=tailor_ids[start:start + REBUILD_CHUNK_SIZE])
+        rebuild_rating_aggregates(profiles)
+        profile_ids += profiles.values_list('pk', flat=True)
+    bump_search_generation()
+    transaction.on_commit(partial(refresh_search_documents, profile_ids))
+
+
+def bulk_create_reviews(reviews, batch_size=1000):
+    """Insert unsaved Reviews with ``bulk_create`` and count them once per tailor.
+
+    A review's ``import_images`` attribute, if set, lists stored image names
+    to attach as ReviewImage rows. Neither ``Review.save`` nor signals run.
+    Returns the created reviews.
+    """
+    with deferred_rating_updates() as tailor_ids:
+        created = Review.objects.bulk_create(reviews, batch_size=batch_size)
+        images = [
+            ReviewImage(review=review, image=name)
+            for review in created
+            for name in getattr(review, 'import_images', ())
+        ]
+        ReviewImage.objects.bulk_create(images, batch_size=batch_size)
+        tailor_ids.update(review.tailor_id for review in created)
+    return created
@@ -0,0 +1,186 @@
+"""Query helpers shared by the tailor search endpoint and its serializers."""
+
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count, Exists, Min, OuterRef, Prefetch, Q, Subquery
+
+from .models import Service, Specialization, TailorProfile
+
+
+def specialization_keywords(spec_slug, label=None):
+    """Keywords used to match a tailor's services to a requested specialization.
+
+    Prefer the specialization's display name; fall back to the slug words.
+    """
+    if label:
+        return [label]
+    return [spec_slug.replace('-', ' '), spec_slug]
+
+
+class SpecializationTable:
+    """In-memory (id, name, slug) table of every Specialization.
+
+    The catalogue is tiny and changes rarely, so search resolves the
+    ``specialization`` param against this table instead of joining through
+    the M2M with LIKE. Reloaded after local writes (signals) and every
+    ``SPECIALIZATION_TABLE_TTL`` seconds for writes made by other workers.
+    A term that matches nothing reloads it first, so a specialization just
+    created by another worker is found straight away.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = None
+        self._loaded_at = None
+
+    def invalidate(self):
+        with self._lock:
+            self._rows = None
+
+    def rows(self, reload=False):
+        ttl = getattr(settings, 'SPECIALIZATION_TABLE_TTL', 300)
+        with self._lock:
+            if reload or self._rows is None or (ttl and time.monotonic() - self._loaded_at > ttl):
+                self._rows = [
+                    (pk, name, slug, name.casefold(), slug.casefold())
+                    for pk, name, slug in Specialization.objects.values_list('id', 'name', 'slug')
+                ]
+                self._loaded_at = time.monotonic()
+            return self._rows
+
+    def _lookup(self, match):
+        """Rows passing ``match``, reloading the table once when none do."""
+        found = [row for row in self.rows() if match(row)]
+        if not found:
+            found = [row for row in self.rows(reload=True) if match(row)]
+        return found
+
+    def resolve(self, term):
+        """Ids of specializations whose slug equals or name contains ``term``."""
+        needle = term.strip().casefold()
+        if not needle:
+            return []
+        return [row[0] for row in self._lookup(lambda row: row[4] == needle or needle in row[3])]
+
+    def label(self, spec_slug):
+        """Name of the specialization with this slug (case-insensitive), or None."""
+        needle = spec_slug.strip().casefold()
+        if not needle:
+            return None
+        found = self._lookup(lambda row: row[4] == needle)
+        return found[0][1] if found else None
+
+
+specialization_table = SpecializationTable()
+
+
+def resolve_specialization_label(spec_slug):
+    """Return the name of the specialization with this slug, or None."""
+    return specialization_table.label(spec_slug)
+
+
+def filter_by_specializations(qs, specialization_ids):
+    """Tailors having any of the given specializations, via EXISTS (no DISTINCT)."""
+    if not specialization_ids:
+        return qs.none()
+    through = TailorProfile.specializations.through
+    return qs.filter(Exists(through.objects.filter(
+        tailorprofile_id=OuterRef('pk'),
+        specialization_id__in=specialization_ids,
+    )))
+
+
+def filter_by_services(qs, min_price=None, max_price=None, max_duration_days=None):
+    """Tailors with at least one active service meeting every given bound.
+
+    A single EXISTS, so price and duration must hold for the same service;
+    answered from the partial (tailor, price) / (tailor, duration_days)
+    indexes on active services.
+    """
+    conditions = {}
+    if min_price is not None:
+        conditions['price__gte'] = min_price
+    if max_price is not None:
+        conditions['price__lte'] = max_price
+    if max_duration_days is not None:
+        conditions['duration_days__lte'] = max_duration_days
+    if not conditions:
+        return qs
+    return qs.filter(Exists(Service.objects.filter(tailor=OuterRef('pk'), is_active=True, **conditions)))
+
+
+def matched_services_queryset(keywords):
+    """Active services whose name matches any of the keywords."""
+    q = Q()
+    for kw in keywords:
+        q |= Q(name__iexact=kw) | Q(name__icontains=kw)
+    return Service.objects.filter(is_active=True).filter(q).order_by('name')
+
+
+def prefetch_matched_services(keywords):
+    """Prefetch matched services for a page of tailors in one query.
+
+    Results land on ``TailorProfile.matched_services`` (a list), which
+    ``TailorProfileSerializer.get_matched_service`` reads instead of querying
+    per tailor.
+    """
+    return Prefetch('services', queryset=matched_services_queryset(keywords), to_attr='matched_services')
+
+
+def min_active_price():
+    """Subquery for a tailor's cheapest active service price (None without services)."""
+    cheapest = (Service.objects
+                .filter(tailor=OuterRef('pk'), is_active=True)
+                .order_by('price')
+                .values('price')[:1])
+    return Subquery(cheapest, output_field=Service._meta.get_field('price'))
+
+
+def compute_facets(tailors):
+    """Facet counts for a tailor queryset (any filters, any ordering).
+
+    Two grouped queries regardless of result size: one conditional-aggregate
+    pass for the total, price buckets (on each tailor's cheapest active
+    service) and rating buckets, and one GROUP BY for specialization counts.
+    """
+    price_edges = getattr(settings, 'TAILOR_FACET_PRICE_BUCKETS', [0, 250, 500, 1000])
+    rating_floors = getattr(settings, 'TAILOR_FACET_RATING_FLOORS', [4, 3, 2, 1])
+    tailor_ids = tailors.order_by().values('pk')
+
+    price_buckets = [
+        (low, price_edges[i + 1] if i + 1 < len(price_edges) else None)
+        for i, low in enumerate(price_edges)
+    ]
+    aggregates = {'total': Count('pk')}
+    for i, (low, high) in enumerate(price_buckets):
+        condition = Q(min_price__gte=low)
+        if high is not None:
+            condition &= Q(min_price__lt=high)
+        aggregates[f'price_{i}'] = Count('pk', filter=condition)
+    for i, floor in enumerate(rating_floors):
+        aggregates[f'rating_{i}'] = Count('pk', filter=Q(avg_rating__gte=floor))
+    counts = (TailorProfile.objects
+              .filter(pk__in=tailor_ids)
+              .annotate(min_price=Min('services__price', filter=Q(services__is_active=True)))
+              .aggregate(**aggregates))
+
+    specializations = (Specialization.objects
+                       .filter(tailors__in=tailor_ids)
+                       .annotate(count=Count('tailors'))
+                       .order_by('-count', 'name')
+                       .values('id', 'name', 'slug', 'count'))
+
+    return {
+        'total': counts['total'],
+        'specializations': list(specializations),
+        'price': [
+            {'min': low, 'max': high, 'count': counts[f'price_{i}']}
+            for i, (low, high) in enumerate(price_buckets)
+        ],
+        'rating': [
+            {'min': floor, 'count': counts[f'rating_{i}']}
+            for i, floor in enumerate(rating_floors)
+        ],
+    }
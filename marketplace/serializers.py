@@ -2,73 +2,33 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from .models import TailorProfile, Specialization, Service, Booking, Review, ServiceImage, ReviewImage
+from .search import specialization_keywords, matched_services_queryset
+from .images import ResolvedImageField, resolve_image_url
+from .ratings import rating_histogram
+from core.fieldsets import SparseFieldsetMixin
 
 User = get_user_model()
 
 
 # Image Serializers
-class ServiceImageSerializer(serializers.ModelSerializer):
+class ServiceImageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    # Cloudinary URL as-is, local media as an absolute URL (memoized per name)
+    image = ResolvedImageField()
+
     class Meta:
         model = ServiceImage
         fields = ['id', 'image', 'alt_text', 'order', 'uploaded_at']
         read_only_fields = ['id', 'uploaded_at']
-    
-    def to_representation(self, instance):
-        """Override to handle Cloudinary URLs properly"""
-        data = super().to_representation(instance)
-        
-        # Handle image URL
-        if instance.image:
-            try:
-                url = instance.image.url
-                # If it's already an absolute URL (Cloudinary), use as-is
-                if url.startswith('http'):
-                    data['image'] = url
-                else:
-                    # If it's a relative URL (local), build the absolute URL
-                    request = self.context.get('request')
-                    if request:
-                        data['image'] = request.build_absolute_uri(url)
-                    else:
-                        data['image'] = url
-            except Exception:
-                data['image'] = None
-        else:
-            data['image'] = None
-            
-        return data
 
 
-class ReviewImageSerializer(serializers.ModelSerializer):
+class ReviewImageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    # Cloudinary URL as-is, local media as an absolute URL (memoized per name)
+    image = ResolvedImageField()
+
     class Meta:
         model = ReviewImage
         fields = ['id', 'image', 'alt_text', 'uploaded_at']
         read_only_fields = ['id', 'uploaded_at']
-    
-    def to_representation(self, instance):
-        """Override to handle Cloudinary URLs properly"""
-        data = super().to_representation(instance)
-        
-        # Handle image URL
-        if instance.image:
-            try:
-                url = instance.image.url
-                # If it's already an absolute URL (Cloudinary), use as-is
-                if url.startswith('http'):
-                    data['image'] = url
-                else:
-                    # If it's a relative URL (local), build the absolute URL
-                    request = self.context.get('request')
-                    if request:
-                        data['image'] = request.build_absolute_uri(url)
-                    else:
-                        data['image'] = url
-            except Exception:
-                data['image'] = None
-        else:
-            data['image'] = None
-            
-        return data
 
 
 class SpecializationSerializer(serializers.ModelSerializer):
@@ -78,7 +38,7 @@ class SpecializationSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'slug']
 
 
-class TailorProfileSerializer(serializers.ModelSerializer):
+class TailorProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user_id = serializers.IntegerField(source='user.id', read_only=True)
     username = serializers.CharField(source='user.username', read_only=True)
     specializations = SpecializationSerializer(many=True, read_only=True)
@@ -86,12 +46,14 @@ class TailorProfileSerializer(serializers.ModelSerializer):
     distance_km = serializers.FloatField(read_only=True, required=False)
     # Service that matches the requested specialization (if provided in context)
     matched_service = serializers.SerializerMethodField(read_only=True)
+    # Review counts per star, {"1": n, ..., "5": n}
+    rating_histogram = serializers.SerializerMethodField(read_only=True)
     class Meta:
         model = TailorProfile
         fields = [
-            'user_id', 'username', 'bio', 'years_experience', 'avg_rating', 'total_reviews', 'specializations', 'distance_km', 'matched_service', 'profile_image'
+            'user_id', 'username', 'bio', 'years_experience', 'avg_rating', 'total_reviews', 'rating_histogram', 'specializations', 'distance_km', 'matched_service', 'profile_image'
         ]
-        read_only_fields = ['avg_rating', 'total_reviews']
+        read_only_fields = ['avg_rating', 'total_reviews', 'rating_histogram']
     
     def to_representation(self, instance):
         """Override to handle Cloudinary URLs properly - production-safe version"""
@@ -104,6 +66,7 @@ class TailorProfileSerializer(serializers.ModelSerializer):
                 'years_experience': 0,
                 'avg_rating': 0.0,
                 'total_reviews': 0,
+                'rating_histogram': rating_histogram({}),
                 'specializations': [],
                 'distance_km': None,
                 'matched_service': None,
@@ -111,15 +74,17 @@ class TailorProfileSerializer(serializers.ModelSerializer):
             }
             
             # Safely set each field
+            fields = self.fields
             try:
-                if instance and hasattr(instance, 'user') and instance.user:
+                if ('user_id' in fields or 'username' in fields) and instance and hasattr(instance, 'user') and instance.user:
                     data['user_id'] = instance.user.id
                     data['username'] = instance.user.username
             except Exception:
                 pass
             
             try:
-                data['bio'] = str(instance.bio) if instance.bio else ''
+                if 'bio' in fields:
+                    data['bio'] = str(instance.bio) if instance.bio else ''
             except Exception:
                 pass
                 
@@ -137,10 +102,15 @@ class TailorProfileSerializer(serializers.ModelSerializer):
                 data['total_reviews'] = int(instance.total_reviews) if instance.total_reviews else 0
             except Exception:
                 pass
+
+            try:
+                data['rating_histogram'] = self.get_rating_histogram(instance)
+            except Exception:
+                pass
             
             # Handle specializations very safely
             try:
-                if instance and hasattr(instance, 'specializations'):
+                if 'specializations' in fields and instance and hasattr(instance, 'specializations'):
                     specializations_list = []
                     for s in instance.specializations.all()[:10]:  # Limit to prevent memory issues
                         try:
@@ -160,26 +130,22 @@ class TailorProfileSerializer(serializers.ModelSerializer):
                 data['distance_km'] = getattr(instance, 'distance_km', None)
             except Exception:
                 pass
+
+            try:
+                if 'matched_service' in fields:
+                    data['matched_service'] = self.get_matched_service(instance)
+            except Exception:
+                pass
             
             # Handle profile_image URL very safely
             try:
-                if instance and hasattr(instance, 'profile_image') and instance.profile_image:
-                    try:
-                        url = str(instance.profile_image.url)
-                        if url.startswith('http'):
-                            data['profile_image'] = url
-                        else:
-                            request = self.context.get('request') if hasattr(self, 'context') and self.context else None
-                            if request and hasattr(request, 'build_absolute_uri'):
-                                data['profile_image'] = request.build_absolute_uri(url)
-                            else:
-                                data['profile_image'] = url
-                    except Exception:
-                        data['profile_image'] = None
+                if 'profile_image' in fields and instance and hasattr(instance, 'profile_image') and instance.profile_image:
+                    request = self.context.get('request') if hasattr(self, 'context') and self.context else None
+                    data['profile_image'] = resolve_image_url(instance.profile_image, request)
             except Exception:
                 pass
                 
-            return data
+            return self.trim_to_fields(data)
             
         except Exception:
             # Ultimate fallback - return basic structure
@@ -190,36 +156,32 @@ class TailorProfileSerializer(serializers.ModelSerializer):
                 'years_experience': 0,
                 'avg_rating': 0.0,
                 'total_reviews': 0,
+                'rating_histogram': rating_histogram({}),
                 'specializations': [],
                 'distance_km': None,
                 'matched_service': None,
                 'profile_image': None,
             }
 
+    def get_rating_histogram(self, obj: TailorProfile):
+        return rating_histogram(obj)
+
     def get_matched_service(self, obj: TailorProfile):
         spec_slug = (self.context or {}).get('specialization')
         if not spec_slug:
             return None
-        # Find specialization label to match against service names
-        try:
-            spec = obj.specializations.filter(slug__iexact=spec_slug).first()
-        except Exception:
-            spec = None
-        label = spec.name if spec else None
-        # Fallback: use slug words as keywords
-        keywords = []
-        if label:
-            keywords = [label]
+        matched = getattr(obj, 'matched_services', None)
+        if matched is not None:
+            # Prefetched by the search view for the whole page
+            svc = matched[0] if matched else None
         else:
-            keywords = [spec_slug.replace('-', ' '), spec_slug]
-
-        qs = obj.services.filter(is_active=True)
-        # Prefer exact/icontains name matches
-        from django.db.models import Q
-        q = Q()
-        for kw in keywords:
-            q |= Q(name__iexact=kw) | Q(name__icontains=kw)
-        svc = qs.filter(q).order_by('name').first()
+            # Find specialization label to match against service names
+            try:
+                spec = obj.specializations.filter(slug__iexact=spec_slug).first()
+            except Exception:
+                spec = None
+            keywords = specialization_keywords(spec_slug, spec.name if spec else None)
+            svc = matched_services_queryset(keywords).filter(tailor=obj).first()
         if not svc:
             return None
         return {
@@ -231,6 +193,41 @@ class TailorProfileSerializer(serializers.ModelSerializer):
         }
 
 
+class TailorSearchDocumentSerializer(serializers.BaseSerializer):
+    """Read-only output for TailorSearchDocument rows.
+
+    Produces the same shape as TailorProfileSerializer from the stored card,
+    adding only the per-request fields (distance, matched service, absolute
+    image URL).
+    """
+
+    def to_representation(self, instance):
+        if instance.card:
+            data = dict(instance.card)
+        else:
+            # Written by a migration, not yet completed by rebuild_search_documents --stale
+            data = TailorProfileSerializer(instance.profile).data
+        data['distance_km'] = getattr(instance, 'distance_km', None)
+        data['matched_service'] = self.get_matched_service(instance)
+        image = data.get('profile_image')
+        if image and not image.startswith('http'):
+            request = self.context.get('request')
+            if request:
+                data['profile_image'] = request.build_absolute_uri(image)
+        return data
+
+    def get_matched_service(self, instance):
+        keywords = [kw.lower() for kw in (self.context.get('specialization_keywords') or [])]
+        if not keywords:
+            return None
+        # Stored services are already sorted by name
+        for svc in instance.services:
+            name = svc['name'].lower()
+            if any(kw in name for kw in keywords):
+                return svc
+        return None
+
+
 class TailorProfileUpdateSerializer(serializers.ModelSerializer):
     # Accept a list of specialization names to set
     specializations = serializers.ListField(
@@ -245,7 +242,7 @@ class TailorProfileUpdateSerializer(serializers.ModelSerializer):
         spec_names = validated_data.pop('specializations', None)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        instance.save(update_fields=[*validated_data, 'updated_at'])
         if spec_names is not None:
             from .models import Specialization
             objs = []
@@ -260,7 +257,7 @@ class TailorProfileUpdateSerializer(serializers.ModelSerializer):
         return instance
 
 
-class ServiceSerializer(serializers.ModelSerializer):
+class ServiceSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     tailor_username = serializers.CharField(source='tailor.user.username', read_only=True)
     images = ServiceImageSerializer(many=True, read_only=True)
 
@@ -283,7 +280,7 @@ class ServiceCreateUpdateSerializer(serializers.ModelSerializer):
         return value
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     customer_username = serializers.CharField(source='customer.username', read_only=True)
     tailor_username = serializers.CharField(source='tailor.username', read_only=True)
     service_name = serializers.CharField(source='service.name', read_only=True)
@@ -297,8 +294,14 @@ class BookingSerializer(serializers.ModelSerializer):
             'has_review', 'created_at'
         ]
         read_only_fields = ['id', 'customer_username', 'tailor_username', 'service_name', 'status', 'price_snapshot', 'payment_status', 'has_review', 'created_at']
+        # ?expand=service nests the full service instead of its id
+        expandable_fields = {'service': ('marketplace.serializers.ServiceSerializer', {})}
     
     def get_has_review(self, obj):
+        # Booking lists annotate has_review with an EXISTS subquery
+        annotated = getattr(obj, 'has_review', None)
+        if annotated is not None:
+            return annotated
         return hasattr(obj, 'review')
 
 
@@ -337,7 +340,7 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         return booking
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     customer_username = serializers.CharField(source='customer.username', read_only=True)
     tailor_username = serializers.CharField(source='tailor.username', read_only=True)
     service_name = serializers.CharField(source='booking.service.name', read_only=True)
@@ -348,6 +351,15 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
         fields = ['id', 'booking', 'customer_username', 'tailor_username', 'service_name', 'service_price', 'rating', 'comment', 'images', 'created_at']
         read_only_fields = ['id', 'customer_username', 'tailor_username', 'service_name', 'service_price', 'created_at']
+        # ?expand=booking nests the booking instead of its id
+        expandable_fields = {'booking': ('marketplace.serializers.BookingSerializer', {})}
+
+
+class PublicReviewSerializer(ReviewSerializer):
+    """Reviews on a tailor's public page: the booking stays an id, never expanded."""
+
+    class Meta(ReviewSerializer.Meta):
+        expandable_fields = {}
 
 
 class ReviewCreateSerializer(serializers.ModelSerializer):
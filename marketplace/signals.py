@@ -1,9 +1,20 @@
-from django.db.models.signals import post_save
+from functools import partial
+
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.contrib.auth.signals import user_logged_in
 
-from .models import TailorProfile
+from .models import TailorProfile, Service, Specialization, Review, ServiceImage, ReviewImage
+from .geo import tailor_index, register_sqlite_functions
+from .cache import bump_search_generation
+from .documents import refresh_search_documents
+from .search import specialization_table
+from .cards import touch_tailor_cards
+from .images import image_urls
+from .ratings import apply_rating_change, rating_updates_deferred
 
 User = get_user_model()
 
@@ -33,3 +44,184 @@ def ensure_tailor_profile_on_login(sender, user, request, **kwargs):
         role = None
     if role == 'tailor':
         TailorProfile.objects.get_or_create(user=user)
+
+
+@receiver(post_save, sender=User)
+def sync_tailor_index_on_user_save(sender, instance, **kwargs):
+    """Keep the in-memory tailor grid in step with User coordinates."""
+    if instance.pk in tailor_index or instance.role == 'tailor':
+        tailor_index.upsert(instance.pk, instance.latitude, instance.longitude)
+
+
+@receiver(post_delete, sender=User)
+def sync_tailor_index_on_user_delete(sender, instance, **kwargs):
+    tailor_index.discard(instance.pk)
+
+
+@receiver(post_save, sender=TailorProfile)
+def sync_tailor_index_on_profile_save(sender, instance, created, **kwargs):
+    if tailor_index.is_built and (created or instance.user_id not in tailor_index):
+        user = instance.user
+        tailor_index.upsert(user.pk, user.latitude, user.longitude)
+
+
+@receiver(post_delete, sender=TailorProfile)
+def sync_tailor_index_on_profile_delete(sender, instance, **kwargs):
+    tailor_index.discard(instance.user_id)
+
+
+@receiver(connection_created)
+def add_sqlite_geo_functions(sender, connection, **kwargs):
+    """Register HAVERSINE_KM on every new SQLite connection."""
+    if connection.vendor == 'sqlite':
+        register_sqlite_functions(connection)
+
+
+# Fields of a tailor's User that show up in search results
+SEARCH_USER_FIELDS = {'latitude', 'longitude', 'username', 'role'}
+# ... and in the cached tailor card fragment (marketplace.cards)
+CARD_USER_FIELDS = {'username'}
+# Saves of these bump TailorProfile.updated_at: card fragments are keyed by
+# it and other workers' geo grids sync from it (marketplace.geo)
+PROFILE_TOUCH_USER_FIELDS = CARD_USER_FIELDS | {'latitude', 'longitude'}
+
+
+@receiver(post_save, sender=TailorProfile)
+@receiver(post_delete, sender=TailorProfile)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Specialization)
+@receiver(post_delete, sender=Specialization)
+@receiver(m2m_changed, sender=TailorProfile.specializations.through)
+def invalidate_search_cache(sender, **kwargs):
+    """Any change to searchable tailor data retires all cached search pages."""
+    if kwargs.get('action', 'post_').startswith('pre_'):
+        return
+    bump_search_generation()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_search_cache_on_user(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_USER_FIELDS.intersection(update_fields):
+        # e.g. the last_login update on every login
+        return
+    if instance.role == 'tailor' or instance.pk in tailor_index:
+        bump_search_generation()
+
+
+def schedule_document_refresh(profile_ids):
+    """Refresh TailorSearchDocument rows once the current transaction commits.
+
+    Deferring matters for cascades: deleting a profile also deletes its
+    services, and refreshing mid-delete would re-insert the document.
+    """
+    profile_ids = list(profile_ids)
+    if profile_ids:
+        transaction.on_commit(partial(refresh_search_documents, profile_ids))
+
+
+@receiver(post_save, sender=TailorProfile)
+def refresh_document_on_profile_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_document_refresh([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def refresh_document_on_user_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and not SEARCH_USER_FIELDS.intersection(update_fields)):
+        return
+    if instance.role == 'tailor' or instance.pk in tailor_index:
+        schedule_document_refresh(TailorProfile.objects.filter(user=instance).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def refresh_document_on_service_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_document_refresh([instance.tailor_id])
+
+
+@receiver(post_save, sender=Specialization)
+@receiver(pre_delete, sender=Specialization)
+def refresh_documents_on_specialization_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_document_refresh(instance.tailors.values_list('pk', flat=True))
+
+
+@receiver(m2m_changed, sender=TailorProfile.specializations.through)
+def refresh_documents_on_specializations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            schedule_document_refresh([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        schedule_document_refresh(pk_set or ())
+    elif action == 'pre_clear':
+        schedule_document_refresh(instance.tailors.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Specialization)
+@receiver(post_delete, sender=Specialization)
+def reload_specialization_table(sender, **kwargs):
+    specialization_table.invalidate()
+
+
+# Review.save adjusts the tailor's rating aggregates with a queryset UPDATE
+# (marketplace.ratings), which sends no TailorProfile signals of its own.
+
+
+@receiver(post_delete, sender=Review)
+def remove_rating_on_review_delete(sender, instance, **kwargs):
+    tailor_id, rating = instance._rated or (instance.tailor_id, instance.rating)
+    apply_rating_change(tailor_id, remove=rating)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def refresh_search_on_rating_change(sender, instance, raw=False, **kwargs):
+    if raw or rating_updates_deferred():
+        # deferred_rating_updates() refreshes the touched tailors on exit
+        return
+    bump_search_generation()
+    schedule_document_refresh(TailorProfile.objects.filter(user_id=instance.tailor_id).values_list('pk', flat=True))
+
+
+# Cached tailor card fragments are keyed by TailorProfile.updated_at, which
+# saving the profile bumps by itself; these cover the card data stored
+# elsewhere.
+
+
+@receiver(post_save, sender=User)
+def touch_card_on_user_save(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or created or (update_fields is not None and not PROFILE_TOUCH_USER_FIELDS.intersection(update_fields)):
+        return
+    if instance.role == 'tailor' or instance.pk in tailor_index:
+        touch_tailor_cards(TailorProfile.objects.filter(user=instance))
+
+
+@receiver(post_save, sender=Specialization)
+@receiver(pre_delete, sender=Specialization)
+def touch_cards_on_specialization_change(sender, instance, created=False, raw=False, **kwargs):
+    if not raw and not created:
+        touch_tailor_cards(TailorProfile.objects.filter(specializations=instance))
+
+
+@receiver(m2m_changed, sender=TailorProfile.specializations.through)
+def touch_cards_on_specializations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch_tailor_cards(TailorProfile.objects.filter(pk=instance.pk))
+    elif action in ('post_add', 'post_remove'):
+        touch_tailor_cards(TailorProfile.objects.filter(pk__in=pk_set or ()))
+    elif action == 'pre_clear':
+        touch_tailor_cards(TailorProfile.objects.filter(specializations=instance))
+
+
+@receiver(post_save, sender=ServiceImage)
+@receiver(post_save, sender=ReviewImage)
+@receiver(post_save, sender=TailorProfile)
+def prime_image_url(sender, instance, raw=False, **kwargs):
+    """Resolve a freshly uploaded image's URL once, at upload time."""
+    image = instance.profile_image if sender is TailorProfile else instance.image
+    if not raw and image:
+        image_urls.url(image.storage, image.name)
@@ -1,3 +1,1774 @@
-from django.test import TestCase
+import base64
+import importlib
+import io
+import json
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgreSQLWrapper
+from django.db.models import Q
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.renderers import FastJSONParser, FastJSONRenderer
+from core.testing import Endpoint, QueryBudgetMixin
+from . import geo
+from .cards import touch_tailor_cards
+from .geo import (
+    GEO_BACKENDS, MAX_RADIUS_KM, TailorGeoIndex, distance_expression, get_geo_backend, haversine_km, tailor_index,
+)
+from .images import ImageURLMemo, image_urls, resolve_image_url
+from .models import (
+    Booking, Review, ReviewImage, Service, ServiceImage, Specialization, TailorProfile, TailorSearchDocument,
+)
+from .ratings import deferred_rating_updates, rebuild_rating_aggregates
+from .serializers import BookingSerializer, TailorProfileUpdateSerializer
+
+User = get_user_model()
+
+# Rows per seeding step; the scaling test compares N with 10N
+N = 3
+LAT, LNG = 26.1878, 91.6913
+
+
+class MarketplaceData:
+    """A tailor and a customer whose services, bookings and reviews grow with
+    ``grow(n)``, plus ``n`` more tailors around them for the search endpoints."""
+
+    def __init__(self):
+        self.spec, _ = Specialization.objects.get_or_create(
+            slug='blouse-tailoring', defaults={'name': 'Blouse Tailoring'})
+        self.tailor = User.objects.create_user(
+            username='budget_tailor', password='password', role='tailor', latitude=LAT, longitude=LNG)
+        self.customer = User.objects.create_user(username='budget_customer', password='password', role='customer')
+        self.tailor.tailor_profile.specializations.add(self.spec)
+        self.service = self.add_service(self.tailor.tailor_profile, 'Blouse Tailoring')
+        self.rows = 0
+
+    def add_service(self, profile, name):
+        service = Service.objects.create(
+            tailor=profile, name=name, description=f'{name} with lining',
+            price=Decimal('250.00'), duration_days=2,
+        )
+        ServiceImage.objects.create(service=service, image=f'service_images/{service.pk}.jpg')
+        return service
+
+    def add_booking(self, service, status=Booking.Status.COMPLETED):
+        pickup = timezone.now() + timezone.timedelta(days=1)
+        return Booking.objects.create(
+            customer=self.customer, tailor=service.tailor.user, service=service, status=status,
+            pickup_date=pickup, delivery_date=pickup + timezone.timedelta(days=service.duration_days),
+            price_snapshot=service.price,
+        )
+
+    def grow(self, n):
+        for _ in range(n):
+            self.rows += 1
+            i = self.rows
+            user = User.objects.create_user(
+                username=f'tailor{i}', password='password', role='tailor',
+                latitude=LAT + i * 0.001, longitude=LNG - i * 0.001,
+            )
+            profile = user.tailor_profile
+            profile.bio = f'Blouse and kurti tailoring, {i} years'
+            profile.years_experience = i % 20
+            profile.save()
+            profile.specializations.add(self.spec)
+            self.add_service(profile, 'Blouse Tailoring')
+
+            service = self.add_service(self.tailor.tailor_profile, f'Service {i}')
+            booking = self.add_booking(service)
+            review = Review.objects.create(
+                booking=booking, customer=self.customer, tailor=self.tailor, rating=1 + i % 5, comment=f'Review {i}')
+            ReviewImage.objects.create(review=review, image=f'review_images/{review.pk}.jpg')
+            self.add_booking(service, status=Booking.Status.PENDING)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class MarketplaceQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Query counts per marketplace endpoint must not grow with the data."""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data = MarketplaceData()
+
+    def grow(self, n):
+        # Search documents are refreshed on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data.grow(n)
+
+    def new_service(self, attempt):
+        return {'name': f'New service {attempt}', 'price': '300.00', 'duration_days': 3}
+
+    def new_booking(self, attempt):
+        return {'service': self.data.service.pk, 'pickup_date': (timezone.now() + timezone.timedelta(days=2)).isoformat()}
+
+    def new_review(self, attempt):
+        booking = self.data.add_booking(self.data.service)
+        return {'booking': booking.pk, 'rating': 4, 'comment': 'Neat stitching'}
+
+    def get_endpoints(self):
+        tailor, customer = self.data.tailor, self.data.customer
+        service = self.data.service
+        near = f'lat={LAT}&lng={LNG}&radius_km=50'
+        bbox = f'bbox={LNG - 1},{LAT - 1},{LNG + 1},{LAT + 1}'
+        return [
+            Endpoint('marketplace.tailor_list', 'GET', '/api/marketplace/', scales=True),
+            Endpoint('marketplace.tailor_detail', 'GET', '/api/marketplace/budget_tailor/'),
+            Endpoint('marketplace.tailor_search', 'GET', '/api/tailors/', scales=True),
+            Endpoint('marketplace.tailor_search.specialization', 'GET',
+                     '/api/tailors/?specialization=blouse-tailoring', scales=True),
+            Endpoint('marketplace.tailor_search.near', 'GET', f'/api/tailors/?{near}', scales=True),
+            Endpoint('marketplace.tailor_search.q', 'GET', '/api/tailors/?q=blouse', scales=True),
+            Endpoint('marketplace.tailor_search.k', 'GET', f'/api/tailors/?k=5&lat={LAT}&lng={LNG}'),
+            Endpoint('marketplace.tailor_search.sort_price', 'GET', '/api/tailors/?sort=price', scales=True),
+            Endpoint('marketplace.tailor_search.relevance', 'GET', f'/api/tailors/?sort=relevance&{near}', scales=True),
+            Endpoint('marketplace.tailor_search.sparse', 'GET',
+                     '/api/tailors/?fields=username,avg_rating&specialization=blouse-tailoring', scales=True),
+            Endpoint('marketplace.tailor_search.retrieve', 'GET', f'/api/tailors/{tailor.tailor_profile.pk}/'),
+            Endpoint('marketplace.tailor_search.facets', 'GET', '/api/tailors/facets/', scales=True),
+            Endpoint('marketplace.tailor_search.map', 'GET', f'/api/tailors/map/?{bbox}&zoom=14', scales=True),
+            Endpoint('marketplace.tailor_search.map_clusters', 'GET', f'/api/tailors/map/?{bbox}&zoom=5', scales=True),
+            Endpoint('marketplace.tailor_search.batch', 'GET',
+                     f'/api/tailors/batch/?origin={LAT},{LNG}&origin={LAT + 0.01},{LNG}', scales=True),
+            Endpoint('marketplace.my_tailor_profile', 'GET', '/api/marketplace/me/', tailor),
+            Endpoint('marketplace.my_services', 'GET', '/api/marketplace/me/services/', tailor, scales=True),
+            Endpoint('marketplace.my_services.create', 'POST', '/api/marketplace/me/services/', tailor, self.new_service),
+            Endpoint('marketplace.my_service_detail', 'GET', f'/api/marketplace/me/services/{service.pk}/', tailor),
+            Endpoint('marketplace.service_images', 'GET', f'/api/marketplace/me/services/{service.pk}/images/', tailor),
+            Endpoint('marketplace.public_tailor_services', 'GET', '/api/marketplace/budget_tailor/services/', scales=True),
+            Endpoint('marketplace.bookings.customer', 'GET', '/api/marketplace/bookings/', customer, scales=True),
+            Endpoint('marketplace.bookings.tailor', 'GET', '/api/marketplace/bookings/', tailor, scales=True),
+            Endpoint('marketplace.bookings.expand', 'GET', '/api/marketplace/bookings/?expand=service', customer,
+                     scales=True),
+            Endpoint('marketplace.bookings.create', 'POST', '/api/marketplace/bookings/', customer, self.new_booking),
+            Endpoint('marketplace.reviews', 'GET', '/api/marketplace/reviews/', customer, scales=True),
+            Endpoint('marketplace.reviews.create', 'POST', '/api/marketplace/reviews/', customer, self.new_review),
+            Endpoint('marketplace.public_tailor_reviews', 'GET', '/api/marketplace/budget_tailor/reviews/', scales=True),
+        ]
+
+    def test_queries_independent_of_rows(self):
+        self.assert_queries_independent_of_rows(self.grow, N)
+
+    def test_query_budgets(self):
+        self.grow(10 * N)
+        self.assert_within_budgets()
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ReviewExpandTests(TestCase):
+    """?expand=booking nests bookings only for the reviewer's own list."""
+
+    def setUp(self):
+        self.data = MarketplaceData()
+        self.data.grow(1)
+
+    def test_public_reviews_never_expand_booking(self):
+        response = APIClient().get('/api/marketplace/budget_tailor/reviews/?expand=booking')
+        self.assertEqual(response.status_code, 200)
+        review = response.json()['results'][0]
+        self.assertIsInstance(review['booking'], int)
+
+    def test_own_reviews_expand_booking(self):
+        client = APIClient()
+        client.force_authenticate(self.data.customer)
+        review = client.get('/api/marketplace/reviews/?expand=booking').json()['results'][0]
+        self.assertEqual(review['booking']['customer_username'], 'budget_customer')
+
+
+class SparseFieldsetTests(TestCase):
+    """?fields= and ?omit= trim list responses; unknown names are ignored."""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data = MarketplaceData()
+            self.data.grow(2)
+        self.customer = APIClient()
+        self.customer.force_authenticate(self.data.customer)
+
+    def rows(self, path, client=None):
+        response = (client or APIClient()).get(path)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        rows = body['results'] if isinstance(body, dict) and 'results' in body else body
+        self.assertTrue(rows)
+        return rows
+
+    def test_fields_and_omit(self):
+        for path, client in [
+            ('/api/marketplace/', None),
+            ('/api/tailors/', None),
+            (f'/api/tailors/?lat={LAT}&lng={LNG}&radius_km=50', None),
+            ('/api/marketplace/budget_tailor/services/', None),
+            ('/api/marketplace/budget_tailor/reviews/', None),
+            ('/api/marketplace/bookings/', self.customer),
+            ('/api/marketplace/reviews/', self.customer),
+        ]:
+            with self.subTest(path=path):
+                separator = '&' if '?' in path else '?'
+                full = self.rows(path, client)
+                keys = list(full[0])
+                kept, dropped = keys[:2], keys[2:]
+                trimmed = self.rows(f'{path}{separator}fields={",".join(kept)},no_such_field', client)
+                self.assertEqual([list(row) for row in trimmed], [kept] * len(full))
+                self.assertEqual(trimmed, [{key: row[key] for key in kept} for row in full])
+                omitted = self.rows(f'{path}{separator}omit={",".join(dropped)},no_such_field', client)
+                self.assertEqual(omitted, trimmed)
+                self.assertEqual(self.rows(f'{path}{separator}omit=no_such_field', client), full)
+
+    def test_tailor_detail(self):
+        response = APIClient().get('/api/marketplace/budget_tailor/?fields=username,specializations')
+        self.assertEqual(response.json(), {
+            'username': 'budget_tailor',
+            'specializations': [{'id': self.data.spec.pk, 'name': 'Blouse Tailoring', 'slug': 'blouse-tailoring'}],
+        })
+
+    def test_writes_unaffected(self):
+        booking = Booking.objects.filter(customer=self.data.customer).first()
+        factory = APIRequestFactory()
+        full = BookingSerializer(booking, context={'request': Request(factory.get('/'))}).data
+        for method in ('post', 'patch', 'put'):
+            with self.subTest(method=method):
+                request = Request(getattr(factory, method)('/?fields=id&omit=status'))
+                self.assertEqual(BookingSerializer(booking, context={'request': request}).data, full)
+        head = Request(factory.head('/?fields=id'))
+        self.assertEqual(list(BookingSerializer(booking, context={'request': head}).data), ['id'])
+        # A tailor's own service list creates with the full response
+        tailor = APIClient()
+        tailor.force_authenticate(self.data.tailor)
+        response = tailor.post('/api/marketplace/me/services/?fields=id', {
+            'name': 'Saree Fall', 'description': 'Fall and pico', 'price': '150.00', 'duration_days': 1,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(set(response.json()), {'id', 'name', 'description', 'price', 'duration_days', 'is_active'})
+
+    def test_omitted_relations_skip_queries(self):
+        def count(path):
+            with CaptureQueriesContext(connection) as queries:
+                self.rows(path, self.customer)
+            return len(queries)
+
+        self.assertLess(count('/api/marketplace/reviews/?fields=id,rating'), count('/api/marketplace/reviews/'))
+
+
+class FastJSONTests(TestCase):
+    """FastJSONRenderer/FastJSONParser read and write the same JSON as DRF's classes."""
+
+    payload = {
+        'price': Decimal('1299.50'),
+        'ratio': 0.1,
+        'count': 3,
+        'none': None,
+        'flags': [True, False],
+        'created': datetime(2026, 1, 2, 3, 4, 5, 123456, tzinfo=dt_timezone.utc),
+        'naive': datetime(2026, 1, 2, 3, 4, 5),
+        'day': datetime(2026, 1, 2).date(),
+        'text': 'kurti \u2028 \u2029 कुर्ती "quoted"',
+        'lazy': gettext_lazy('Invalid cursor'),
+        'nested': {1: [{'a': 'b'}], 'empty': {}},
+    }
+
+    def test_renderer_matches_drf(self):
+        self.assertEqual(FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+        # Indented output keeps DRF's own path
+        context = {'indent': 2}
+        self.assertEqual(FastJSONRenderer().render(self.payload, 'application/json', context),
+                         JSONRenderer().render(self.payload, 'application/json', context))
+
+    def test_api_response_matches_drf(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            MarketplaceData().grow(2)
+        for path in ('/api/tailors/', '/api/marketplace/budget_tailor/reviews/'):
+            with self.subTest(path=path):
+                response = APIClient().get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+                self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_parser(self):
+        body = '{"bio": "Hand \u2028 embroidery", "years_experience": 7, "price": 1.5, "tags": [null]}'
+        parsed = FastJSONParser().parse(io.BytesIO(body.encode()))
+        self.assertEqual(parsed, JSONParser().parse(io.BytesIO(body.encode())))
+        latin = FastJSONParser().parse(io.BytesIO('{"a": "é"}'.encode('latin-1')), None, {'encoding': 'latin-1'})
+        self.assertEqual(latin, {'a': 'é'})
+        for bad in (b'{"a": ', b'{\'a\': 1}', b'NaN', b'\xff'):
+            with self.subTest(body=bad), self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(bad))
+
+    def test_request_bodies(self):
+        tailor = User.objects.create_user(username='json_tailor', password='password', role='tailor')
+        client = APIClient()
+        client.force_authenticate(tailor)
+        response = client.patch('/api/marketplace/me/', '{"bio": "Zari \u2028 work", "years_experience": 7}',
+                                content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        profile = TailorProfile.objects.get(user=tailor)
+        self.assertEqual((profile.bio, profile.years_experience), ('Zari \u2028 work', 7))
+        self.assertIn(b'"Zari \\u2028 work"', response.content)
+        response = client.patch('/api/marketplace/me/', '{"bio": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()['detail'].startswith('JSON parse error'))
+
+
+class ImageURLTests(TestCase):
+    """Image URLs are resolved by the storage once per name and reused."""
+
+    def setUp(self):
+        image_urls.clear()
+        self.addCleanup(image_urls.clear)
+
+    def storage(self):
+        storage = mock.Mock()
+        storage.url.side_effect = lambda name: f'/media/{name}'
+        return storage
+
+    def test_memo(self):
+        memo = ImageURLMemo(maxsize=2)
+        storage = self.storage()
+        self.assertEqual(memo.url(storage, 'a.jpg'), '/media/a.jpg')
+        self.assertEqual(memo.url(storage, 'a.jpg'), '/media/a.jpg')
+        self.assertEqual(storage.url.call_count, 1)
+        self.assertIsNone(memo.url(storage, ''))
+        self.assertIsNone(memo.url(storage, None))
+        self.assertEqual(storage.url.call_count, 1)
+        # Least recently used goes first: b.jpg, not the just-read a.jpg
+        memo.url(storage, 'b.jpg')
+        memo.url(storage, 'a.jpg')
+        memo.url(storage, 'c.jpg')
+        storage.url.reset_mock()
+        memo.url(storage, 'a.jpg')
+        memo.url(storage, 'c.jpg')
+        self.assertEqual(storage.url.call_count, 0)
+        memo.url(storage, 'b.jpg')
+        self.assertEqual(storage.url.call_count, 1)
+
+    def test_storage_mode_and_errors(self):
+        memo = ImageURLMemo()
+        storage = self.storage()
+        memo.url(storage, 'a.jpg')
+        with self.settings(USE_CLOUDINARY=True):
+            memo.url(storage, 'a.jpg')
+        self.assertEqual(storage.url.call_count, 2)
+        storage.url.side_effect = ValueError('no such file')
+        self.assertIsNone(memo.url(storage, 'broken.jpg'))
+        storage.url.side_effect = lambda name: f'/media/{name}'
+        self.assertEqual(memo.url(storage, 'broken.jpg'), '/media/broken.jpg')
+
+    def test_resolve_image_url(self):
+        request = APIRequestFactory().get('/api/tailors/')
+        image = ServiceImage(image='service_images/1.jpg')
+        self.assertEqual(resolve_image_url(image.image, request), 'http://testserver/media/service_images/1.jpg')
+        self.assertEqual(resolve_image_url(image.image), '/media/service_images/1.jpg')
+        self.assertIsNone(resolve_image_url(ServiceImage().image, request))
+        remote = mock.Mock(url=mock.Mock(return_value='https://res.cloudinary.com/demo/image/upload/1.jpg'))
+        image.image.storage = remote
+        image.image.name = 'cloudinary/1.jpg'
+        self.assertEqual(resolve_image_url(image.image, request), 'https://res.cloudinary.com/demo/image/upload/1.jpg')
+
+    def test_api_images(self):
+        data = MarketplaceData()
+        data.grow(2)
+        image_urls.clear()
+        storage = ServiceImage._meta.get_field('image').storage
+        with mock.patch.object(storage, 'url', side_effect=lambda name: f'/media/{name}') as url:
+            first = APIClient().get('/api/marketplace/budget_tailor/services/').json()
+            calls = url.call_count
+            second = APIClient().get('/api/marketplace/budget_tailor/services/').json()
+        self.assertEqual(first, second)
+        self.assertGreater(calls, 0)
+        self.assertEqual(url.call_count, calls)
+        images = [image['image'] for service in first for image in service['images']]
+        self.assertTrue(images)
+        for image in images:
+            self.assertRegex(image, r'^http://testserver/media/service_images/\d+\.jpg$')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], TAILOR_SEARCH_CACHE_TIMEOUT=0)
+class KeysetPaginationTests(TestCase):
+    """Following ``next`` visits every row once; tampered cursors are rejected."""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data = MarketplaceData()
+            self.data.grow(7)
+        self.client = APIClient()
+
+    def pages(self, path, user=None):
+        self.client.force_authenticate(user)
+        response = self.client.get(path)
+        rows = []
+        while True:
+            self.assertEqual(response.status_code, 200, response.content[:300])
+            body = response.json()
+            rows += body['results']
+            if not body['next']:
+                return rows
+            response = self.client.get(body['next'])
+
+    def test_pages_cover_all_rows(self):
+        customer = self.data.customer
+        for path, user in [
+            ('/api/marketplace/', None),
+            ('/api/tailors/?specialization=blouse-tailoring', None),
+            (f'/api/tailors/?lat={LAT}&lng={LNG}&radius_km=50', None),
+            ('/api/tailors/?sort=price', None),
+            ('/api/tailors/?q=blouse', None),
+            ('/api/marketplace/bookings/', customer),
+            ('/api/marketplace/reviews/', customer),
+        ]:
+            with self.subTest(path=path):
+                sep = '&' if '?' in path else '?'
+                everything = self.pages(f'{path}{sep}page_size=100', user)
+                self.assertGreater(len(everything), 2)
+                self.assertEqual(self.pages(f'{path}{sep}page_size=2', user), everything)
+
+    def test_tampered_cursor(self):
+        customer = self.data.customer
+        # Valid base64 JSON of the right length, wrong types: ["x", "y"]
+        tampered = 'WyJ4IiwieSJd'
+        for path, user in [
+            (f'/api/marketplace/?cursor={tampered}', None),
+            (f'/api/marketplace/bookings/?cursor={tampered}', customer),
+            (f'/api/tailors/?lat={LAT}&lng={LNG}&radius_km=50&cursor={tampered}', None),
+            ('/api/tailors/?cursor=not-a-cursor', None),
+        ]:
+            with self.subTest(path=path):
+                self.client.force_authenticate(user)
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json()['detail'], 'Invalid cursor')
+
+
+def cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], TAILOR_SEARCH_CACHE_TIMEOUT=0)
+class RelevanceRankingTests(TestCase):
+    """sort=relevance pages through the candidates by (score desc, id); bad cursors are a 400."""
+
+    path = f'/api/tailors/?sort=relevance&lat={LAT}&lng={LNG}&radius_km=50'
+
+    def setUp(self):
+        self.data = MarketplaceData()
+        self.data.grow(5)
+
+    def test_pages_cover_all_rows(self):
+        client = APIClient()
+        everything = client.get(f'{self.path}&page_size=100').json()
+        self.assertIsNone(everything['next'])
+        rows, response = [], client.get(f'{self.path}&page_size=2').json()
+        while True:
+            rows += response['results']
+            if not response['next']:
+                break
+            response = client.get(response['next']).json()
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows, everything['results'])
+
+    def test_scores_follow_weights(self):
+        # Only distance counts: nearest first
+        with self.settings(TAILOR_RELEVANCE_WEIGHTS={
+                'distance': 1, 'rating': 0, 'reviews': 0, 'experience': 0, 'price': 0}):
+            results = APIClient().get(self.path).json()['results']
+        self.assertEqual([row['username'] for row in results][:3], ['budget_tailor', 'tailor1', 'tailor2'])
+
+    def test_tampered_cursor(self):
+        for values in (['x', 1], [0.5, 'y'], [0.5, True], [0.5, 1.5], [None, 1]):
+            with self.subTest(values=values):
+                response = APIClient().get(f'{self.path}&cursor={cursor(values)}')
+                self.assertEqual(response.status_code, 400)
+        for raw in ('[NaN,1]', '[Infinity,1]'):
+            with self.subTest(raw=raw):
+                token = base64.urlsafe_b64encode(raw.encode()).decode()
+                self.assertEqual(APIClient().get(f'{self.path}&cursor={token}').status_code, 400)
+
+
+@override_settings(TAILOR_SEARCH_CACHE_TIMEOUT=0)
+class GeoIndexTests(TestCase):
+    """The in-memory grid finds exactly the tailors the haversine filter does."""
+
+    # Near the antimeridian and the poles the longitude box wraps or opens up
+    origins = [(LAT, LNG), (0.0, 179.9), (-10.0, -179.95), (89.9, 0.0), (-89.95, 120.0), (65.0, -179.99)]
+    radii = [1, 30, 300, 3000, MAX_RADIUS_KM]
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(7)
+        for n, (lat, lng) in enumerate(cls.origins * 8):
+            p_lat = max(-90.0, min(90.0, lat + rng.uniform(-3, 3)))
+            p_lng = (lng + rng.uniform(-6, 6) + 180) % 360 - 180
+            User.objects.create(username=f'geo{n}', role='tailor', latitude=p_lat, longitude=p_lng)
+
+    def haversine_ids(self, lat, lng, radius_km):
+        return set(TailorProfile.objects
+                   .annotate(distance_km=distance_expression(lat, lng))
+                   .filter(distance_km__lte=radius_km)
+                   .values_list('user_id', flat=True))
+
+    def test_index_matches_haversine_filter(self):
+        index = TailorGeoIndex(cell_deg=0.5)
+        for lat, lng in self.origins:
+            for radius_km in self.radii:
+                with self.subTest(lat=lat, lng=lng, radius_km=radius_km):
+                    expected = self.haversine_ids(lat, lng, radius_km)
+                    self.assertEqual(set(index.within(lat, lng, radius_km, limit=0)), expected)
+                    # The database-side bounding box used without the grid
+                    with self.settings(TAILOR_GEO_INDEX_ENABLED=False):
+                        qs = GEO_BACKENDS['float'].filter_near(
+                            TailorProfile.objects.all(), lat, lng, radius_km, 'user__latitude', 'user__longitude')
+                        self.assertEqual(set(qs.values_list('user_id', flat=True)), expected)
+        self.assertEqual(len(self.haversine_ids(0.0, 0.0, MAX_RADIUS_KM)), len(self.origins) * 8)
+
+    def test_search_across_antimeridian(self):
+        tailor_index.invalidate()
+        response = APIClient().get('/api/tailors/?lat=0&lng=179.9&radius_km=300&page_size=100')
+        expected = self.haversine_ids(0.0, 179.9, 300)
+        self.assertTrue(User.objects.filter(pk__in=expected, longitude__lt=0).exists())
+        self.assertEqual({row['user_id'] for row in response.json()['results']}, expected)
+
+    def test_invalid_location(self):
+        client = APIClient()
+        for query in ['lat=0&lng=0&radius_km=inf', 'lat=0&lng=0&radius_km=nan', 'lat=0&lng=0&radius_km=x',
+                      'lat=nan&lng=0', 'lat=0&lng=inf', 'lat=91&lng=0', 'k=3&lat=0&lng=0&radius_km=inf',
+                      'k=3&lat=0&lng=0&radius_km=x']:
+            with self.subTest(query=query):
+                self.assertEqual(client.get(f'/api/tailors/?{query}').status_code, 400)
+        self.assertEqual(client.get('/api/tailors/batch/?origin=inf,0').status_code, 400)
+        self.assertEqual(client.get('/api/tailors/batch/?origin=0,0&radius_km=inf').status_code, 400)
+        # Huge finite radii are capped to the whole globe
+        results = client.get('/api/tailors/?lat=0&lng=0&radius_km=1e308&page_size=100').json()['results']
+        self.assertEqual(len(results), len(self.origins) * 8)
+
+
+class GeoBackendSQLTests(TestCase):
+    """The PostGIS/earthdistance SQL uses the expressions migration 0009 indexes."""
+
+    lat, lng = 26.5, 91.25
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Compile-only PostgreSQL connection; as_sql() never connects
+        cls.pg = PostgreSQLWrapper({**connection.settings_dict, 'ENGINE': 'django.db.backends.postgresql'}, alias='pg')
+        migration = importlib.import_module('marketplace.migrations.0009_geo_gist_indexes')
+        cls.indexes = {
+            'postgis': {table: expression for table, _, expression in migration.POSTGIS_INDEXES},
+            'earthdistance': {table: expression for table, _, expression in migration.EARTH_INDEXES},
+        }
+
+    def compile(self, backend, model, prefix):
+        lat_field, lng_field = f'{prefix}latitude', f'{prefix}longitude'
+        qs = backend.filter_near(model.objects.all(), self.lat, self.lng, 5, lat_field, lng_field)
+        qs = qs.order_by(backend.knn_order(self.lat, self.lng, lat_field, lng_field))
+        sql, params = qs.query.get_compiler(connection=self.pg).as_sql()
+        # Unqualified, unquoted columns, as written in the index definitions
+        return re.sub(r'"(\w+)"\.', '', sql).replace('"', ''), params
+
+    def test_expressions_match_indexes(self):
+        origin = {
+            'postgis': 'ST_SetSRID(ST_MakePoint(%s::float8, %s::float8), 4326)::geography',
+            'earthdistance': 'll_to_earth(%s::float8, %s::float8)',
+        }
+        for name in ('postgis', 'earthdistance'):
+            backend = GEO_BACKENDS[name]
+            for model, prefix, table in [(TailorProfile, 'user__', 'users_user'),
+                                         (TailorSearchDocument, '', 'marketplace_tailorsearchdocument')]:
+                with self.subTest(backend=name, table=table):
+                    sql, _ = self.compile(backend, model, prefix)
+                    point = self.indexes[name][table]
+                    # The radius filter and the KNN order both take the indexed expression as is
+                    if name == 'postgis':
+                        self.assertIn(f'WHERE (ST_DWithin({point}, {origin[name]}, %s::float8))', sql)
+                    else:
+                        self.assertIn(f'WHERE (earth_box({origin[name]}, %s::float8) @> {point} AND ', sql)
+                    self.assertIn(f'ORDER BY ({point} <-> {origin[name]}) ASC', sql)
+
+    def test_parameter_order(self):
+        radius_m = 5000.0
+        _, params = self.compile(GEO_BACKENDS['postgis'], TailorProfile, 'user__')
+        # distance_km, ST_DWithin, then the KNN order; ST_MakePoint takes (lng, lat)
+        self.assertEqual(params, (self.lng, self.lat, self.lng, self.lat, radius_m, self.lng, self.lat))
+        _, params = self.compile(GEO_BACKENDS['earthdistance'], TailorProfile, 'user__')
+        self.assertEqual(params, (self.lat, self.lng, self.lat, self.lng, radius_m,
+                                  self.lat, self.lng, radius_m, self.lat, self.lng))
+
+    def detect(self, indexes, vendor='postgresql'):
+        database = mock.MagicMock(vendor=vendor)
+        cursor = database.cursor.return_value.__enter__.return_value
+        cursor.fetchall.return_value = [(name,) for name in indexes]
+        with mock.patch('marketplace.geo.connection', database), mock.patch('marketplace.geo._detected_backend', None):
+            return get_geo_backend().name
+
+    def test_backend_selection(self):
+        for name in ('float', 'postgis', 'earthdistance'):
+            with self.subTest(name=name), self.settings(TAILOR_GEO_BACKEND=name):
+                self.assertEqual(get_geo_backend().name, name)
+        migration = importlib.import_module('marketplace.migrations.0009_geo_gist_indexes')
+        postgis, = [name for table, name, _ in migration.POSTGIS_INDEXES if table == 'users_user']
+        earth, = [name for table, name, _ in migration.EARTH_INDEXES if table == 'users_user']
+        with self.settings(TAILOR_GEO_BACKEND='auto'):
+            self.assertEqual(self.detect([postgis]), 'postgis')
+            self.assertEqual(self.detect([postgis, earth]), 'postgis')
+            self.assertEqual(self.detect([earth]), 'earthdistance')
+            # Extensions missing, so 0009 created no index
+            self.assertEqual(self.detect([]), 'float')
+            self.assertEqual(self.detect([postgis], vendor='sqlite'), 'float')
+            with mock.patch('marketplace.geo._detected_backend', None):
+                self.assertEqual(get_geo_backend().name, 'float')
+
+
+class GreatCircleDistanceTests(TestCase):
+    """distance_km is the true great-circle distance on every backend, SQLite included."""
+
+    def test_haversine_km(self):
+        self.assertAlmostEqual(haversine_km(0, 0, 0, 1), 111.195, places=3)
+        self.assertAlmostEqual(haversine_km(0, 0, 0, 180), math.pi * 6371.0, places=6)
+        self.assertAlmostEqual(haversine_km(89, 0, 89, 180), haversine_km(89, 0, 90, 0) * 2, places=6)
+        self.assertEqual(haversine_km(LAT, LNG, LAT, LNG), 0.0)
+
+    def test_database_distance_matches_haversine(self):
+        points = [(LAT, LNG), (LAT + 0.5, LNG - 0.7), (-33.87, 151.21), (64.1, -21.9), (0.0, -179.9)]
+        for n, (lat, lng) in enumerate(points):
+            User.objects.create(username=f'point{n}', role='tailor', latitude=lat, longitude=lng)
+        User.objects.create(username='nowhere', role='tailor')
+        rows = (TailorProfile.objects
+                .annotate(distance_km=distance_expression(LAT, LNG))
+                .values_list('user__latitude', 'user__longitude', 'distance_km'))
+        for lat, lng, distance in rows:
+            with self.subTest(lat=lat, lng=lng):
+                if lat is None:
+                    self.assertIsNone(distance)
+                else:
+                    self.assertAlmostEqual(distance, haversine_km(LAT, LNG, lat, lng), places=6)
+
+    @override_settings(TAILOR_SEARCH_CACHE_TIMEOUT=0)
+    def test_near_search_distances(self):
+        User.objects.create(username='near', role='tailor', latitude=LAT + 0.1, longitude=LNG)
+        User.objects.create(username='far', role='tailor', latitude=LAT + 0.2, longitude=LNG)
+        results = APIClient().get(f'/api/tailors/?lat={LAT}&lng={LNG}&radius_km=15').json()['results']
+        self.assertEqual([row['username'] for row in results], ['near'])
+        self.assertAlmostEqual(results[0]['distance_km'], haversine_km(LAT, LNG, LAT + 0.1, LNG), places=6)
+
+
+@override_settings(TAILOR_SEARCH_CACHE_TIMEOUT=0, TAILOR_SEARCH_KNN_START_KM=1.0, TAILOR_SEARCH_KNN_MAX_KM=200.0)
+class NearestTailorTests(TestCase):
+    """?k= returns the k nearest tailors, growing the radius until it holds them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(3)
+        for n in range(20):
+            User.objects.create(username=f'near{n}', role='tailor',
+                                latitude=LAT + rng.uniform(-0.5, 0.5), longitude=LNG + rng.uniform(-0.5, 0.5))
+        User.objects.create(username='remote', role='tailor', latitude=LAT + 10, longitude=LNG)
+        User.objects.create(username='unplaced', role='tailor')
+
+    def setUp(self):
+        tailor_index.invalidate()
+
+    def nearest(self, k):
+        rows = User.objects.filter(role='tailor', latitude__isnull=False).values_list('username', 'latitude', 'longitude')
+        ranked = sorted((haversine_km(LAT, LNG, lat, lng), name) for name, lat, lng in rows)
+        return [(name, distance) for distance, name in ranked if distance <= 200.0][:k]
+
+    def test_k_nearest(self):
+        for k in (1, 5, 20, 25):
+            with self.subTest(k=k):
+                body = APIClient().get(f'/api/tailors/?k={k}&lat={LAT}&lng={LNG}').json()
+                expected = self.nearest(k)
+                self.assertEqual([row['username'] for row in body['results']], [name for name, _ in expected])
+                distances = [row['distance_km'] for row in body['results']]
+                self.assertEqual(distances, sorted(distances))
+                # The radius grew geometrically from 1km until it held k tailors (or hit the max)
+                self.assertGreaterEqual(body['radius_km'], expected[-1][1])
+                if k > 20:
+                    self.assertEqual(body['radius_km'], 200.0)
+
+    def test_without_geo_index(self):
+        with self.settings(TAILOR_GEO_INDEX_ENABLED=False):
+            body = APIClient().get(f'/api/tailors/?k=5&lat={LAT}&lng={LNG}').json()
+        self.assertEqual([row['username'] for row in body['results']], [name for name, _ in self.nearest(5)])
+
+    def test_invalid_k(self):
+        location = f'lat={LAT}&lng={LNG}'
+        for query in (f'k=0&{location}', f'k=101&{location}', f'k=x&{location}', 'k=3', 'k=3&lat=0',
+                      f'k=3&{location}&sort=price', f'k=3&{location}&sort=relevance',
+                      f'k=3&{location}&cursor=abc', f'k=3&{location}&page_size=2', f'k=3&{location}&min_price=x'):
+            with self.subTest(query=query):
+                self.assertEqual(APIClient().get(f'/api/tailors/?{query}').status_code, 400)
+
+    def test_filters_apply(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            spec = Specialization.objects.create(name='Kurti', slug='kurti')
+            for n, profile in enumerate(TailorProfile.objects.filter(user__username__startswith='near').order_by('pk')):
+                if n % 2:
+                    Service.objects.create(tailor=profile, name='Kurti Stitching', description='Kurti',
+                                           price=Decimal(100 * n), duration_days=2)
+                if n % 3 == 0:
+                    profile.specializations.add(spec)
+                TailorProfile.objects.filter(pk=profile.pk).update(years_experience=n)
+        filters = {
+            'min_price=500': Q(services__price__gte=500, services__is_active=True),
+            'max_price=1300&min_experience=5': Q(services__price__lte=1300, services__is_active=True,
+                                                years_experience__gte=5),
+            'specialization=kurti': Q(specializations=spec),
+            'q=kurti': Q(services__name__icontains='kurti') | Q(specializations=spec),
+        }
+        for params, condition in filters.items():
+            with self.subTest(params=params):
+                allowed = set(TailorProfile.objects.filter(condition).values_list('user__username', flat=True))
+                expected = [name for name, _ in self.nearest(100) if name in allowed][:4]
+                self.assertEqual(len(expected), 4)
+                body = APIClient().get(f'/api/tailors/?k=4&lat={LAT}&lng={LNG}&{params}').json()
+                self.assertEqual([row['username'] for row in body['results']], expected)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], TAILOR_SEARCH_CACHE_TIMEOUT=0)
+class FullTextSearchTests(TestCase):
+    """?q= matches bios, active service names/descriptions and specialization names."""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data = MarketplaceData()
+            self.bio = self.tailor('bio_tailor', bio='Hand embroidery and zardozi work')
+            self.service = self.tailor('service_tailor')
+            self.data.add_service(self.service, 'Sherwani stitching')
+            inactive = self.data.add_service(self.tailor('inactive_tailor'), 'Sherwani alteration')
+            Service.objects.filter(pk=inactive.pk).update(is_active=False)
+            self.spec = self.tailor('spec_tailor')
+            self.spec.specializations.add(Specialization.objects.create(name='Bridal Lehenga', slug='lehenga'))
+            # Both words, in different places
+            both = self.tailor('both_tailor', bio='Embroidery on silk')
+            self.data.add_service(both, 'Sherwani fitting')
+
+    def tailor(self, username, **profile_fields):
+        user = User.objects.create_user(username=username, password='password', role='tailor')
+        TailorProfile.objects.filter(user=user).update(**profile_fields)
+        profile = TailorProfile.objects.get(user=user)
+        profile.save()
+        return profile
+
+    def search(self, q):
+        response = APIClient().get(f'/api/tailors/?q={q}&page_size=100')
+        self.assertEqual(response.status_code, 200)
+        return [row['username'] for row in response.json()['results']]
+
+    def test_sources(self):
+        self.assertEqual(set(self.search('zardozi')), {'bio_tailor'})
+        self.assertEqual(set(self.search('sherwani')), {'service_tailor', 'both_tailor'})
+        self.assertEqual(set(self.search('lehenga')), {'spec_tailor'})
+        self.assertEqual(set(self.search('lining')), {'budget_tailor', 'service_tailor', 'both_tailor'})
+
+    def test_prefix_and_all_terms(self):
+        self.assertEqual(set(self.search('embroid')), {'bio_tailor', 'both_tailor'})
+        self.assertEqual(self.search('embroidery sherwani'), ['both_tailor'])
+        self.assertEqual(self.search('EMBROIDERY   Sherwani'), ['both_tailor'])
+
+    def test_relevance_order(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tailor('expert_tailor', bio='Embroidery, embroidery and more embroidery')
+        results = self.search('embroidery')
+        self.assertEqual(results[0], 'expert_tailor')
+        self.assertEqual(set(results), {'expert_tailor', 'bio_tailor', 'both_tailor'})
+        # Location only filters keyword searches, it doesn't reorder them
+        User.objects.filter(tailor_profile__isnull=False).update(latitude=LAT, longitude=LNG)
+        response = APIClient().get(f'/api/tailors/?q=embroidery&lat={LAT}&lng={LNG}&radius_km=5')
+        self.assertEqual([row['username'] for row in response.json()['results']], results)
+
+    def test_query_syntax_is_escaped(self):
+        for q in ('"sherwani', 'sherwani OR zardozi', 'sher*', 'NEAR(a b)', '%22%29', '-', '%25'):
+            with self.subTest(q=q):
+                self.search(q)
+        self.assertEqual(self.search('sherwani OR zardozi'), [])
+        # No word characters: no filter
+        self.assertEqual(len(self.search('%21%21')), TailorProfile.objects.count())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], TAILOR_SEARCH_CACHE_TIMEOUT=0)
+class FacetTests(TestCase):
+    """/api/tailors/facets/ counts the tailors the list would return."""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data = MarketplaceData()  # Blouse Tailoring at 250, no rating
+            self.kurti = Specialization.objects.create(name='Kurti', slug='kurti')
+            for username, price, rating, specs in [
+                ('cheap', '100.00', 4.5, [self.kurti]),
+                ('mid', '300.00', 3.2, [self.kurti, self.data.spec]),
+                ('upper', '600.00', 2.0, [self.data.spec]),
+                ('premium', '1200.00', 4.0, []),
+                ('unlisted', None, 1.5, [self.kurti]),
+            ]:
+                user = User.objects.create_user(username=username, password='password', role='tailor')
+                profile = user.tailor_profile
+                profile.specializations.add(*specs)
+                if price is not None:
+                    service = self.data.add_service(profile, 'Kurti Stitching')
+                    Service.objects.filter(pk=service.pk).update(price=Decimal(price))
+                # A cheaper inactive service never moves a tailor's price bucket
+                inactive = self.data.add_service(profile, 'Old Offer')
+                Service.objects.filter(pk=inactive.pk).update(price=Decimal('10.00'), is_active=False)
+                TailorProfile.objects.filter(pk=profile.pk).update(avg_rating=rating)
+
+    def facets(self, params=''):
+        response = APIClient().get(f'/api/tailors/facets/?{params}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def listed(self, params=''):
+        response = APIClient().get(f'/api/tailors/?page_size=100&{params}')
+        self.assertEqual(response.status_code, 200)
+        return {row['username'] for row in response.json()['results']}
+
+    def test_counts(self):
+        facets = self.facets()
+        self.assertEqual(facets['total'], 6)
+        self.assertEqual(
+            [(row['slug'], row['count']) for row in facets['specializations']],
+            [('blouse-tailoring', 3), ('kurti', 3)],
+        )
+        self.assertEqual(
+            [(row['min'], row['max'], row['count']) for row in facets['price']],
+            [(0, 250, 1), (250, 500, 2), (500, 1000, 1), (1000, None, 1)],
+        )
+        self.assertEqual(
+            [(row['min'], row['count']) for row in facets['rating']],
+            [(4, 2), (3, 3), (2, 4), (1, 5)],
+        )
+
+    def test_filters_apply(self):
+        for params in ('specialization=kurti', 'max_price=400', 'specialization=kurti&max_price=400', 'q=blouse'):
+            with self.subTest(params=params):
+                facets = self.facets(params)
+                self.assertEqual(facets['total'], len(self.listed(params)))
+        facets = self.facets('specialization=kurti')
+        self.assertEqual(
+            [(row['slug'], row['count']) for row in facets['specializations']],
+            [('kurti', 3), ('blouse-tailoring', 1)],
+        )
+        self.assertEqual([row['count'] for row in facets['price']], [1, 1, 0, 0])
+
+    def test_invalid_filter(self):
+        self.assertEqual(APIClient().get('/api/tailors/facets/?min_price=-1').status_code, 400)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], TAILOR_SEARCH_CACHE_TIMEOUT=0)
+class MapTests(TestCase):
+    """/api/tailors/map/ returns the tailors inside the viewport as markers or clusters."""
+
+    bbox = f'{LNG - 0.1},{LAT - 0.1},{LNG + 0.1},{LAT + 0.1}'
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data = MarketplaceData()
+            self.data.grow(20)
+            for username, lat, lng in [('east', 0.0, 179.95), ('west', 0.0, -179.95), ('far', 0.0, 0.0)]:
+                User.objects.create_user(
+                    username=username, password='password', role='tailor', latitude=lat, longitude=lng)
+
+    def get_map(self, bbox, zoom, status=200):
+        response = APIClient().get('/api/tailors/map/', {'bbox': bbox, 'zoom': zoom})
+        self.assertEqual(response.status_code, status)
+        return response.json()
+
+    def test_invalid_params(self):
+        for bbox, zoom in [('', 5), ('1,2,3', 5), ('a,b,c,d', 5), ('0,10,1,5', 5),
+                           ('0,-91,1,5', 5), ('-181,0,1,5', 5), ('nan,0,1,5', 5), (self.bbox, 'x'), (self.bbox, '')]:
+            with self.subTest(bbox=bbox, zoom=zoom):
+                self.get_map(bbox, zoom, status=400)
+
+    def test_markers(self):
+        data = self.get_map(self.bbox, 14)
+        self.assertFalse(data['clustered'])
+        profiles = TailorProfile.objects.filter(user__latitude__range=(LAT - 0.1, LAT + 0.1))
+        self.assertEqual(
+            sorted(data['markers']),
+            sorted([user_id, lat, lng, float(rating)] for user_id, lat, lng, rating in
+                   profiles.values_list('user_id', 'user__latitude', 'user__longitude', 'avg_rating')),
+        )
+        self.assertEqual(len(data['markers']), 21)
+        # Markers link to the cards the list returns
+        cards = APIClient().get(f'/api/tailors/?lat={LAT}&lng={LNG}&radius_km=15&page_size=100').json()['results']
+        self.assertEqual({marker[0] for marker in data['markers']}, {card['user_id'] for card in cards})
+
+    def test_clusters(self):
+        for zoom in (3, 8, 11):
+            with self.subTest(zoom=zoom):
+                data = self.get_map(self.bbox, zoom)
+                self.assertTrue(data['clustered'])
+                self.assertEqual(sum(count for _, _, count in data['clusters']), 21)
+                for lat, lng, _ in data['clusters']:
+                    self.assertTrue(LAT - 0.1 <= lat <= LAT + 0.1 and LNG - 0.1 <= lng <= LNG + 0.1)
+        # Zoomed far out every nearby tailor shares one cell
+        self.assertEqual(len(self.get_map(self.bbox, 3)['clusters']), 1)
+
+    @override_settings(TAILOR_MAP_MAX_MARKERS=5)
+    def test_too_many_markers_cluster(self):
+        data = self.get_map(self.bbox, 14)
+        self.assertTrue(data['clustered'])
+        self.assertEqual(sum(count for _, _, count in data['clusters']), 21)
+
+    def test_antimeridian(self):
+        data = self.get_map('179.9,-1,-179.9,1', 14)
+        names = dict(User.objects.values_list('id', 'username'))
+        self.assertEqual({names[marker[0]] for marker in data['markers']}, {'east', 'west'})
+        self.assertEqual({names[marker[0]] for marker in self.get_map('-1,-1,1,1', 14)['markers']}, {'far'})
+
+    def test_filters_apply(self):
+        data = self.get_map(self.bbox, 14)
+        response = APIClient().get('/api/tailors/map/', {'bbox': self.bbox, 'zoom': 14, 'min_experience': 10})
+        expected = set(TailorProfile.objects.filter(years_experience__gte=10).values_list('user_id', flat=True))
+        self.assertEqual({marker[0] for marker in response.json()['markers']}, expected)
+        self.assertLess(len(expected), len(data['markers']))
+
+
+@override_settings(TAILOR_SEARCH_CACHE_TIMEOUT=0)
+class BatchSearchTests(TestCase):
+    """/api/tailors/batch/ answers several near searches in one request."""
+
+    origins = [(LAT, LNG), (LAT + 0.3, LNG - 0.3), (-33.87, 151.21), (0.0, 179.95)]
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(13)
+        n = 0
+        for lat, lng in cls.origins:
+            for _ in range(8):
+                n += 1
+                User.objects.create(username=f'tailor{n}', role='tailor', latitude=lat + rng.uniform(-0.2, 0.2),
+                                    longitude=(lng + rng.uniform(-0.2, 0.2) + 540) % 360 - 180)
+
+    def test_distance_matrix(self):
+        rng = random.Random(12)
+        origins = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(5)] + [(90.0, 0.0)]
+        points = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(30)] + list(origins)
+        for numpy in (True, False):
+            with self.subTest(numpy=numpy), mock.patch('marketplace.geo.np', geo.np if numpy else None):
+                matrix = geo.distance_matrix_km(origins, points)
+                self.assertEqual(len(matrix), len(origins))
+                for (o_lat, o_lng), row in zip(origins, matrix):
+                    self.assertEqual(len(row), len(points))
+                    for (p_lat, p_lng), distance in zip(points, row):
+                        self.assertAlmostEqual(float(distance), haversine_km(o_lat, o_lng, p_lat, p_lng), places=6)
+                for row in matrix:
+                    hits = geo.nearest_within(row, 5000, 4)
+                    expected = sorted((d, i) for i, d in enumerate(row) if d <= 5000)[:4]
+                    self.assertEqual(list(hits), [i for _, i in expected])
+
+    def test_matches_near_search(self):
+        params = '&'.join(f'origin={lat},{lng}' for lat, lng in self.origins)
+        for numpy in (True, False):
+            with self.subTest(numpy=numpy), mock.patch('marketplace.geo.np', geo.np if numpy else None):
+                body = APIClient().get(f'/api/tailors/batch/?{params}&radius_km=20&page_size=5').json()
+                self.assertEqual([(row['lat'], row['lng']) for row in body['origins']], self.origins)
+                for (lat, lng), row in zip(self.origins, body['origins']):
+                    near = APIClient().get(f'/api/tailors/?lat={lat}&lng={lng}&radius_km=20&page_size=5').json()
+                    self.assertEqual(
+                        [(r['username'], round(r['distance_km'], 6)) for r in row['results']],
+                        [(r['username'], round(r['distance_km'], 6)) for r in near['results']],
+                    )
+                    self.assertTrue(row['results'])
+
+    @override_settings(TAILOR_BATCH_MAX_ORIGINS=3)
+    def test_invalid_origins(self):
+        for query in ('', 'origin=1', 'origin=a,b', 'origin=91,0', 'origin=0,inf', 'origin=1,2,3',
+                      'origin=0,0&origin=0,0&origin=0,0&origin=0,0', f'origin={LAT},{LNG}&radius_km=x'):
+            with self.subTest(query=query):
+                self.assertEqual(APIClient().get(f'/api/tailors/batch/?{query}').status_code, 400)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], TAILOR_SEARCH_CACHE_TIMEOUT=0)
+class ServiceFilterTests(TestCase):
+    """Price, duration and experience filters and the price/experience/reviews sorts."""
+
+    def setUp(self):
+        self.data = MarketplaceData()  # budget_tailor: 250.00 over 2 days
+        # (price, duration_days, is_active) per service
+        for username, experience, reviews, services in [
+            ('quick_pricey', 10, 3, [('900.00', 1, True)]),
+            ('slow_cheap', 2, 8, [('100.00', 9, True)]),
+            # Cheap and quick, but not in the same service
+            ('split', 5, 0, [('120.00', 10, True), ('800.00', 1, True)]),
+            ('retired', 20, 1, [('50.00', 1, False)]),
+        ]:
+            user = User.objects.create_user(username=username, password='password', role='tailor')
+            profile = user.tailor_profile
+            for n, (price, duration, active) in enumerate(services):
+                service = self.data.add_service(profile, f'Kurti Stitching {n}')
+                Service.objects.filter(pk=service.pk).update(
+                    price=Decimal(price), duration_days=duration, is_active=active)
+            TailorProfile.objects.filter(pk=profile.pk).update(years_experience=experience, total_reviews=reviews)
+
+    def usernames(self, params):
+        response = APIClient().get(f'/api/tailors/?page_size=100&{params}')
+        self.assertEqual(response.status_code, 200)
+        return [row['username'] for row in response.json()['results']]
+
+    def test_filters(self):
+        for params, expected in [
+            ('min_price=500', {'quick_pricey', 'split'}),
+            ('max_price=200', {'slow_cheap', 'split'}),
+            ('min_price=200&max_price=300', {'budget_tailor'}),
+            ('max_duration_days=2', {'budget_tailor', 'quick_pricey', 'split'}),
+            ('max_price=200&max_duration_days=2', set()),
+            ('max_price=1000&max_duration_days=2', {'budget_tailor', 'quick_pricey', 'split'}),
+            ('min_experience=5', {'quick_pricey', 'split', 'retired'}),
+            ('min_experience=5&max_price=500', {'split'}),
+            ('max_price=', {'budget_tailor', 'quick_pricey', 'slow_cheap', 'split', 'retired'}),
+        ]:
+            with self.subTest(params=params):
+                self.assertEqual(set(self.usernames(params)), expected)
+
+    def test_sorts(self):
+        # Inactive services don't count, and tailors without active ones drop out
+        self.assertEqual(self.usernames('sort=price'), ['slow_cheap', 'split', 'budget_tailor', 'quick_pricey'])
+        self.assertEqual(self.usernames('sort=experience'),
+                         ['retired', 'quick_pricey', 'split', 'slow_cheap', 'budget_tailor'])
+        self.assertEqual(self.usernames('sort=reviews'),
+                         ['slow_cheap', 'quick_pricey', 'retired', 'budget_tailor', 'split'])
+        self.assertEqual(self.usernames('sort=price&min_experience=5'), ['split', 'quick_pricey'])
+
+    def test_sort_pages(self):
+        pages, url = [], '/api/tailors/?sort=price&page_size=1'
+        while url:
+            body = APIClient().get(url).json()
+            pages += [row['username'] for row in body['results']]
+            url = body['next']
+        self.assertEqual(pages, self.usernames('sort=price'))
+
+    def test_invalid_values(self):
+        for params in ('min_price=x', 'max_price=-1', 'max_price=nan', 'min_price=inf',
+                       'max_duration_days=1.5', 'max_duration_days=-2', 'min_experience=a', 'sort=name'):
+            with self.subTest(params=params):
+                self.assertEqual(APIClient().get(f'/api/tailors/?{params}').status_code, 400)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], TAILOR_SEARCH_CACHE_TIMEOUT=0,
+                   TAILOR_GEO_INDEX_SYNC_INTERVAL=0)
+class GeoIndexSyncTests(TestCase):
+    """The per-worker geo grid picks up tailors written by other workers."""
+
+    def setUp(self):
+        self.data = MarketplaceData()
+        tailor_index.invalidate()
+
+    def near_usernames(self):
+        response = APIClient().get(f'/api/tailors/?lat={LAT}&lng={LNG}&radius_km=5')
+        return {row['username'] for row in response.json()['results']}
+
+    def test_coordinates_saved_elsewhere_are_found(self):
+        far = User.objects.create_user(username='far_tailor', password='password', role='tailor',
+                                       latitude=LAT + 5, longitude=LNG)
+        self.assertNotIn('far_tailor', self.near_usernames())
+        # Another worker's save: the row and updated_at change, this grid gets no signal
+        User.objects.filter(pk=far.pk).update(latitude=LAT, longitude=LNG)
+        TailorProfile.objects.filter(user=far).update(updated_at=timezone.now())
+        self.assertIn('far_tailor', self.near_usernames())
+
+    def sync_queries(self, index):
+        with CaptureQueriesContext(connection) as queries:
+            index.sync()
+        return len(queries)
+
+    def test_sync_interval(self):
+        index = TailorGeoIndex()
+        index.build()
+        with self.settings(TAILOR_GEO_INDEX_SYNC_INTERVAL=60):
+            self.assertEqual(self.sync_queries(index), 1)
+            self.assertEqual(self.sync_queries(index), 0)
+        self.assertEqual(self.sync_queries(index), 1)
+
+    def test_sync_queries_outside_lock(self):
+        index = TailorGeoIndex()
+        index.build()
+        free = []
+
+        def probe(execute, sql, params, many, context):
+            # Another thread (a concurrent search) can take the lock mid-query
+            def acquire():
+                if index._lock.acquire(timeout=5):
+                    free.append(True)
+                    index._lock.release()
+            thread = threading.Thread(target=acquire)
+            thread.start()
+            thread.join()
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(probe):
+            index.sync()
+        self.assertEqual(free, [True])
+
+    def test_coordinate_save_touches_profile(self):
+        profile = self.data.tailor.tailor_profile
+        before = TailorProfile.objects.get(pk=profile.pk).updated_at
+        self.data.tailor.latitude = LAT + 1
+        self.data.tailor.save(update_fields=['latitude'])
+        self.assertGreater(TailorProfile.objects.get(pk=profile.pk).updated_at, before)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], TAILOR_SEARCH_CACHE_TIMEOUT=60)
+class SearchCacheTests(TestCase):
+    """Cached search pages are served until a relevant write bumps the generation."""
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data = MarketplaceData()
+        self.profile = self.data.tailor.tailor_profile
+        self.client = APIClient()
+
+    def search(self, query=''):
+        return self.client.get(f'/api/tailors/?{query}').json()['results']
+
+    def test_unsignalled_write_serves_cached_page(self):
+        self.assertEqual(self.search()[0]['years_experience'], 0)
+        TailorProfile.objects.filter(pk=self.profile.pk).update(years_experience=9)
+        self.assertEqual(self.search()[0]['years_experience'], 0)
+
+    def test_profile_write_invalidates(self):
+        self.assertEqual(self.search()[0]['years_experience'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.years_experience = 9
+            self.profile.save()
+        self.assertEqual(self.search()[0]['years_experience'], 9)
+
+    def test_service_write_invalidates(self):
+        self.assertEqual(self.search('q=lehenga'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            service = self.data.add_service(self.profile, 'Lehenga Alteration')
+        self.assertEqual([row['username'] for row in self.search('q=lehenga')], ['budget_tailor'])
+        with self.captureOnCommitCallbacks(execute=True):
+            service.delete()
+        self.assertEqual(self.search('q=lehenga'), [])
+
+    @override_settings(ALLOWED_HOSTS=['api.example.com', 'internal'])
+    def test_key_includes_host_and_scheme(self):
+        TailorProfile.objects.filter(pk=self.profile.pk).update(profile_image='tailor_profiles/shop.jpg')
+        User.objects.create_user(username='second_tailor', password='password', role='tailor')
+        for host, secure in [('api.example.com', True), ('internal', False), ('api.example.com', False)]:
+            with self.subTest(host=host, secure=secure):
+                body = self.client.get('/api/tailors/?page_size=1', HTTP_HOST=host, secure=secure).json()
+                origin = f"{'https' if secure else 'http'}://{host}/"
+                self.assertTrue(body['next'].startswith(origin))
+                self.assertTrue(body['results'][0]['profile_image'].startswith(origin))
+
+    def specialization_names(self):
+        return [spec['name'] for spec in self.search()[0]['specializations']]
+
+    def test_specialization_write_invalidates(self):
+        names = self.specialization_names
+        self.assertEqual(names(), ['Blouse Tailoring'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data.spec.name = 'Blouse Stitching'
+            self.data.spec.save()
+        self.assertEqual(names(), ['Blouse Stitching'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.specializations.clear()
+        self.assertEqual(names(), [])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], TAILOR_SEARCH_CACHE_TIMEOUT=0)
+class SpecializationTableTests(TestCase):
+    """A specialization created by another worker is searchable at once."""
+
+    def test_new_specialization_found_without_signal(self):
+        data = MarketplaceData()
+        client = APIClient()
+        self.assertEqual(client.get('/api/tailors/?specialization=lehenga').json()['results'], [])
+        # bulk_create sends no signals, like a write in another process
+        spec, = Specialization.objects.bulk_create([Specialization(name='Lehenga Stitching', slug='lehenga')])
+        TailorProfile.specializations.through.objects.bulk_create([
+            TailorProfile.specializations.through(tailorprofile=data.tailor.tailor_profile, specialization=spec),
+        ])
+        results = client.get('/api/tailors/?specialization=lehenga').json()['results']
+        self.assertEqual([row['username'] for row in results], ['budget_tailor'])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], TAILOR_SEARCH_CACHE_TIMEOUT=0)
+class TailorCardParityTests(TestCase):
+    """The values()-built cards are byte-identical to TailorProfileSerializer output."""
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data = MarketplaceData()
+            self.data.grow(3)
+            priced = User.objects.get(username='tailor1').tailor_profile
+            Service.objects.filter(tailor=priced).update(price=Decimal('1299.50'))
+            TailorProfile.objects.filter(pk=priced.pk).update(profile_image='tailor_profiles/shop.jpg')
+            # No services, no specializations, no image
+            User.objects.create_user(username='bare_tailor', password='password', role='tailor',
+                                     latitude=LAT, longitude=LNG + 0.01)
+
+    def get(self, path, **settings):
+        with self.settings(**settings):
+            response = APIClient().get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def test_fast_path_matches_serializer(self):
+        for path in [
+            '/api/marketplace/',
+            '/api/marketplace/budget_tailor/',
+            '/api/marketplace/bare_tailor/',
+            '/api/tailors/',
+            f'/api/tailors/?lat={LAT}&lng={LNG}&radius_km=50',
+            '/api/tailors/?q=blouse',
+            '/api/tailors/?specialization=blouse-tailoring',
+            '/api/tailors/?specialization=blouse-tailoring&fields=username,matched_service',
+        ]:
+            with self.subTest(path=path):
+                expected = self.get(path, TAILOR_CARD_FAST_PATH=False)
+                self.assertEqual(self.get(path, TAILOR_CARD_CACHE_TIMEOUT=0), expected)
+                # Fragments from the cache, on a miss and on a hit
+                self.assertEqual(self.get(path), expected)
+                self.assertEqual(self.get(path), expected)
+        cards = json.loads(self.get('/api/tailors/?specialization=blouse-tailoring&page_size=100'))['results']
+        priced = next(card for card in cards if card['username'] == 'tailor1')
+        self.assertEqual(priced['matched_service']['price'], '1299.50')
+        self.assertTrue(priced['profile_image'].endswith('/tailor_profiles/shop.jpg'))
+        bare = json.loads(self.get('/api/marketplace/bare_tailor/'))
+        self.assertEqual((bare['specializations'], bare['profile_image']), ([], None))
+
+
+@override_settings(TAILOR_SEARCH_CACHE_TIMEOUT=0, TAILOR_CARD_CACHE_TIMEOUT=60)
+class TailorCardCacheTests(TestCase):
+    """Card fragments are served from the cache until the tailor's updated_at moves."""
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data = MarketplaceData()
+            self.data.grow(5)
+        self.profile = self.data.tailor.tailor_profile
+
+    def card(self):
+        response = APIClient().get('/api/marketplace/budget_tailor/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cached_until_touched(self):
+        self.assertEqual(self.card()['bio'], '')
+        # A queryset update leaves updated_at alone, so the cached fragment is served
+        TailorProfile.objects.filter(pk=self.profile.pk).update(bio='Changed behind the cache')
+        self.assertEqual(self.card()['bio'], '')
+        touch_tailor_cards(TailorProfile.objects.filter(pk=self.profile.pk))
+        self.assertEqual(self.card()['bio'], 'Changed behind the cache')
+
+    def test_username_change(self):
+        self.card()
+        self.data.tailor.username = 'renamed_tailor'
+        self.data.tailor.save()
+        response = APIClient().get('/api/marketplace/renamed_tailor/')
+        self.assertEqual(response.json()['username'], 'renamed_tailor')
+        listed = APIClient().get('/api/tailors/?page_size=100').json()['results']
+        self.assertIn('renamed_tailor', {card['username'] for card in listed})
+        self.assertNotIn('budget_tailor', {card['username'] for card in listed})
+
+    def test_specialization_changes(self):
+        self.card()
+        self.data.spec.name = 'Saree Blouse'
+        self.data.spec.save()
+        self.assertEqual([spec['name'] for spec in self.card()['specializations']], ['Saree Blouse'])
+        kurti = Specialization.objects.create(name='Kurti', slug='kurti')
+        self.profile.specializations.add(kurti)
+        self.assertEqual({spec['slug'] for spec in self.card()['specializations']}, {'blouse-tailoring', 'kurti'})
+        kurti.tailors.clear()
+        self.assertEqual([spec['slug'] for spec in self.card()['specializations']], ['blouse-tailoring'])
+        self.data.spec.delete()
+        self.assertEqual(self.card()['specializations'], [])
+
+    def test_hit_saves_queries(self):
+        def count():
+            with CaptureQueriesContext(connection) as queries:
+                response = APIClient().get('/api/tailors/?page_size=100')
+            self.assertEqual(response.status_code, 200)
+            return len(queries), response.content
+
+        miss, expected = count()
+        hit, content = count()
+        self.assertLess(hit, miss)
+        self.assertEqual(content, expected)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], TAILOR_SEARCH_CACHE_TIMEOUT=0)
+class SearchDocumentTests(TestCase):
+    """TAILOR_SEARCH_USE_DOCUMENTS answers like the normalized queries and follows writes."""
+
+    paths = [
+        '/api/tailors/',
+        '/api/tailors/?page_size=2',
+        '/api/tailors/?specialization=blouse-tailoring',
+        '/api/tailors/?specialization=Blouse%20Tailoring',
+        f'/api/tailors/?lat={LAT}&lng={LNG}&radius_km=50',
+        f'/api/tailors/?lat={LAT}&lng={LNG}&radius_km=2&specialization=blouse-tailoring',
+        '/api/tailors/?q=blouse',
+        '/api/tailors/?q=kurti%20lining',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data = MarketplaceData()
+            self.data.grow(4)
+            User.objects.create_user(username='bare_tailor', password='password', role='tailor')
+
+    def get(self, path, documents=True):
+        with self.settings(TAILOR_SEARCH_USE_DOCUMENTS=documents):
+            response = APIClient().get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def assertSameResults(self, path):
+        expected = self.get(path, documents=False)
+        self.assertTrue(expected['results'], path)
+        self.assertEqual(self.get(path), expected)
+
+    def test_documents_match_normalized_queries(self):
+        for path in self.paths:
+            with self.subTest(path=path):
+                self.assertSameResults(path)
+                # And the second page, through the cursor
+                first = self.get(path, documents=False)
+                if first['next']:
+                    self.assertEqual(self.get(first['next']), self.get(first['next'], documents=False))
+
+    def test_refresh_on_service_writes(self):
+        profile = TailorProfile.objects.get(user__username='tailor2')
+        with self.captureOnCommitCallbacks(execute=True):
+            service = self.data.add_service(profile, 'Sherwani Fitting')
+        self.assertEqual([row['username'] for row in self.get('/api/tailors/?q=sherwani')['results']], ['tailor2'])
+        with self.captureOnCommitCallbacks(execute=True):
+            service.name = service.description = 'Kurta Fitting'
+            service.save()
+        self.assertEqual(self.get('/api/tailors/?q=sherwani')['results'], [])
+        self.assertSameResults('/api/tailors/?q=kurta')
+        with self.captureOnCommitCallbacks(execute=True):
+            service.delete()
+        self.assertEqual(self.get('/api/tailors/?q=kurta')['results'], [])
+
+    def test_refresh_on_specialization_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data.spec.name = 'Saree Blouse'
+            self.data.spec.save()
+        self.assertSameResults('/api/tailors/?specialization=saree')
+        self.assertSameResults('/api/tailors/?q=saree')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data.tailor.tailor_profile.specializations.remove(self.data.spec)
+        self.assertSameResults('/api/tailors/?specialization=blouse-tailoring')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data.spec.delete()
+        self.assertEqual(self.get('/api/tailors/?specialization=blouse-tailoring')['results'], [])
+
+    def test_refresh_on_user_rename_and_move(self):
+        tailor = self.data.tailor
+        with self.captureOnCommitCallbacks(execute=True):
+            tailor.username = 'renamed_tailor'
+            tailor.latitude = LAT + 3
+            tailor.save(update_fields=['username', 'latitude'])
+        usernames = [row['username'] for row in self.get('/api/tailors/?page_size=100')['results']]
+        self.assertIn('renamed_tailor', usernames)
+        self.assertNotIn('budget_tailor', usernames)
+        self.assertSameResults(f'/api/tailors/?lat={LAT}&lng={LNG}&radius_km=50')
+
+    def test_refresh_on_review(self):
+        booking = self.data.add_booking(self.data.service)
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(booking=booking, customer=self.data.customer, tailor=self.data.tailor, rating=5)
+        self.assertSameResults('/api/tailors/')
+
+
+class SearchDocumentMigrationTests(TransactionTestCase):
+    """Migrations 0008 and 0012 backfill from rows written before them."""
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('marketplace', target)])
+        executor.loader.build_graph()
+        return executor.loader.project_state([('marketplace', target)]).apps
+
+    def tearDown(self):
+        call_command('migrate', verbosity=0)
+
+    def create_tailor(self, apps, username, **user_fields):
+        user = apps.get_model('users', 'User').objects.create(username=username, role='tailor', **user_fields)
+        return apps.get_model('marketplace', 'TailorProfile').objects.create(user=user)
+
+    def test_0008_backfills_documents(self):
+        apps = self.migrate('0007_tailorsearchdocument')
+        Service = apps.get_model('marketplace', 'Service')
+        Specialization = apps.get_model('marketplace', 'Specialization')
+        profile = self.create_tailor(apps, 'old_tailor', latitude=LAT, longitude=LNG)
+        profile.bio = 'Bridal work'
+        profile.save()
+        profile.specializations.add(Specialization.objects.create(name='Lehenga Stitching', slug='lehenga'))
+        Service.objects.create(tailor=profile, name='Zari border', description='Hand zari', price='900.00',
+                               duration_days=4)
+        Service.objects.create(tailor=profile, name='Sherwani', price='500.00', duration_days=2, is_active=False)
+        bare = self.create_tailor(apps, 'bare_tailor')
+
+        apps = self.migrate('0008_tailorsearchdocument_search_text')
+        rows = apps.get_model('marketplace', 'TailorSearchDocument').objects.values()
+        documents = {row['profile_id']: row for row in rows}
+        self.assertEqual(set(documents), {profile.pk, bare.pk})
+        document = documents[profile.pk]
+        self.assertEqual((document['username'], document['latitude']), ('old_tailor', LAT))
+        self.assertEqual(document['specialization_slugs'], '|lehenga|')
+        self.assertEqual(document['min_price'], Decimal('900.00'))
+        self.assertEqual(document['search_text'], 'Bridal work\nLehenga Stitching\nZari border\nHand zari')
+        self.assertEqual(document['card'], {})
+        self.assertEqual(documents[bare.pk]['min_price'], None)
+
+        call_command('migrate', verbosity=0)
+        # Migrations cannot run the serializer; --stale fills the cards
+        call_command('rebuild_search_documents', '--stale', stdout=io.StringIO())
+        self.assertFalse(TailorSearchDocument.objects.filter(card={}).exists())
+        with self.settings(TAILOR_SEARCH_CACHE_TIMEOUT=0):
+            for path in ['/api/tailors/?q=zari', '/api/tailors/?q=sherwani', '/api/tailors/?specialization=lehenga']:
+                with self.subTest(path=path):
+                    with self.settings(TAILOR_SEARCH_USE_DOCUMENTS=True):
+                        from_documents = APIClient().get(path).json()
+                    self.assertEqual(from_documents, APIClient().get(path).json())
+        self.assertEqual(
+            [row['username'] for row in APIClient().get('/api/tailors/?q=zari').json()['results']], ['old_tailor'])
+
+    def test_0012_backfills_histogram_and_clears_cards(self):
+        apps = self.migrate('0011_tailorprofile_rating_sum')
+        Booking = apps.get_model('marketplace', 'Booking')
+        Review = apps.get_model('marketplace', 'Review')
+        TailorSearchDocument = apps.get_model('marketplace', 'TailorSearchDocument')
+        profile = self.create_tailor(apps, 'old_tailor')
+        other = self.create_tailor(apps, 'other_tailor')
+        customer = apps.get_model('users', 'User').objects.create(username='old_customer', role='customer')
+        service = apps.get_model('marketplace', 'Service').objects.create(
+            tailor=profile, name='Blouse', price='250.00', duration_days=2)
+        for rating in (5, 5, 2):
+            booking = Booking.objects.create(
+                customer=customer, tailor=profile.user, service=service, pickup_date=timezone.now(),
+                delivery_date=timezone.now(), price_snapshot='250.00')
+            Review.objects.create(booking=booking, customer=customer, tailor=profile.user, rating=rating)
+        TailorSearchDocument.objects.create(profile=profile, user_id=profile.user_id, username='old_tailor',
+                                            card={'username': 'old_tailor'})
+
+        apps = self.migrate('0012_tailorprofile_rating_histogram')
+        profiles = apps.get_model('marketplace', 'TailorProfile').objects
+        stars = ['stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5']
+        self.assertEqual(profiles.values(*stars).get(pk=profile.pk),
+                         {'stars_1': 0, 'stars_2': 1, 'stars_3': 0, 'stars_4': 0, 'stars_5': 2})
+        self.assertEqual(profiles.values(*stars).get(pk=other.pk), dict.fromkeys(stars, 0))
+        self.assertEqual(TailorSearchDocument.objects.get().card, {})
+
+
+AGGREGATE_FIELDS = ['rating_sum', 'total_reviews', 'avg_rating', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5']
+
+
+class RatingAggregateAssertions:
+    """Compare the incrementally kept aggregates with a full recompute."""
+
+    def aggregates(self):
+        return {row['user_id']: row for row in TailorProfile.objects.values('user_id', *AGGREGATE_FIELDS)}
+
+    def assertMatchesRebuild(self):
+        stored = self.aggregates()
+        rebuild_rating_aggregates()
+        self.assertEqual(stored, self.aggregates())
+
+    def assertRating(self, tailor, ratings):
+        """``tailor``'s stored aggregates are those of exactly ``ratings``."""
+        row = TailorProfile.objects.values(*AGGREGATE_FIELDS).get(user=tailor)
+        expected = {
+            'rating_sum': sum(ratings),
+            'total_reviews': len(ratings),
+            'avg_rating': round(Decimal(sum(ratings)) / len(ratings), 2) if ratings else Decimal('0.00'),
+            **{f'stars_{star}': ratings.count(star) for star in range(1, 6)},
+        }
+        self.assertEqual(row, expected)
+        self.assertMatchesRebuild()
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RatingAggregateTests(RatingAggregateAssertions, TestCase):
+    """Review writes keep TailorProfile rating aggregates equal to a recompute."""
+
+    def setUp(self):
+        self.data = MarketplaceData()
+        self.tailor = self.data.tailor
+        self.other = User.objects.create_user(username='other_tailor', password='password', role='tailor')
+        self.other_service = self.data.add_service(self.other.tailor_profile, 'Kurti Stitching')
+
+    def review(self, rating, service=None, customer=None):
+        booking = self.data.add_booking(service or self.data.service)
+        if customer is not None:
+            Booking.objects.filter(pk=booking.pk).update(customer=customer)
+        return Review.objects.create(
+            booking=booking, customer=customer or self.data.customer, tailor=booking.tailor, rating=rating)
+
+    def test_create(self):
+        for rating in (5, 4, 1):
+            self.review(rating)
+        self.assertRating(self.tailor, [5, 4, 1])
+        self.assertRating(self.other, [])
+
+    def test_edit(self):
+        review = self.review(5)
+        self.review(3)
+        review.rating = 2
+        review.save()
+        self.assertRating(self.tailor, [2, 3])
+        # Saving without a rating change leaves the aggregates alone
+        review.comment = 'Edited'
+        review.save()
+        self.assertRating(self.tailor, [2, 3])
+
+    def test_edit_instance_loaded_without_rating(self):
+        review = self.review(5)
+        partial = Review.objects.only('pk', 'comment').get(pk=review.pk)
+        partial.rating = 1
+        partial.save()
+        self.assertRating(self.tailor, [1])
+
+    def test_reassign_tailor(self):
+        review = self.review(4)
+        self.review(2)
+        review.tailor = self.other
+        review.rating = 5
+        review.save()
+        self.assertRating(self.tailor, [2])
+        self.assertRating(self.other, [5])
+
+    def test_delete(self):
+        first = self.review(5)
+        self.review(1)
+        self.review(3)
+        first.delete()
+        self.assertRating(self.tailor, [1, 3])
+        Review.objects.filter(rating=1).delete()
+        self.assertRating(self.tailor, [3])
+
+    def test_delete_after_unsaved_edit(self):
+        # The rating as stored is removed, not the one edited in memory
+        review = self.review(5)
+        review.rating = 1
+        review.delete()
+        self.assertRating(self.tailor, [])
+
+    def test_cascade_from_booking(self):
+        review = self.review(4)
+        self.review(2)
+        review.booking.delete()
+        self.assertRating(self.tailor, [2])
+
+    def test_cascade_from_users(self):
+        other_customer = User.objects.create_user(username='other_customer', password='password', role='customer')
+        self.review(5)
+        self.review(1, customer=other_customer)
+        self.review(3, service=self.other_service)
+        other_customer.delete()
+        self.assertRating(self.tailor, [5])
+        self.assertRating(self.other, [3])
+        # Deleting the tailor removes the profile along with the reviews
+        self.other.delete()
+        self.assertFalse(TailorProfile.objects.filter(user_id=self.other.pk).exists())
+        self.assertMatchesRebuild()
+
+    def test_stale_profile_save_keeps_aggregates(self):
+        stale = TailorProfile.objects.get(user=self.tailor)
+        reviews = [self.review(rating) for rating in (5, 4, 2)]
+        stale.bio = 'Edited elsewhere'
+        stale.save()
+        self.assertEqual(TailorProfile.objects.get(pk=stale.pk).bio, 'Edited elsewhere')
+        self.assertRating(self.tailor, [5, 4, 2])
+        # The per-star counts must not have drifted either
+        reviews[2].rating = 3
+        reviews[2].save()
+        reviews[0].delete()
+        self.assertRating(self.tailor, [4, 3])
+
+    def test_stale_profile_patch_keeps_aggregates(self):
+        stale = TailorProfile.objects.get(user=self.tailor)
+        self.review(3)
+        serializer = TailorProfileUpdateSerializer(stale, data={'years_experience': 7}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertEqual(TailorProfile.objects.get(pk=stale.pk).years_experience, 7)
+        self.assertRating(self.tailor, [3])
+
+    def test_admin_aggregates_read_only(self):
+        admin = site._registry[TailorProfile]
+        self.assertTrue(set(TailorProfile.RATING_FIELDS) <= set(admin.get_readonly_fields(None)))
+
+    def test_deferred_updates(self):
+        kept = self.review(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            with deferred_rating_updates() as touched:
+                edited = self.review(5)
+                self.review(4, service=self.other_service)
+                with deferred_rating_updates() as nested:
+                    self.assertIs(nested, touched)
+                    edited.rating = 3
+                    edited.save()
+                kept.delete()
+                # Nothing is counted until the outermost block ends
+                self.assertEqual(
+                    TailorProfile.objects.values('rating_sum', 'total_reviews').get(user=self.tailor),
+                    {'rating_sum': 2, 'total_reviews': 1},
+                )
+            self.assertEqual(touched, {self.tailor.pk, self.other.pk})
+        self.assertRating(self.tailor, [3])
+        self.assertRating(self.other, [4])
+
+    def test_rebuild_groups_reviews_once(self):
+        for rating in (5, 4, 2):
+            self.review(rating)
+        self.review(3, service=self.other_service)
+        profiles = TailorProfile.objects.filter(user__in=[self.tailor, self.other])
+        profiles.update(rating_sum=0, total_reviews=9, avg_rating=Decimal('1.00'), stars_5=7)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(rebuild_rating_aggregates(profiles), 2)
+        review_reads = [q['sql'] for q in queries if 'FROM "marketplace_review"' in q['sql']]
+        # One grouped read, not a correlated subquery per profile and aggregate
+        self.assertEqual(len(review_reads), 1)
+        self.assertTrue(review_reads[0].startswith('SELECT'))
+        self.assertIn('GROUP BY', review_reads[0])
+        self.assertRating(self.tailor, [5, 4, 2])
+        self.assertRating(self.other, [3])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportReviewsTests(RatingAggregateAssertions, TestCase):
+    """manage.py import_reviews: validation, created_at and one recompute per tailor."""
+
+    def setUp(self):
+        self.data = MarketplaceData()
+        self.other = User.objects.create_user(username='other_tailor', password='password', role='tailor')
+        self.other_service = self.data.add_service(self.other.tailor_profile, 'Kurti Stitching')
+
+    def import_reviews(self, rows, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as fh:
+            for row in rows:
+                fh.write(row if isinstance(row, str) else json.dumps(row))
+                fh.write('\n')
+        self.addCleanup(os.unlink, fh.name)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_reviews', fh.name, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import(self):
+        first, second = self.data.add_booking(self.data.service), self.data.add_booking(self.data.service)
+        other = self.data.add_booking(self.other_service)
+        out, err = self.import_reviews([
+            {'booking': first.pk, 'rating': 5, 'comment': 'Great', 'created_at': '2024-05-01T10:00:00Z',
+             'images': ['review_images/a.jpg']},
+            {'booking': second.pk, 'rating': 2},
+            {'booking': other.pk, 'rating': 4, 'created_at': '2023-01-02T03:04:05+05:30'},
+        ])
+        self.assertIn('Reviews imported: 3, skipped: 0', out)
+        self.assertEqual(err, '')
+        review = Review.objects.get(booking=first)
+        self.assertEqual((review.customer, review.tailor, review.comment), (self.data.customer, self.data.tailor, 'Great'))
+        self.assertEqual(review.created_at, datetime(2024, 5, 1, 10, tzinfo=dt_timezone.utc))
+        self.assertEqual(Review.objects.get(booking=other).created_at,
+                         datetime(2023, 1, 1, 21, 34, 5, tzinfo=dt_timezone.utc))
+        # Rows without created_at keep the import time
+        self.assertGreater(Review.objects.get(booking=second).created_at, timezone.now() - timezone.timedelta(minutes=5))
+        self.assertEqual(list(review.images.values_list('image', flat=True)), ['review_images/a.jpg'])
+        self.assertRating(self.data.tailor, [5, 2])
+        self.assertRating(self.other, [4])
+
+    def test_skipped_rows(self):
+        valid = self.data.add_booking(self.data.service)
+        pending = self.data.add_booking(self.data.service, status=Booking.Status.PENDING)
+        reviewed = self.data.add_booking(self.data.service)
+        Review.objects.create(booking=reviewed, customer=self.data.customer, tailor=self.data.tailor, rating=1)
+        rows = [
+            '[1, 2]',
+            {'booking': 'x', 'rating': 5},
+            {'booking': valid.pk, 'rating': 6},
+            {'booking': 999999, 'rating': 5},
+            {'booking': reviewed.pk, 'rating': 5},
+            {'booking': pending.pk, 'rating': 5},
+            {'booking': valid.pk, 'rating': 4, 'images': 'review_images/a.jpg'},
+            {'booking': valid.pk, 'rating': 4, 'created_at': 'yesterday'},
+            {'booking': valid.pk, 'rating': 3},
+            # Same booking again, in a later batch
+            {'booking': valid.pk, 'rating': 1},
+        ]
+        out, err = self.import_reviews(rows, '--batch-size', '9')
+        self.assertIn('Reviews imported: 1, skipped: 9', out)
+        self.assertEqual(len(err.splitlines()), 9)
+        self.assertIn('line 1: skipped, not a JSON object', err)
+        self.assertIn(f'booking {reviewed.pk} does not exist or is already reviewed', err)
+        self.assertIn(f'booking {pending.pk} is not completed', err)
+        self.assertIn(f'booking {valid.pk} appears twice', err)
+        self.assertEqual(Review.objects.get(booking=valid).rating, 3)
+        self.assertRating(self.data.tailor, [1, 3])
+
+    def test_bool_values_skipped(self):
+        valid = self.data.add_booking(self.data.service)
+        # JSON true would otherwise pass as the integer 1
+        out, err = self.import_reviews([
+            {'booking': True, 'rating': 5},
+            {'booking': valid.pk, 'rating': True},
+        ])
+        self.assertIn('Reviews imported: 0, skipped: 2', out)
+        self.assertIn('line 1: skipped, booking must be a booking id, got True', err)
+        self.assertIn('line 2: skipped, rating must be an integer from 1 to 5, got True', err)
+        self.assertFalse(Review.objects.exists())
+
+    def test_duplicate_booking_within_batch(self):
+        booking = self.data.add_booking(self.data.service)
+        out, err = self.import_reviews([{'booking': booking.pk, 'rating': 5}, {'booking': booking.pk, 'rating': 1}])
+        self.assertIn('Reviews imported: 1, skipped: 1', out)
+        self.assertIn(f'line 2: skipped, booking {booking.pk} appears twice', err)
+        self.assertRating(self.data.tailor, [5])
+
+    def test_allow_incomplete(self):
+        pending = self.data.add_booking(self.data.service, status=Booking.Status.PENDING)
+        out, _ = self.import_reviews([{'booking': pending.pk, 'rating': 4}], '--allow-incomplete')
+        self.assertIn('Reviews imported: 1, skipped: 0', out)
+        self.assertRating(self.data.tailor, [4])
+
+    def test_invalid_json_rolls_back(self):
+        booking = self.data.add_booking(self.data.service)
+        with self.assertRaisesMessage(CommandError, 'line 2: invalid JSON'):
+            self.import_reviews([{'booking': booking.pk, 'rating': 5}, '{not json'], '--batch-size', '1')
+        self.assertFalse(Review.objects.exists())
+        self.assertRating(self.data.tailor, [])
+
+    def test_one_recompute_per_tailor(self):
+        rows = [
+            {'booking': self.data.add_booking(service).pk, 'rating': 1 + i % 5}
+            for i, service in enumerate([self.data.service, self.other_service] * 6)
+        ]
+        profile_table = TailorProfile._meta.db_table
+        with CaptureQueriesContext(connection) as ctx:
+            self.import_reviews(rows, '--batch-size', '4')
+        updates = [q['sql'] for q in ctx.captured_queries
+                   if q['sql'].startswith(f'UPDATE "{profile_table}"')]
+        # Three batches, yet both tailors are recomputed together, once, at the end
+        self.assertEqual(len(updates), 1)
+        self.assertRating(self.data.tailor, [1, 3, 5, 2, 4, 1])
+        self.assertRating(self.other, [2, 4, 1, 3, 5, 2])
@@ -1,17 +1,43 @@
 from rest_framework import permissions, generics, viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.exceptions import ValidationError, PermissionDenied
 from django.contrib.auth import get_user_model
-from django.db import connection
-from django.db.models import F, Value, Q
-from django.db.models.functions import Radians, Sin, Cos, ACos, Least, Greatest, Abs
+from django.db.models import Exists, FloatField, OuterRef, Q
+from django.db.models.functions import Cast
 from django.utils import timezone
 from django.conf import settings
+from decimal import Decimal
+import math
+from django.core.cache import cache
 import stripe
 
-from .models import TailorProfile, Service, Review, ReviewImage
+from core.fieldsets import SparseQuerysetMixin
+
+from .models import TailorProfile, TailorSearchDocument, Service, Review, ReviewImage
+from .geo import (
+	tailor_index, get_geo_backend, bounding_box_q, distance_matrix_km, nearest_within,
+	valid_coordinates, MAX_RADIUS_KM, parse_bbox, filter_bbox, cluster_cell_deg, grid_clusters,
+)
+from .fulltext import filter_fulltext
+from .cache import search_cache_key, search_cache_timeout, quantize_coordinate
+from .cards import tailor_card_values, build_tailor_cards
+from .pagination import KeysetPagination
+from .ranking import relevance_scores, top_ranked
+from .search import (
+	specialization_keywords,
+	specialization_table,
+	resolve_specialization_label,
+	filter_by_specializations,
+	filter_by_services,
+	prefetch_matched_services,
+	min_active_price,
+	compute_facets,
+)
 from .serializers import (
 	TailorProfileSerializer,
+	TailorSearchDocumentSerializer,
 	TailorProfileUpdateSerializer,
 	ServiceSerializer,
 	ServiceCreateUpdateSerializer,
@@ -19,6 +45,7 @@ from .serializers import (
 	BookingSerializer,
 	BookingCreateSerializer,
 	ReviewSerializer,
+	PublicReviewSerializer,
 	ReviewCreateSerializer,
 	ReviewImageSerializer,
 )
@@ -41,13 +68,43 @@ class MyTailorProfileView(generics.RetrieveUpdateAPIView):
 		return TailorProfileSerializer
 
 
-class TailorListView(generics.ListAPIView):
+class TailorCardListMixin:
+	"""Render paginated tailor lists with ``build_tailor_cards``.
+
+	Produces exactly what TailorProfileSerializer would, from cached card
+	fragments (see marketplace.cards). Disabled with TAILOR_CARD_FAST_PATH = False or
+	when the view picks another serializer.
+	"""
+
+	def list(self, request, *args, **kwargs):
+		if (not getattr(settings, 'TAILOR_CARD_FAST_PATH', True)
+				or self.get_serializer_class() is not TailorProfileSerializer):
+			return super().list(request, *args, **kwargs)
+		queryset = self.filter_queryset(self.get_queryset())
+		page = self.paginate_queryset(tailor_card_values(queryset))
+		return self.get_paginated_response(build_tailor_cards(page, self.get_serializer_context()))
+
+
+class TailorProfileSparseMixin(SparseQuerysetMixin):
+	"""?fields=/?omit= shaping for TailorProfileSerializer lists."""
+
+	sparse_relations = {
+		'user_id': ['user'],
+		'username': ['user'],
+		'specializations': ['specializations'],
+		'matched_service': ['matched_services'],
+	}
+	sparse_columns = {'bio': ['bio'], 'profile_image': ['profile_image']}
+
+
+class TailorListView(TailorCardListMixin, TailorProfileSparseMixin, generics.ListAPIView):
 	queryset = (TailorProfile.objects
 				.select_related('user')
 				.prefetch_related('specializations')
-				.all().order_by('-avg_rating'))
+				.all().order_by('-avg_rating', 'id'))
 	serializer_class = TailorProfileSerializer
 	permission_classes = [permissions.AllowAny]
+	pagination_class = KeysetPagination
 
 
 class TailorDetailView(generics.RetrieveAPIView):
@@ -60,18 +117,32 @@ class TailorDetailView(generics.RetrieveAPIView):
 		username = self.kwargs.get('username')
 		return generics.get_object_or_404(self.queryset, user__username=username)
 
+	def retrieve(self, request, *args, **kwargs):
+		if not getattr(settings, 'TAILOR_CARD_FAST_PATH', True):
+			return super().retrieve(request, *args, **kwargs)
+		# Same card as the list endpoints, from the fragment cache
+		row = generics.get_object_or_404(tailor_card_values(self.queryset), user__username=self.kwargs.get('username'))
+		return Response(build_tailor_cards([row], self.get_serializer_context())[0])
+
 	# Note: This endpoint is used by the frontend public TailorProfilePage at
 	# /tailor/:username to display a tailor's profile.
 
 
-class MyServicesView(generics.ListCreateAPIView):
+class ServiceSparseMixin(SparseQuerysetMixin):
+	"""?fields=/?omit= shaping for ServiceSerializer lists."""
+
+	sparse_relations = {'images': ['images'], 'tailor_username': ['tailor', 'tailor__user']}
+	sparse_columns = {'description': ['description']}
+
+
+class MyServicesView(ServiceSparseMixin, generics.ListCreateAPIView):
 	permission_classes = [permissions.IsAuthenticated]
 
 	def get_queryset(self):
 		user = self.request.user
 		if user.role != 'tailor':
 			raise PermissionDenied('Only tailors can view their services.')
-		return Service.objects.filter(tailor=user.tailor_profile).prefetch_related('images').order_by('-created_at')
+		return Service.objects.filter(tailor=user.tailor_profile).select_related('tailor__user').prefetch_related('images').order_by('-created_at')
 
 	def get_serializer_class(self):
 		if self.request.method == 'POST':
@@ -104,18 +175,25 @@ class ServiceDetailUpdateView(generics.RetrieveUpdateDestroyAPIView):
 	# DELETE /api/marketplace/me/services/<service_id>/ → 204 No Content
 
 
-class PublicTailorServicesView(generics.ListAPIView):
+class PublicTailorServicesView(ServiceSparseMixin, generics.ListAPIView):
 	serializer_class = ServiceSerializer
 	permission_classes = [permissions.AllowAny]
 
 	def get_queryset(self):
 		username = self.kwargs.get('username')
 		tailor_profile = generics.get_object_or_404(TailorProfile.objects.select_related('user'), user__username=username)
-		return Service.objects.filter(tailor=tailor_profile, is_active=True).prefetch_related('images').order_by('name')
+		return Service.objects.filter(tailor=tailor_profile, is_active=True).select_related('tailor__user').prefetch_related('images').order_by('name')
 
 
-class BookingListCreateView(generics.ListCreateAPIView):
+class BookingListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
 	permission_classes = [permissions.IsAuthenticated]
+	pagination_class = KeysetPagination
+	sparse_relations = {
+		'customer_username': ['customer'],
+		'tailor_username': ['tailor'],
+		'service_name': ['service'],
+	}
+	expand_relations = {'service': ['service', 'service__tailor__user', 'service__images']}
 
 	def get_queryset(self):
 		# Return bookings for the current authenticated user.
@@ -123,19 +201,14 @@ class BookingListCreateView(generics.ListCreateAPIView):
 		# - If user is a tailor: bookings they received (tailor=user)
 		from .models import Booking
 		user = self.request.user
-		if user.role == 'customer':
-			return (
-				Booking.objects
-				.filter(customer=user)
-				.select_related('service', 'service__tailor__user', 'tailor')
-				.order_by('-created_at')
-			)
 		# Treat non-customers as tailors for this endpoint
+		bookings = Booking.objects.filter(customer=user) if user.role == 'customer' else Booking.objects.filter(tailor=user)
+		# has_review as an EXISTS column instead of one reverse lookup per booking
 		return (
-			Booking.objects
-			.filter(tailor=user)
-			.select_related('service', 'service__tailor__user', 'customer')
-			.order_by('-created_at')
+			bookings
+			.select_related('service', 'service__tailor__user', 'customer', 'tailor')
+			.annotate(has_review=Exists(Review.objects.filter(booking=OuterRef('pk'))))
+			.order_by('-created_at', 'id')
 		)
 
 	def get_serializer_class(self):
@@ -204,13 +277,31 @@ class BookingStatusUpdateView(generics.GenericAPIView):
 		return Response(serializer.data)
 
 
-class ReviewListCreateView(generics.ListCreateAPIView):
+class ReviewSparseMixin(SparseQuerysetMixin):
+	"""?fields=/?omit=/?expand= shaping for ReviewSerializer lists."""
+
+	sparse_relations = {
+		'customer_username': ['customer'],
+		'tailor_username': ['tailor'],
+		'service_name': ['booking', 'booking__service'],
+		'service_price': ['booking', 'booking__service'],
+		'images': ['images'],
+	}
+	sparse_columns = {'comment': ['comment']}
+	expand_relations = {'booking': ['booking', 'booking__service', 'booking__customer', 'booking__tailor']}
+
+
+class ReviewListCreateView(ReviewSparseMixin, generics.ListCreateAPIView):
 	permission_classes = [permissions.IsAuthenticated]
+	pagination_class = KeysetPagination
 
 	def get_queryset(self):
 		user = self.request.user
 		# List reviews written by the user (for quick access)
-		return user.reviews_made.select_related('tailor', 'booking__service').order_by('-created_at')
+		return (user.reviews_made
+				.select_related('tailor', 'booking__service')
+				.prefetch_related('images')
+				.order_by('-created_at', 'id'))
 
 	def get_serializer_class(self):
 		if self.request.method == 'POST':
@@ -218,14 +309,20 @@ class ReviewListCreateView(generics.ListCreateAPIView):
 		return ReviewSerializer
 
 
-class PublicTailorReviewsView(generics.ListAPIView):
-	serializer_class = ReviewSerializer
+class PublicTailorReviewsView(ReviewSparseMixin, generics.ListAPIView):
+	# Bookings hold customer dates, prices and payment state: no ?expand= here
+	serializer_class = PublicReviewSerializer
+	expand_relations = {}
 	permission_classes = [permissions.AllowAny]
+	pagination_class = KeysetPagination
 
 	def get_queryset(self):
 		username = self.kwargs.get('username')
 		tailor = generics.get_object_or_404(User, username=username, role='tailor')
-		return tailor.reviews_received.select_related('customer', 'booking__service').order_by('-created_at')
+		return (tailor.reviews_received
+				.select_related('customer', 'booking__service')
+				.prefetch_related('images')
+				.order_by('-created_at', 'id'))
 
 
 class InitiatePaymentView(generics.GenericAPIView):
@@ -351,7 +448,7 @@ class MarkPaymentCompleteView(generics.GenericAPIView):
 		return Response(serializer.data)
 
 
-class TailorSearchViewSet(viewsets.ReadOnlyModelViewSet):
+class TailorSearchViewSet(TailorCardListMixin, TailorProfileSparseMixin, viewsets.ReadOnlyModelViewSet):
 	"""
 	Read-only ViewSet that supports /api/marketplace/tailors/ endpoint to list
 	tailors filtered by specialization and sorted by nearest given lat/lng.
@@ -360,92 +457,453 @@ class TailorSearchViewSet(viewsets.ReadOnlyModelViewSet):
 	- specialization: slug or name (case-insensitive contains for name)
 	- lat, lng: floats for the user's location. If provided, results include
 	  distance_km and are ordered by ascending distance.
+	- radius_km: great-circle search radius (default 10km)
+	- cursor, page_size: keyset pagination (see KeysetPagination)
+	- q: keywords matched against bio, service names/descriptions and
+	  specializations through the full-text index; results are ordered by
+	  relevance (lat/lng/radius_km still filter)
+	- k: return the k nearest tailors (requires lat/lng). The search ring
+	  starts at radius_km (or TAILOR_SEARCH_KNN_START_KM) and grows
+	  geometrically until k tailors are found; the response carries the
+	  final radius_km instead of a cursor. The filters below still apply;
+	  sort, cursor and page_size are rejected.
+	- min_price, max_price, max_duration_days: tailors with an active service
+	  within these bounds; min_experience: minimum years_experience
+	- sort=price|experience|reviews: cheapest service first / most
+	  experienced / most reviewed (overrides distance and relevance order)
+	- sort=relevance: blended score of distance, rating, review count,
+	  experience and price (TAILOR_RELEVANCE_WEIGHTS)
 	"""
 
 	serializer_class = TailorProfileSerializer
 	permission_classes = [permissions.AllowAny]
+	pagination_class = KeysetPagination
+	# Params that make no sense with ?k= (distance order, k rows, no cursor)
+	knn_unsupported_params = ('sort', 'cursor', 'page_size')
+	# Query params the TailorSearchDocument path can answer on its own
+	document_query_params = {'q', 'specialization', 'lat', 'lng', 'radius_km', 'cursor', 'page_size'}
+	# ?sort= orderings; each ends with id for keyset pagination
+	sort_orderings = {
+		'price': ('min_price', 'id'),
+		'experience': ('-years_experience', 'id'),
+		'reviews': ('-total_reviews', 'id'),
+	}
+
+	def get_serializer_class(self):
+		if self.use_search_documents():
+			return TailorSearchDocumentSerializer
+		return super().get_serializer_class()
 
 	def get_serializer_context(self):
 		ctx = super().get_serializer_context()
 		spec = self.request.query_params.get('specialization')
 		if spec:
 			ctx['specialization'] = spec
+			if self.use_search_documents():
+				ctx['specialization_keywords'] = self.get_specialization_keywords(spec)
 		return ctx
 
+	def list(self, request, *args, **kwargs):
+		# Identical searches (same quantized location, filters and page) are
+		# served from the cache until a relevant write bumps the generation.
+		timeout = search_cache_timeout()
+		if not timeout:
+			return self.list_uncached(request, *args, **kwargs)
+		key = search_cache_key(request)
+		data = cache.get(key)
+		if data is None:
+			response = self.list_uncached(request, *args, **kwargs)
+			cache.set(key, response.data, timeout)
+			return response
+		return Response(data)
+
+	@action(detail=False, methods=['get'])
+	def facets(self, request):
+		"""Counts per specialization, price bucket and rating bucket for the
+		tailors the same query params would return."""
+		timeout = search_cache_timeout()
+		key = search_cache_key(request, prefix='facets')
+		data = cache.get(key) if timeout else None
+		if data is None:
+			data = compute_facets(self.get_queryset())
+			if timeout:
+				cache.set(key, data, timeout)
+		return Response(data)
+
+	@action(detail=False, methods=['get'], url_path='map')
+	def map(self, request):
+		"""Tailors inside a map viewport as compact tuples.
+
+		Params: bbox=west,south,east,north and zoom (plus the usual filters).
+		Returns {"clustered": false, "markers": [[user_id, lat, lng, rating], ...]}
+		or, below TAILOR_MAP_CLUSTER_ZOOM or when the box holds more than
+		TAILOR_MAP_MAX_MARKERS tailors,
+		{"clustered": true, "clusters": [[lat, lng, count], ...]}.
+		"""
+		try:
+			bbox = parse_bbox(request.query_params.get('bbox', ''))
+			zoom = int(request.query_params.get('zoom', ''))
+		except (TypeError, ValueError):
+			raise ValidationError('bbox=west,south,east,north and an integer zoom are required.')
+		zoom = max(0, min(zoom, 22))
+
+		timeout = search_cache_timeout()
+		key = search_cache_key(request, prefix='map')
+		data = cache.get(key) if timeout else None
+		if data is None:
+			data = self.map_data(bbox, zoom)
+			if timeout:
+				cache.set(key, data, timeout)
+		return Response(data)
+
+	def map_data(self, bbox, zoom):
+		qs = filter_bbox(self.get_base_queryset(), bbox, 'user__latitude', 'user__longitude')
+		if zoom >= getattr(settings, 'TAILOR_MAP_CLUSTER_ZOOM', 12):
+			max_markers = getattr(settings, 'TAILOR_MAP_MAX_MARKERS', 2000)
+			# user_id, as on cards and batch/k-nearest results
+			rows = list(qs.values_list('user_id', 'user__latitude', 'user__longitude', 'avg_rating')[:max_markers + 1])
+			if len(rows) <= max_markers:
+				return {
+					'clustered': False,
+					'markers': [[user_id, lat, lng, float(rating)] for user_id, lat, lng, rating in rows],
+				}
+		clusters = grid_clusters(qs, cluster_cell_deg(zoom), 'user__latitude', 'user__longitude')
+		return {'clustered': True, 'clusters': clusters}
+
+	@action(detail=False, methods=['get'])
+	def batch(self, request):
+		"""Nearest tailors around several origins in one request.
+
+		Params: origin=lat,lng (repeat up to TAILOR_BATCH_MAX_ORIGINS times),
+		radius_km (default 10), page_size per origin (max 100) and the
+		usual specialization/q filters. Returns
+		{"origins": [{"lat", "lng", "results": [...]}, ...]} in request order.
+		"""
+		origins = self.get_origins()
+		limit = self.paginator.get_page_size(request)
+		radius_km = self.get_radius_km()
+
+		timeout = search_cache_timeout()
+		key = search_cache_key(request, prefix='batch')
+		data = cache.get(key) if timeout else None
+		if data is None:
+			data = self.batch_data(origins, radius_km, limit)
+			if timeout:
+				cache.set(key, data, timeout)
+		return Response(data)
+
+	def get_origins(self):
+		max_origins = getattr(settings, 'TAILOR_BATCH_MAX_ORIGINS', 10)
+		raw = self.request.query_params.getlist('origin')
+		if not 1 <= len(raw) <= max_origins:
+			raise ValidationError(f'Between 1 and {max_origins} origin=lat,lng params are required.')
+		origins = []
+		for value in raw:
+			try:
+				lat, lng = (float(part) for part in value.split(','))
+			except ValueError:
+				raise ValidationError(f'Invalid origin: {value}')
+			if not valid_coordinates(lat, lng):
+				raise ValidationError(f'Invalid origin: {value}')
+			if search_cache_timeout():
+				lat, lng = quantize_coordinate(lat), quantize_coordinate(lng)
+			origins.append((lat, lng))
+		return origins
+
+	def batch_data(self, origins, radius_km, limit):
+		"""Rank one shared candidate set against every origin.
+
+		One query fetches (pk, lat, lng) for tailors inside the union of the
+		origins' bounding boxes; distances for all origins come from a single
+		vectorized N x M haversine pass; one more query loads and serializes
+		each selected tailor once, whichever origins it appears under.
+		"""
+		base = self.get_base_queryset()
+		boxes = Q()
+		for lat, lng in origins:
+			boxes |= bounding_box_q(lat, lng, radius_km, 'user__latitude', 'user__longitude')
+		candidates = list(base.filter(boxes).order_by('pk').values_list('pk', 'user__latitude', 'user__longitude'))
+		pks = [pk for pk, _, _ in candidates]
+		distances = distance_matrix_km(origins, [(lat, lng) for _, lat, lng in candidates])
+
+		ranked = []
+		for row in distances:
+			ranked.append([(pks[i], round(float(row[i]), 6)) for i in nearest_within(row, radius_km, limit)])
+
+		selected = {pk for hits in ranked for pk, _ in hits}
+		tailors = list(base.filter(pk__in=selected)) if selected else []
+		cards = {tailor.pk: data for tailor, data in zip(tailors, self.get_serializer(tailors, many=True).data)}
+
+		results = []
+		for (lat, lng), hits in zip(origins, ranked):
+			results.append({
+				'lat': lat,
+				'lng': lng,
+				'results': [{**cards[pk], 'distance_km': distance} for pk, distance in hits],
+			})
+		return {'origins': results}
+
+	def list_uncached(self, request, *args, **kwargs):
+		if 'k' in request.query_params:
+			return self.nearest(request)
+		if request.query_params.get('sort') == 'relevance':
+			return self.ranked(request)
+		return super().list(request, *args, **kwargs)
+
+	def ranked(self, request):
+		"""sort=relevance: blended score over the whole candidate set.
+
+		One values_list query fetches the numeric columns of every candidate,
+		``relevance_scores`` weighs them (TAILOR_RELEVANCE_WEIGHTS) as arrays,
+		and only the winning page is loaded as full objects. The cursor holds
+		the (score, id) of the last row, like KeysetPagination.
+		"""
+		lat, _, radius_km = self.get_location()
+		qs = self.get_queryset()
+		columns = ['rating', 'total_reviews', 'years_experience', 'min_price']
+		if lat is not None:
+			columns.insert(0, 'distance_km')
+		# Floats straight from the database; building Decimals costs more than scoring
+		rows = list(qs
+			.annotate(rating=Cast('avg_rating', FloatField()), min_price=Cast(min_active_price(), FloatField()))
+			.order_by()
+			.values_list('pk', *columns))
+		if lat is None:
+			rows = [(pk, None, *rest) for pk, *rest in rows]
+
+		paginator = self.paginator
+		page_size = paginator.get_page_size(request)
+		token = request.query_params.get(paginator.cursor_query_param)
+		after = self.ranked_cursor(paginator.decode_cursor(token, 2)) if token else None
+		scores = relevance_scores([row[1:] for row in rows], radius_km if lat is not None else None)
+		top = top_ranked([row[0] for row in rows], scores, page_size + 1, after=after)
+
+		page = top[:page_size]
+		tailors = {t.pk: t for t in self.shape_queryset(qs.filter(pk__in=[pk for _, pk in page]))}
+		serializer = self.get_serializer([tailors[pk] for _, pk in page], many=True)
+		next_link = None
+		if len(top) > page_size:
+			url = request.build_absolute_uri()
+			next_link = replace_query_param(url, paginator.cursor_query_param, paginator.encode_cursor(list(page[-1])))
+		return Response({'next': next_link, 'results': serializer.data})
+
+	def ranked_cursor(self, values):
+		"""The (score, pk) of a sort=relevance cursor; a finite float and an int."""
+		score, pk = values
+		if (isinstance(score, bool) or not isinstance(score, (int, float)) or not math.isfinite(score)
+				or isinstance(pk, bool) or not isinstance(pk, int)):
+			raise ValidationError('Invalid cursor')
+		return float(score), pk
+
+	def nearest(self, request):
+		"""k-nearest search with adaptive radius expansion.
+
+		With an index-backed geo backend (PostGIS/earthdistance) this is one
+		KNN query. Otherwise rings where the in-memory grid already holds fewer
+		than k tailors are skipped without touching the database, and one
+		LIMIT k query per ring confirms the count. Once a ring holds k matches,
+		those are exactly the k nearest overall.
+		"""
+		max_k = getattr(settings, 'TAILOR_SEARCH_MAX_K', 100)
+		try:
+			k = int(request.query_params.get('k'))
+		except (TypeError, ValueError):
+			raise ValidationError('Invalid k')
+		if not 1 <= k <= max_k:
+			raise ValidationError(f'k must be between 1 and {max_k}.')
+		unsupported = [name for name in self.knn_unsupported_params if name in request.query_params]
+		if unsupported:
+			raise ValidationError(f"k can't be combined with: {', '.join(unsupported)}.")
+		lat, lng, _ = self.get_location()
+		if lat is None:
+			raise ValidationError('k requires lat and lng.')
+
+		radius = self.get_radius_km(default=getattr(settings, 'TAILOR_SEARCH_KNN_START_KM', 2.0))
+		max_radius = getattr(settings, 'TAILOR_SEARCH_KNN_MAX_KM', 200.0)
+		growth = getattr(settings, 'TAILOR_SEARCH_KNN_GROWTH', 2.0)
+		base = self.shape_queryset(self.get_base_queryset())
+
+		backend = get_geo_backend()
+		if backend.supports_knn:
+			# Index-backed KNN: a single ORDER BY <-> LIMIT k within the max radius
+			prefix = self.coordinate_prefix()
+			knn = backend.knn_order(lat, lng, f'{prefix}latitude', f'{prefix}longitude')
+			rows = list(self.filter_near(base, lat, lng, max_radius, prefix=prefix).order_by(knn, 'pk')[:k])
+			radius = rows[-1].distance_km if len(rows) >= k else max_radius
+			serializer = self.get_serializer(rows, many=True)
+			return Response({'radius_km': radius, 'results': serializer.data})
+
+		use_index = getattr(settings, 'TAILOR_GEO_INDEX_ENABLED', True)
+		# The geo grid syncs with the database once per request, not per ring
+		synced = False
+		while True:
+			radius = min(radius, max_radius)
+			last_ring = radius >= max_radius
+			if use_index and not last_ring:
+				candidates = tailor_index.within(lat, lng, radius, sync=not synced)
+				synced = True
+				if candidates is not None and len(candidates) < k:
+					radius *= growth
+					continue
+			rows = list(self.filter_near(
+				base, lat, lng, radius, prefix=self.coordinate_prefix(), sync_index=not synced)[:k])
+			synced = True
+			if len(rows) >= k or last_ring:
+				break
+			radius *= growth
+
+		serializer = self.get_serializer(rows, many=True)
+		return Response({'radius_km': radius, 'results': serializer.data})
+
+	def get_specialization_keywords(self, specialization):
+		# Resolved once per request; used to prefetch matched services for the page
+		if not hasattr(self, '_specialization_keywords'):
+			label = resolve_specialization_label(specialization)
+			self._specialization_keywords = specialization_keywords(specialization, label)
+		return self._specialization_keywords
+
 	def get_queryset(self):
+		qs = self.get_base_queryset()
+		lat, lng, radius_km = self.get_location()
+		if lat is not None:
+			qs = self.filter_near(qs, lat, lng, radius_km, prefix=self.coordinate_prefix())
+		if self.request.query_params.get('q'):
+			# Keyword searches rank by relevance; location only filters
+			qs = qs.order_by('-relevance', 'pk')
+		return self.apply_sort(qs)
+
+	def apply_sort(self, qs):
+		"""Explicit ?sort= wins over the distance/relevance ordering."""
+		sort = self.request.query_params.get('sort')
+		if not sort or sort == 'relevance':
+			return qs
+		if sort not in self.sort_orderings:
+			raise ValidationError(f"sort must be one of: relevance, {', '.join(self.sort_orderings)}.")
+		if sort == 'price':
+			# Cheapest active service first; tailors without any are left out
+			qs = qs.annotate(min_price=min_active_price()).filter(min_price__isnull=False)
+		return qs.order_by(*self.sort_orderings[sort])
+
+	def coordinate_prefix(self):
+		# Tailor coordinates are stored on related User model
+		return '' if self.use_search_documents() else 'user__'
+
+	def get_base_queryset(self):
+		"""Search queryset with every filter except the location."""
+		if self.use_search_documents():
+			return self.get_document_queryset()
+
 		qs = (TailorProfile.objects
 			  .select_related('user')
 			  .prefetch_related('specializations')
 			  .all())
 
-		# Filter by specialization if provided (by slug exact or name icontains)
+		# Filter by specialization if provided (by slug exact or name icontains),
+		# resolved to ids in memory first so the filter is a plain EXISTS
 		specialization = self.request.query_params.get('specialization')
 		if specialization:
-			qs = qs.filter(
-				Q(specializations__slug__iexact=specialization) |
-				Q(specializations__name__icontains=specialization)
-			).distinct()
+			qs = filter_by_specializations(qs, specialization_table.resolve(specialization))
+			qs = qs.prefetch_related(prefetch_matched_services(self.get_specialization_keywords(specialization)))
+
+		# Price/duration bounds on active services, minimum experience
+		qs = filter_by_services(
+			qs,
+			min_price=self.get_number_param('min_price', Decimal),
+			max_price=self.get_number_param('max_price', Decimal),
+			max_duration_days=self.get_number_param('max_duration_days', int),
+		)
+		min_experience = self.get_number_param('min_experience', int)
+		if min_experience is not None:
+			qs = qs.filter(years_experience__gte=min_experience)
 
 		# Order by rating by default
-		qs = qs.order_by('-avg_rating')
+		return self.filter_keywords(qs.order_by('-avg_rating', 'id'))
 
-		# If lat/lng provided, optionally prefilter by radius and annotate with distance
+	def get_number_param(self, name, cast):
+		value = self.request.query_params.get(name)
+		if value in (None, ''):
+			return None
+		try:
+			number = cast(value)
+		except (TypeError, ValueError, ArithmeticError):
+			raise ValidationError(f'Invalid {name}')
+		if (isinstance(number, Decimal) and not number.is_finite()) or number < 0:
+			raise ValidationError(f'Invalid {name}')
+		return number
+
+	def filter_keywords(self, qs):
+		query = self.request.query_params.get('q')
+		if not query:
+			return qs
+		return filter_fulltext(qs, query).order_by('-relevance', 'pk')
+
+	def get_location(self):
+		"""Parse lat/lng/radius_km; returns (None, None, None) without a location."""
 		lat = self.request.query_params.get('lat')
 		lng = self.request.query_params.get('lng')
-		radius_km = self.request.query_params.get('radius_km')
 		try:
 			lat = float(lat) if lat is not None else None
 			lng = float(lng) if lng is not None else None
-			radius_km = float(radius_km) if radius_km is not None else None
 		except (TypeError, ValueError):
 			raise ValidationError('Invalid lat/lng')
+		if lat is None or lng is None:
+			return None, None, None
+		if not valid_coordinates(lat, lng):
+			raise ValidationError('Invalid lat/lng')
+		if search_cache_timeout():
+			# Search on the same grid the cache key uses so cached pages match
+			lat, lng = quantize_coordinate(lat), quantize_coordinate(lng)
+		return lat, lng, self.get_radius_km()
 
-		# Tailor coordinates are stored on related User model
-		if lat is not None and lng is not None:
-			earth_radius = 6371.0
-			user_lat = F('user__latitude')
-			user_lng = F('user__longitude')
-
-			# Exclude rows without coordinates
-			qs = qs.exclude(user__latitude__isnull=True).exclude(user__longitude__isnull=True)
-
-			# Default radius is 10km if not supplied
-			if radius_km is None or radius_km <= 0:
-				radius_km = 10.0
-
-			# Bounding box pre-filter for performance
-			if radius_km and radius_km > 0:
-				from math import cos, radians
-				lat_delta = radius_km / 111.32
-				lng_delta = radius_km / (111.32 * max(0.1, cos(radians(lat))))
-				qs = qs.filter(
-					user__latitude__gte=lat - lat_delta,
-					user__latitude__lte=lat + lat_delta,
-					user__longitude__gte=lng - lng_delta,
-					user__longitude__lte=lng + lng_delta,
-				)
-
-			if connection.vendor == 'postgresql':
-				# Accurate great-circle distance using trig functions
-				acos_arg = (
-					Cos(Radians(Value(lat))) * Cos(Radians(user_lat)) * Cos(Radians(user_lng - Value(lng))) +
-					Sin(Radians(Value(lat))) * Sin(Radians(user_lat))
-				)
-				clamped = Least(Value(1.0), Greatest(Value(-1.0), acos_arg))
-				distance = Value(earth_radius) * ACos(clamped)
-				qs = qs.annotate(distance_km=distance).order_by('distance_km')
-			else:
-				# SQLite/MySQL-safe lightweight surrogate avoiding trig on DB:
-				# Use scaled Manhattan distance in degrees and convert to km approximately.
-				# distance_deg ≈ |lat - lat0| + |(lng - lng0) * cos(lat0)|
-				# distance_km ≈ 111.32 * distance_deg (roughly)
-				from math import cos, radians
-				cos_lat0 = cos(radians(lat))
-				deg_distance = Abs(user_lat - Value(lat)) + Abs((user_lng - Value(lng)) * Value(cos_lat0))
-				distance_km = Value(111.32) * deg_distance
-				qs = qs.annotate(distance_km=distance_km).order_by('distance_km')
-
-		return qs
+	def get_radius_km(self, default=10.0):
+		radius_km = self.request.query_params.get('radius_km')
+		try:
+			radius_km = float(radius_km) if radius_km is not None else None
+		except (TypeError, ValueError):
+			raise ValidationError('Invalid radius_km')
+		if radius_km is not None and not math.isfinite(radius_km):
+			raise ValidationError('Invalid radius_km')
+		# Default radius is 10km if not supplied
+		if radius_km is None or radius_km <= 0:
+			radius_km = default
+		# Past half the circumference every tailor is in range; also bounds
+		# the geo grid cells a lookup scans
+		return min(radius_km, MAX_RADIUS_KM)
+
+	def filter_near(self, qs, lat, lng, radius_km, prefix='', sync_index=True):
+		"""Restrict to rows within radius_km, annotate distance_km and order by it.
+
+		``prefix`` locates the latitude/longitude columns ('user__' for
+		TailorProfile, '' for TailorSearchDocument); both expose user_id.
+		``sync_index=False`` skips the geo grid sync when this request
+		already did it.
+		"""
+		lat_field = f'{prefix}latitude'
+		lng_field = f'{prefix}longitude'
+
+		# Exclude rows without coordinates
+		qs = qs.exclude(**{f'{lat_field}__isnull': True}).exclude(**{f'{lng_field}__isnull': True})
+
+		backend = get_geo_backend()
+		qs = backend.filter_near(qs, lat, lng, radius_km, lat_field, lng_field, sync_index=sync_index)
+		return qs.order_by('distance_km', 'pk')
+
+	def use_search_documents(self):
+		"""Answer from TailorSearchDocument when enabled and every param is supported there."""
+		if not getattr(settings, 'TAILOR_SEARCH_USE_DOCUMENTS', False) or self.action != 'list':
+			return False
+		return set(self.request.query_params.keys()) <= self.document_query_params
+
+	def get_document_queryset(self):
+		qs = TailorSearchDocument.objects.order_by('-avg_rating', 'pk')
+		specialization = self.request.query_params.get('specialization')
+		if specialization:
+			needle = specialization.lower()
+			qs = qs.filter(
+				Q(specialization_slugs__contains=f'|{needle}|') |
+				Q(specialization_names__contains=needle)
+			)
+		return self.filter_keywords(qs)
 
 
 # Service Image Management Views
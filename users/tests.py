@@ -1,3 +1,57 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 
-# Create your tests here.
+from core.testing import Endpoint, QueryBudgetMixin
+
+User = get_user_model()
+
+# Users per seeding step; the scaling test compares N with 10N
+N = 3
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UsersQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Query counts per users endpoint must not grow with the number of users."""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='budget_customer', password='password', role='customer')
+        self.tailor = User.objects.create_user(username='budget_tailor', password='password', role='tailor')
+        self.rows = 0
+
+    def grow(self, n):
+        for _ in range(n):
+            self.rows += 1
+            User.objects.create_user(username=f'user{self.rows}', password='password', role='customer')
+
+    def new_user(self, attempt):
+        return {'username': f'new{attempt}', 'password': 'password', 'role': 'customer'}
+
+    def refresh_token(self, attempt):
+        return {'refresh': str(RefreshToken.for_user(self.customer))}
+
+    def session(self, action, **data):
+        return {'action': action, **data}
+
+    def get_endpoints(self):
+        login = {'username': 'budget_tailor', 'password': 'password'}
+        return [
+            Endpoint('users.me', 'GET', '/api/users/me/', self.customer, scales=True),
+            Endpoint('users.me.update', 'PATCH', '/api/users/me/', self.customer, {'first_name': 'Asha'}, scales=True),
+            Endpoint('users.register', 'POST', '/api/users/register/', data=self.new_user, scales=True),
+            Endpoint('users.token', 'POST', '/api/users/token/', data=login, scales=True),
+            Endpoint('users.token.refresh', 'POST', '/api/users/token/refresh/', data=self.refresh_token, scales=True),
+            Endpoint('users.session.register', 'POST', '/api/users/session/',
+                     data=lambda attempt: self.session('register', **self.new_user(attempt)), scales=True),
+            Endpoint('users.session.login', 'POST', '/api/users/session/', data=self.session('login', **login),
+                     scales=True),
+            Endpoint('users.session.refresh', 'POST', '/api/users/session/',
+                     data=lambda attempt: self.session('refresh', **self.refresh_token(attempt)), scales=True),
+        ]
+
+    def test_queries_independent_of_rows(self):
+        self.assert_queries_independent_of_rows(self.grow, N)
+
+    def test_query_budgets(self):
+        self.grow(10 * N)
+        self.assert_within_budgets()
@@ -18,7 +18,7 @@ class RegisterView(generics.CreateAPIView):
 
 class MeView(APIView):
 	def get(self, request):
-		return Response(UserSerializer(request.user).data)
+		return Response(UserSerializer(request.user, context={'request': request}).data)
 
 	def patch(self, request):
 		serializer = UserSerializer(request.user, data=request.data, partial=True)